@@ -1,35 +1,18 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import math
 from matplotlib.patches import Circle
-
-def bernstein(n, k, t):
-    """计算n阶伯恩斯坦多项式B_{n,k}(t)"""
-    if k < 0 or k > n:
-        return 0
-    # 计算二项式系数C(n,k)
-    binomial = math.comb(n, k)  # 使用math.comb更高效
-    # 计算伯恩斯坦多项式值
-    return binomial * ((1 - t) ** (n - k)) * (t ** k)
-
-def bezier_curve(control_points, num_points=100):
-    """计算n阶贝塞尔曲线，n = 控制点数量 - 1"""
-    n = len(control_points) - 1  # 曲线阶数
-    t_values = np.linspace(0, 1, num_points)  # t从0到1均匀取值
-    curve = []
-    
-    for t in t_values:
-        point = np.zeros(2)  # 初始化曲线点坐标
-        for k in range(n + 1):
-            # 累加计算：每个控制点乘以对应的伯恩斯坦多项式权重
-            point += bernstein(n, k, t) * control_points[k]
-        curve.append(point)
-    
-    return np.array(curve)
+from bezier import bernstein_basis
 
 class InteractiveBezier:
-    def __init__(self, control_points):
-        self.control_points = np.array(control_points)
+    def __init__(self, control_points, num_points=100, update_interval=15):
+        """
+        :param num_points: 曲线采样点数
+        :param update_interval: 拖动时合并鼠标事件的时间窗口(毫秒), 窗口内只处理最后一次位置
+        """
+        self.control_points = np.array(control_points, dtype=float)
+        # 缓存的基矩阵与曲线: 曲线 = 基矩阵 @ 控制点, 移动第k个控制点只带来秩1变化
+        self.basis = bernstein_basis(len(self.control_points) - 1, num_points)
+        self.curve = self.basis @ self.control_points
         self.fig, self.ax = plt.subplots(figsize=(8, 6))
         self.line, = self.ax.plot([], [], 'b-', linewidth=2)  # 贝塞尔曲线
         self.control_line, = self.ax.plot([], [], 'r--')      # 控制点连接线
@@ -38,6 +21,11 @@ class InteractiveBezier:
         
         # 记录当前被拖动的点的索引
         self.dragging_point = None
+        # 尚未处理的拖动位置, 由定时器合并处理
+        self.pending_position = None
+        self.timer = self.fig.canvas.new_timer(interval=update_interval)
+        self.timer.single_shot = True
+        self.timer.add_callback(self.flush)
         
         # 设置坐标轴
         self.ax.set_xlim(-0.5, 2.0)
@@ -59,9 +47,8 @@ class InteractiveBezier:
         self.control_points_scatter.set_offsets(self.control_points)
         # 更新控制点连接线
         self.control_line.set_data(self.control_points[:, 0], self.control_points[:, 1])
-        # 计算并更新贝塞尔曲线
-        curve = bezier_curve(self.control_points)
-        self.line.set_data(curve[:, 0], curve[:, 1])
+        # 更新贝塞尔曲线(使用缓存的曲线)
+        self.line.set_data(self.curve[:, 0], self.curve[:, 1])
         # 刷新画布
         self.fig.canvas.draw_idle()
     
@@ -78,19 +65,40 @@ class InteractiveBezier:
     
     def on_release(self, event):
         """鼠标释放事件处理"""
+        self.flush()
         self.dragging_point = None  # 重置拖动状态
+        # 拖动结束后完整重算一次, 消除增量更新累积的舍入误差
+        self.curve = self.basis @ self.control_points
+        self.update_plot()
     
     def on_motion(self, event):
-        """鼠标移动事件处理"""
+        """鼠标移动事件处理: 只记录最新位置, 由定时器在时间窗口结束时统一处理"""
         # 如果没有拖动任何点或鼠标不在坐标轴内，则返回
         if self.dragging_point is None or event.inaxes != self.ax:
             return
         
-        # 更新被拖动的控制点坐标
-        self.control_points[self.dragging_point] = [event.xdata, event.ydata]
-        # 更新图形
+        if self.pending_position is None:
+            self.timer.start()
+        self.pending_position = (event.xdata, event.ydata)
+    
+    def flush(self):
+        """处理合并后的拖动位置"""
+        if self.pending_position is None or self.dragging_point is None:
+            self.pending_position = None
+            return
+        self.move_point(self.dragging_point, self.pending_position)
+        self.pending_position = None
         self.update_plot()
     
+    def move_point(self, k, position):
+        """
+        移动第k个控制点, 曲线做秩1增量更新: curve += B[:, k] ⊗ (P_k' - P_k)
+        :param position: 新位置 (x, y)
+        """
+        delta = np.asarray(position, dtype=float) - self.control_points[k]
+        self.control_points[k] += delta
+        self.curve += np.outer(self.basis[:, k], delta)
+    
     def show(self):
         """显示图形"""
         plt.show()
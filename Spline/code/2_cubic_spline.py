@@ -1,6 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.linalg import solve_banded
+from bezier import tessellate
 
 class CubicSpline:
     def __init__(self, P):
@@ -24,6 +25,7 @@ class CubicSpline:
         self.g = None  # g_i系数
         self.h = None  # h_i系数
         
+        self._arc_table = None  # 弧长查找表, 首次按弧长查询时构建
         self.solve()  # 求解样条曲线参数
     
     def solve(self):
@@ -39,6 +41,12 @@ class CubicSpline:
         # 求解y方向的系数 (e_i, f_i, g_i, h_i)
         e_y, f_y, g_y, h_y = self._solve_direction(y)
         self.e, self.f, self.g, self.h = e_y, f_y, g_y, h_y
+        
+        # 向量化查询用的系数数组 (m, 4, 2): 按 t³, t², t, 1 排列, 最后一维为 (x, y)
+        self.coef = np.stack((np.column_stack((self.a, self.b, self.c, self.d)),
+                              np.column_stack((self.e, self.f, self.g, self.h))), axis=-1)
+        # 系数变化后旧的弧长查找表失效
+        self._arc_table = None
     
     def _solve_direction(self, points):
         """
@@ -100,29 +108,144 @@ class CubicSpline:
         计算样条曲线上的点
         每个区间[P_i,P_{i+1}]内使用参数t∈[0,1]
         """
-        curve_points = []
-        
-        for i in range(self.m):
-            # 在每个区间上均匀取t值，t∈[0,1]
-            t = np.linspace(0, 1, num_points_per_segment)
-            
-            # 根据文档中的参数方程计算x和y
-            # x = f_i(t) = a_i t³ + b_i t² + c_i t + d_i
-            x = self.a[i] * t**3 + self.b[i] * t**2 + self.c[i] * t + self.d[i]
-            
-            # y = g_i(t) = e_i t³ + f_i t² + g_i t + h_i
-            y = self.e[i] * t**3 + self.f[i] * t**2 + self.g[i] * t + self.h[i]
-            
-            # 添加到曲线点列表
-            curve_points.extend(np.column_stack((x, y)))
-        
-        return np.array(curve_points)
+        t = np.linspace(0, 1, num_points_per_segment)
+        u = (np.arange(self.m)[:, None] + t).ravel()
+        i = np.repeat(np.arange(self.m), num_points_per_segment)
+        return self._polyval(i, u - i)
+    
+    def _locate(self, u):
+        """全局参数 u ∈ [0, m] -> 区间号i与区间内参数t (u = i + t)"""
+        u = np.asarray(u, dtype=float)
+        i = np.clip(np.floor(u).astype(int), 0, self.m - 1)
+        return i, u - i
+    
+    def _polyval(self, i, t, order=0):
+        """第i个区间上的order阶导数, 霍纳法"""
+        t = np.asarray(t, dtype=float)[..., None]
+        A, B, C, D = (self.coef[i, k] for k in range(4))
+        if order == 0:
+            return ((A * t + B) * t + C) * t + D
+        if order == 1:
+            return (3 * A * t + 2 * B) * t + C
+        if order == 2:
+            return 6 * A * t + 2 * B
+        if order == 3:
+            return np.broadcast_to(6 * A, t.shape[:-1] + (2,))
+        return np.zeros(t.shape[:-1] + (2,))
+    
+    def evaluate_at(self, u):
+        """
+        任意全局参数处的点
+        u: 数组, u = i + t 表示第i个区间内参数t处, 取值范围[0, m]
+        返回值: (..., 2)
+        """
+        return self._polyval(*self._locate(u))
+    
+    def derivative(self, u, order=1):
+        """对全局参数u的order阶导数 (..., 2)"""
+        i, t = self._locate(u)
+        return self._polyval(i, t, order)
+    
+    def curvature(self, u):
+        """有符号曲率 κ = (x'y'' - y'x'') / (x'² + y'²)^(3/2), 左转为正"""
+        i, t = self._locate(u)
+        d1, d2 = self._polyval(i, t, 1), self._polyval(i, t, 2)
+        cross = d1[..., 0] * d2[..., 1] - d1[..., 1] * d2[..., 0]
+        return cross / np.linalg.norm(d1, axis=-1) ** 3
+    
+    # 5点Gauss-Legendre求积的节点与权重(区间[0, 1])
+    _gl_nodes, _gl_weights = np.polynomial.legendre.leggauss(5)
+    _gl_nodes, _gl_weights = (_gl_nodes + 1) / 2, _gl_weights / 2
+    
+    def _arc_length_between(self, u0, u1):
+        """[u0, u1] 上的弧长(u0与u1在同一区间内), 对速度 |r'(u)| 做Gauss-Legendre求积"""
+        u0, u1 = np.asarray(u0, dtype=float), np.asarray(u1, dtype=float)
+        nodes = u0[..., None] + (u1 - u0)[..., None] * self._gl_nodes
+        i, _ = self._locate(np.minimum(u0, self.m - 1e-12))
+        speed = np.linalg.norm(self._polyval(i[..., None], nodes - i[..., None], 1), axis=-1)
+        return (u1 - u0) * (speed @ self._gl_weights)
+    
+    def build_arc_length_table(self, samples_per_segment=32):
+        """
+        预计算弧长查找表: 每个区间等分为samples_per_segment份, 逐份求积后累加
+        返回值: 参数表 u_j 与对应的累积弧长 s_j
+        """
+        u = np.linspace(0, self.m, self.m * samples_per_segment + 1)
+        s = np.concatenate(([0.0], np.cumsum(self._arc_length_between(u[:-1], u[1:]))))
+        self._arc_table = (u, s)
+        return self._arc_table
+    
+    @property
+    def length(self):
+        """曲线总弧长"""
+        if self._arc_table is None:
+            self.build_arc_length_table()
+        return self._arc_table[1][-1]
+    
+    def arc_length(self, u):
+        """从起点到全局参数u处的弧长"""
+        if self._arc_table is None:
+            self.build_arc_length_table()
+        table_u, table_s = self._arc_table
+        u = np.clip(np.asarray(u, dtype=float), 0, self.m)
+        j = np.clip(np.searchsorted(table_u, u, side='right') - 1, 0, len(table_u) - 2)
+        return table_s[j] + self._arc_length_between(table_u[j], u)
+    
+    def parameter_at(self, s):
+        """
+        弧长 -> 全局参数 (arc_length的反函数), 每次查询 O(log n)
+        查找表中二分定位, 表内线性插值作初值, 再做一步牛顿修正 u -= (s(u) - s) / |r'(u)|
+        """
+        if self._arc_table is None:
+            self.build_arc_length_table()
+        table_u, table_s = self._arc_table
+        s = np.clip(np.asarray(s, dtype=float), 0, table_s[-1])
+        j = np.clip(np.searchsorted(table_s, s, side='right') - 1, 0, len(table_s) - 2)
+        ratio = (s - table_s[j]) / np.maximum(table_s[j + 1] - table_s[j], 1e-300)
+        u = table_u[j] + ratio * (table_u[j + 1] - table_u[j])
+        error = table_s[j] + self._arc_length_between(table_u[j], u) - s
+        speed = np.linalg.norm(self.derivative(u), axis=-1)
+        return np.clip(u - error / np.maximum(speed, 1e-300), table_u[j], table_u[j + 1])
+    
+    def sample_by_distance(self, ds):
+        """
+        沿曲线按等弧长间隔ds采样
+        返回值: 采样点 (K, 2), 对应的全局参数 (K,)
+        """
+        u = self.parameter_at(np.arange(0, self.length, ds))
+        return self.evaluate_at(u), u
+    
+    def bezier_control_points(self):
+        """
+        各区间的三次多项式转换为三次贝塞尔曲线的控制点 (m, 4, 2)
+        f(t) = a t³ + b t² + c t + d 对应 Q_0 = d, Q_1 = d + c/3, Q_2 = d + 2c/3 + b/3, Q_3 = a + b + c + d
+        """
+        coef_x = (self.a, self.b, self.c, self.d)
+        coef_y = (self.e, self.f, self.g, self.h)
+        Q = []
+        for a, b, c, d in (coef_x, coef_y):
+            Q.append(np.stack((d, d + c / 3, d + 2 * c / 3 + b / 3, a + b + c + d), axis=1))
+        return np.stack(Q, axis=-1)
+    
+    def tessellate(self, tol=1e-3):
+        """
+        自适应折线化: 按弦偏差容差细分, 平直的区间只保留少量点, 弯曲处加密
+        :param tol: 折线与曲线之间允许的最大距离
+        :return: 折线点 (K+1, 2), 对应的全局参数 i + t (K+1,)
+        """
+        return tessellate(self.bezier_control_points(), tol)
 
-def visualize_spline(P, num_points_per_segment=100):
-    """可视化三次样条曲线和控制点"""
+def visualize_spline(P, num_points_per_segment=100, tol=None):
+    """
+    可视化三次样条曲线和控制点
+    tol: 给出时按弦偏差容差自适应折线化, 否则每个区间均匀取num_points_per_segment个点
+    """
     # 创建样条曲线
     spline = CubicSpline(P)
-    curve_points = spline.evaluate(num_points_per_segment)
+    if tol is None:
+        curve_points = spline.evaluate(num_points_per_segment)
+    else:
+        curve_points, _ = spline.tessellate(tol)
     
     # 创建图形
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -156,6 +279,27 @@ if __name__ == "__main__":
         [10, 3]    # P_4
     ])
     
+    # 自适应折线化与均匀采样的点数对比
+    spline = CubicSpline(P)
+    print(f"均匀采样: {len(spline.evaluate())} 点")
+    for tol in [1e-2, 1e-3, 1e-4]:
+        points, _ = spline.tessellate(tol)
+        print(f"自适应 tol = {tol:.0e}: {len(points)} 点")
+    
+    # 向量化查询: 任意参数处的点、导数与曲率, 以及按等弧长采样
+    import time
+    u = np.linspace(0, spline.m, 7)
+    print("曲率:", np.round(spline.curvature(u), 4))
+    print(f"总弧长: {spline.length:.6f}")
+    points, u = spline.sample_by_distance(0.5)
+    steps = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    print(f"等弧长采样 {len(points)} 点, 相邻点距离 {steps.min():.6f} ~ {steps.max():.6f}")
+    print(f"反查误差: {np.abs(spline.arc_length(u) - np.arange(len(u)) * 0.5).max():.1e}")
+    s_query = np.random.uniform(0, spline.length, 1_000_000)
+    start = time.perf_counter()
+    spline.parameter_at(s_query)
+    print(f"{len(s_query)} 次弧长反查: {(time.perf_counter() - start)*1e3:.1f} ms")
+    
     # 可视化样条曲线
-    visualize_spline(P)
+    visualize_spline(P, tol=1e-3)
     
\ No newline at end of file
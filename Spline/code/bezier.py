@@ -0,0 +1,206 @@
+"""
+贝塞尔曲线的向量化求值
+    1. 伯恩斯坦基矩阵: 采样点上的基函数组成 (num_points, n+1) 的矩阵, 曲线即一次矩阵乘法 S = B P
+       均匀采样的基矩阵按 (阶数, 采样点数) 缓存, 反复求值(例如交互拖动)时不再重复计算
+    2. de Casteljau算法: 逐层线性插值, 只用凸组合, 高阶曲线(二项式系数溢出、t^k下溢)时数值稳定
+    3. 批量求值: 控制点为 (B, n+1, d) 时一次计算B条同阶曲线
+    4. 自适应细分: 按弦偏差容差在de Casteljau中点处二分, 得到满足几何误差的最少折线点
+"""
+
+import math
+from functools import lru_cache
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def binomials(n):
+    """二项式系数 C(n, 0..n)"""
+    return np.array([math.comb(n, k) for k in range(n + 1)], dtype=float)
+
+
+def bernstein_matrix(n, t):
+    """
+    任意参数数组上的伯恩斯坦基矩阵, B_{n,k}(t) = C(n,k) * (1-t)^(n-k) * t^k
+    :param t: (num_points,) 参数
+    :return: (num_points, n+1), 第k列为 B_{n,k}(t)
+    """
+    t = np.asarray(t, dtype=float)[:, None]
+    k = np.arange(n + 1)
+    return binomials(n) * (1 - t) ** (n - k) * t ** k
+
+
+@lru_cache(maxsize=64)
+def bernstein_basis(n, num_points):
+    """t在[0, 1]上均匀取num_points个值时的基矩阵(缓存, 只读)"""
+    basis = bernstein_matrix(n, np.linspace(0, 1, num_points))
+    basis.flags.writeable = False
+    return basis
+
+
+def de_casteljau(control_points, t):
+    """
+    de Casteljau算法求曲线点: 对n+1个控制点逐层做 (1-t) P_k + t P_{k+1}, n层后剩下的一个点即曲线点
+    :param control_points: (n+1, d) 或批量 (B, n+1, d)
+    :param t: (num_points,) 参数
+    :return: (num_points, d) 或 (B, num_points, d)
+    """
+    P = np.asarray(control_points, dtype=float)
+    t = np.asarray(t, dtype=float)[:, None, None]
+    # (..., num_points, n+1, d): 所有参数值同时逐层插值
+    points = np.broadcast_to(P[..., None, :, :], P.shape[:-2] + (len(t),) + P.shape[-2:])
+    for _ in range(P.shape[-2] - 1):
+        points = (1 - t) * points[..., :-1, :] + t * points[..., 1:, :]
+    return points[..., 0, :]
+
+
+def bezier_curve(control_points, num_points=100, method='basis'):
+    """
+    计算n阶贝塞尔曲线，n = 控制点数量 - 1
+    公式：S(t) = Σ B_{n,k}(t) * P_k，其中k从0到n
+    :param control_points: (n+1, d) 或批量 (B, n+1, d)
+    :param method: 'basis': 缓存的基矩阵乘控制点; 'de_casteljau': 数值稳定的逐层插值(高阶曲线)
+    :return: (num_points, d) 或 (B, num_points, d)
+    """
+    P = np.asarray(control_points, dtype=float)
+    n = P.shape[-2] - 1  # 曲线阶数
+    if method == 'basis':
+        return bernstein_basis(n, num_points) @ P
+    if method == 'de_casteljau':
+        return de_casteljau(P, np.linspace(0, 1, num_points))
+    raise ValueError(f"unknown bezier evaluation method '{method}'")
+
+
+def split(control_points, s=0.5):
+    """
+    de Casteljau在参数s处把曲线分为两段, 各层插值的首点/末点即左/右两段的控制点
+    :param control_points: (..., n+1, d)
+    :return: 左段与右段的控制点, 形状同输入
+    """
+    Q = np.asarray(control_points, dtype=float)
+    left, right = [Q[..., 0, :]], [Q[..., -1, :]]
+    for _ in range(Q.shape[-2] - 1):
+        Q = (1 - s) * Q[..., :-1, :] + s * Q[..., 1:, :]
+        left.append(Q[..., 0, :])
+        right.append(Q[..., -1, :])
+    return np.stack(left, axis=-2), np.stack(right[::-1], axis=-2)
+
+
+def flatness(control_points):
+    """
+    曲线偏离首末点连线段的距离上界(由凸包性质得到)
+        控制点在弦上的投影都落在弦内时, 曲线到弦的距离为垂直偏移 Σ B_k(t) d_k (d_0 = d_n = 0),
+        其绝对值不超过 max|d_k| * max_t (1 - (1-t)^n - t^n) = max|d_k| * (1 - 2^(1-n))
+        否则取控制点到弦线段的最大距离
+    :param control_points: (..., n+1, d)
+    :return: (...,)
+    """
+    P = np.asarray(control_points, dtype=float)
+    n = P.shape[-2] - 1
+    a, chord = P[..., :1, :], P[..., -1:, :] - P[..., :1, :]
+    length_sq = np.sum(chord ** 2, axis=-1, keepdims=True)
+    u = np.sum((P - a) * chord, axis=-1, keepdims=True) / np.where(length_sq > 0, length_sq, 1)
+    inside = np.all((u >= 0) & (u <= 1), axis=(-2, -1))
+    perpendicular = np.linalg.norm(P - a - u * chord, axis=-1).max(axis=-1) * (1 - 2.0 ** (1 - n))
+    to_segment = np.linalg.norm(P - a - np.clip(u, 0, 1) * chord, axis=-1).max(axis=-1)
+    return np.where(inside, perpendicular, to_segment)
+
+
+def tessellate(control_points, tol=1e-3, max_depth=20):
+    """
+    自适应细分: 弦偏差上界超过tol的段在中点处二分, 直到每段都足够平直
+    所有待处理的段按层一次性向量化处理(不递归)
+    :param control_points: (n+1, d); 或 (B, n+1, d), 视为首尾相接的分段曲线(如样条的各段)
+    :param tol: 折线与曲线之间允许的最大距离
+    :param max_depth: 最大二分层数
+    :return: 折线点 (K+1, d), 对应参数 (K+1,), 分段曲线时参数为 段号 + 段内t
+    """
+    P = np.asarray(control_points, dtype=float)
+    pending = P.reshape((-1,) + P.shape[-2:])
+    n_curves = len(pending)
+    t0 = np.arange(n_curves, dtype=float)  # 各段的起始参数(含段号)
+    width = 1.0
+    starts, params = [], []
+    for depth in range(max_depth + 1):
+        flat = flatness(pending) <= tol if depth < max_depth else np.ones(len(pending), dtype=bool)
+        starts.append(pending[flat, 0])
+        params.append(t0[flat])
+        if flat.all():
+            break
+        left, right = split(pending[~flat])
+        width /= 2
+        pending = np.concatenate((left, right))
+        t0 = np.concatenate((t0[~flat], t0[~flat] + width))
+    params = np.concatenate(params + [[float(n_curves)]])
+    points = np.concatenate(starts + [P.reshape((-1,) + P.shape[-2:])[-1:, -1]])
+    order = np.argsort(params, kind='stable')
+    return points[order], params[order]
+
+
+if __name__ == '__main__':
+    import time
+
+    def bezier_curve_loop(control_points, num_points=100):
+        """逐点逐控制点累加的原始实现, 用于对比"""
+        n = len(control_points) - 1
+        curve = []
+        for t in np.linspace(0, 1, num_points):
+            point = np.zeros(2)
+            for k in range(n + 1):
+                point += math.factorial(n) / (math.factorial(k) * math.factorial(n - k)) \
+                         * ((1 - t) ** (n - k)) * (t ** k) * control_points[k]
+            curve.append(point)
+        return np.array(curve)
+
+    rng = np.random.default_rng(0)
+    for n in [5, 30]:
+        P = rng.uniform(0, 1, (n + 1, 2))
+        start = time.perf_counter()
+        ref = bezier_curve_loop(P)
+        loop_time = time.perf_counter() - start
+        for method in ['basis', 'de_casteljau']:
+            bezier_curve(P, method=method)
+            start = time.perf_counter()
+            curve = bezier_curve(P, method=method)
+            elapsed = time.perf_counter() - start
+            print(f"n = {n:>2d}, {method:>12s}: {elapsed*1e6:8.1f} us (循环 {loop_time*1e6:8.1f} us), "
+                  f"最大差异 {np.abs(curve - ref).max():.1e}")
+
+    # 批量: 1万条三阶曲线
+    P = rng.uniform(0, 1, (10000, 4, 2))
+    start = time.perf_counter()
+    curves = bezier_curve(P)
+    print(f"批量 {P.shape[0]} 条曲线: {curves.shape}, {(time.perf_counter() - start)*1e3:.2f} ms")
+
+    # 高阶曲线: 基矩阵中的二项式系数超出浮点范围, de Casteljau只做凸组合, 仍然正确
+    n = 1100
+    P = np.column_stack((np.linspace(0, 1, n + 1), np.sin(np.linspace(0, 3, n + 1))))
+    try:
+        bezier_curve(P, 11)
+    except OverflowError as exc:
+        print(f"n = {n}, 基矩阵: {exc}")
+    print(f"n = {n}, de Casteljau: t = 0.5 处 {bezier_curve(P, 11, method='de_casteljau')[5]}")
+
+    # 自适应细分: 平直部分只需少量点, 急弯处加密(长直段末端带一个急弯的曲线)
+    P = np.array([[0.0, 0.0], [4.0, 0.0], [8.0, 0.0], [8.0, 1.0], [7.0, 0.5]])
+    dense = bezier_curve(P, 100000)
+    for tol in [1e-2, 1e-3, 1e-4]:
+        start = time.perf_counter()
+        points, t = tessellate(P, tol)
+        elapsed = time.perf_counter() - start
+        # 实际误差: 稠密采样点到所在折线段的距离
+        k = np.clip(np.searchsorted(t, np.linspace(0, 1, len(dense)), side='right') - 1, 0, len(t) - 2)
+        a, b = points[k], points[k + 1]
+        u = np.clip(np.sum((dense - a) * (b - a), axis=1) / np.sum((b - a) ** 2, axis=1), 0, 1)
+        error = np.linalg.norm(dense - a - u[:, None] * (b - a), axis=1).max()
+        # 达到同样误差所需的均匀采样点数
+        n_uniform = 2
+        while True:
+            uniform = bezier_curve(P, n_uniform)
+            k = np.minimum((np.linspace(0, 1, len(dense)) * (n_uniform - 1)).astype(int), n_uniform - 2)
+            a, b = uniform[k], uniform[k + 1]
+            u = np.clip(np.sum((dense - a) * (b - a), axis=1) / np.sum((b - a) ** 2, axis=1), 0, 1)
+            if np.linalg.norm(dense - a - u[:, None] * (b - a), axis=1).max() <= tol:
+                break
+            n_uniform = int(n_uniform * 1.1) + 1
+        print(f"tol = {tol:.0e}: 自适应 {len(points):>4d} 点 (实际误差 {error:.1e}, {elapsed*1e3:.2f} ms), "
+              f"均匀采样约需 {n_uniform} 点")
@@ -1,4 +1,14 @@
+import os
+import uuid
+import ctypes
+import subprocess
+import tempfile
 import numpy as np
+import casadi as ca
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import scipy.sparse as sp
+from scipy.sparse.linalg import LinearOperator, aslinearoperator, cg, lsqr
 
 class NonlinearModel:
     """表示非线性模型的类，包含残差和Jacobian矩阵的计算。"""
@@ -18,54 +28,475 @@ class NonlinearModel:
         """计算给定参数下的Jacobian矩阵"""
         return self.jacobian(x_data, theta)
 
+    @classmethod
+    def from_casadi(cls, expr, x, theta, codegen=False, build_dir=None, name='model'):
+        """
+        由CasADi符号表达式构造模型: 自动微分得到精确Jacobian, 求值不经过Python逐样本循环
+        :param expr: 单个样本的模型输出(标量SX)
+        :param x: 单个样本的自变量(标量或d维SX), 对应x_data为 (m,) 或 (m, d)
+        :param theta: 参数向量SX (p,)
+        :param codegen: False: 用Function.map在CasADi虚拟机中对所有样本求值
+                        True:  生成C代码并编译为共享库, 由C循环直接在numpy数组上逐样本求值(零拷贝)
+        :param build_dir: 生成代码的目录; 默认在临时目录中编译, 加载共享库后即删除该目录.
+                          给出时生成的C代码与共享库保留在该目录中(由调用者清理)
+        """
+        f = ca.Function(name, [x, theta], [expr])
+        J = ca.Function(name + '_jac', [x, theta], [ca.densify(ca.jacobian(expr, theta))])
+        n_in, n_params = x.numel(), theta.numel()
+        if codegen:
+            if build_dir is None:
+                # 共享库加载(dlopen)后文件即可删除, 映射仍然有效
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    func, jacobian = cls._compile(f, J, n_in, n_params, tmp_dir, name)
+            else:
+                func, jacobian = cls._compile(f, J, n_in, n_params, build_dir, name)
+        else:
+            maps = {}
+
+            def mapped(m):
+                # 按样本数缓存映射后的函数
+                if m not in maps:
+                    maps[m] = (f.map(m), J.map(m))
+                return maps[m]
+
+            def func(x_data, theta_value):
+                x_data = np.asarray(x_data, dtype=float).reshape(-1, n_in)
+                return mapped(len(x_data))[0](x_data.T, theta_value).full().ravel()
+
+            def jacobian(x_data, theta_value):
+                x_data = np.asarray(x_data, dtype=float).reshape(-1, n_in)
+                return mapped(len(x_data))[1](x_data.T, theta_value).full().reshape(len(x_data), n_params)
+
+        model = cls(func, jacobian)
+        model.casadi_functions = (f, J)
+        return model
+
+    @staticmethod
+    def _compile(f, J, n_in, n_params, build_dir, name):
+        """把f与J生成C代码, 附加逐样本循环的批量入口, 编译为共享库后用ctypes调用"""
+        codegen = ca.CodeGenerator(name + '.c')
+        codegen.add(f)
+        codegen.add(J)
+        codegen.generate(build_dir + os.sep)
+        batch = [f'#include "{name}.c"']
+        for fn, n_out in ((f.name(), 1), (J.name(), n_params)):
+            batch.append(f"""
+int {fn}_batch(const casadi_real* x, const casadi_real* theta, casadi_real* out, casadi_int m) {{
+  casadi_int sz_arg, sz_res, sz_iw, sz_w, i;
+  {fn}_work(&sz_arg, &sz_res, &sz_iw, &sz_w);
+  const casadi_real* arg[sz_arg + 1];
+  casadi_real* res[sz_res + 1];
+  casadi_int iw[sz_iw + 1];
+  casadi_real w[sz_w + 1];
+  arg[1] = theta;
+  for (i = 0; i < m; ++i) {{
+    arg[0] = x + i * {n_in};
+    res[0] = out + i * {n_out};
+    if ({fn}(arg, res, iw, w, 0)) return 1;
+  }}
+  return 0;
+}}""")
+        source = os.path.join(build_dir, name + '_batch.c')
+        # 每次编译使用唯一的库文件名: 同一路径的库已加载时, ctypes.CDLL会直接返回旧的库
+        library = os.path.join(build_dir, f'{name}_{uuid.uuid4().hex[:8]}.so')
+        with open(source, 'w') as fp:
+            fp.write('\n'.join(batch))
+        subprocess.run(['cc', '-fPIC', '-shared', '-O3', source, '-o', library, '-lm'], check=True)
+        lib = ctypes.CDLL(library)
+
+        def wrap(fn, n_out):
+            c_fn = getattr(lib, fn + '_batch')
+            c_fn.restype = ctypes.c_int
+            c_fn.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_longlong]
+
+            def call(x_data, theta_value):
+                x_data = np.ascontiguousarray(x_data, dtype=float).reshape(-1, n_in)
+                theta_value = np.ascontiguousarray(theta_value, dtype=float)
+                out = np.empty((len(x_data), n_out))
+                if c_fn(x_data.ctypes.data, theta_value.ctypes.data, out.ctypes.data, len(x_data)):
+                    raise RuntimeError(f"evaluation of '{fn}' failed")
+                return out if n_out > 1 else out.ravel()
+            call.lib = lib  # 保持共享库的引用
+            return call
+
+        return wrap(f.name(), 1), wrap(J.name(), n_params)
+
+
+class CachedModel:
+    """
+    固定数据上的模型求值缓存: 以theta为键记忆残差与Jacobian, 步长被拒绝后回到同一theta时不再重复计算
+    同时统计实际求值次数与缓存命中次数
+    """
+    def __init__(self, model, x_data, y_data, maxsize=4):
+        self.model = model
+        self.x_data = x_data
+        self.y_data = y_data
+        self.maxsize = maxsize
+        self._residuals, self._jacobians = OrderedDict(), OrderedDict()
+        self.counts = {'residual_evals': 0, 'jacobian_evals': 0, 'residual_hits': 0, 'jacobian_hits': 0}
+
+    def _lookup(self, cache, kind, theta, evaluate):
+        key = np.asarray(theta, dtype=float).tobytes()
+        if key in cache:
+            cache.move_to_end(key)
+            self.counts[kind + '_hits'] += 1
+            return cache[key]
+        value = evaluate()
+        self.counts[kind + '_evals'] += 1
+        cache[key] = value
+        if len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return value
+
+    def residuals(self, theta):
+        return self._lookup(self._residuals, 'residual', theta,
+                            lambda: self.model.residuals(self.x_data, self.y_data, theta))
+
+    def jacobian_matrix(self, theta):
+        return self._lookup(self._jacobians, 'jacobian', theta,
+                            lambda: self.model.jacobian_matrix(self.x_data, theta))
+
 
 class LevenbergMarquardt:
     """Levenberg-Marquardt算法的实现类。"""
-    def __init__(self, model, tolerance=1e-6, max_iters=100, lambda_init=0.01):
+    def __init__(self, model, tolerance=1e-6, max_iters=100, lambda_init=0.01,
+                 jacobian_update='exact', jacobian_refresh=10):
         """
         :param model: 待拟合的非线性模型对象
         :param tolerance: 收敛阈值
         :param max_iters: 最大迭代次数
         :param lambda_init: 初始阻尼因子lambda
+        :param jacobian_update: 'exact': 每次迭代使用真实Jacobian
+                                'broyden': 用每个试探步做秩1的Broyden更新, 只在每jacobian_refresh次更新后、
+                                           近似Jacobian下步长被拒绝(停滞)或判定收敛前重新计算真实Jacobian
         """
+        if jacobian_update not in ('exact', 'broyden'):
+            raise ValueError(f"unknown jacobian update '{jacobian_update}'")
         self.model = model
         self.tolerance = tolerance
         self.max_iters = max_iters
         self.lambda_init = lambda_init
+        self.jacobian_update = jacobian_update
+        self.jacobian_refresh = jacobian_refresh
+        self.stats = {}
     
     def fit(self, x_data, y_data, initial_theta):
         """使用Levenberg-Marquardt算法拟合模型参数"""
         theta = initial_theta
         lambda_factor = self.lambda_init
+        evaluator = CachedModel(self.model, x_data, y_data)
+        broyden = self.jacobian_update == 'broyden'
+        jacobian, age, n_broyden = None, 0, 0  # age: 当前Jacobian自上次真实计算以来的Broyden更新次数
+        n_skipped = 0  # 使用割线更新后的Jacobian而跳过的真实Jacobian计算次数
         
         for i in range(self.max_iters):
-            residuals = self.model.residuals(x_data, y_data, theta)
-            jacobian = self.model.jacobian_matrix(x_data, theta)
+            residuals = evaluator.residuals(theta)
+            if not broyden or jacobian is None or age >= self.jacobian_refresh:
+                jacobian, age = evaluator.jacobian_matrix(theta), 0
+            elif age > 0:
+                n_skipped += 1
             
-            # 计算Hessian近似
-            H = jacobian.T @ jacobian
-            
-            # 更新公式中增加lambda项
-            delta_theta = np.linalg.inv(H + lambda_factor * np.eye(H.shape[0])) @ jacobian.T @ residuals
+            # 求解阻尼正规方程 (J^T J + lambda I) delta = J^T r
+            delta_theta = self.solve_step(jacobian, residuals, lambda_factor)
             
             # 更新参数
             theta_new = theta + delta_theta
             
             # 计算新的残差
-            residuals_new = self.model.residuals(x_data, y_data, theta_new)
+            residuals_new = evaluator.residuals(theta_new)
             
-            # 判断是否收敛
+            # 判断是否收敛(近似Jacobian给出的小步长不可信, 先换成真实Jacobian再判断)
             if np.linalg.norm(delta_theta) < self.tolerance:
-                print(f"迭代收敛，共迭代 {i+1} 次")
-                return theta_new
+                if age == 0:
+                    print(f"迭代收敛，共迭代 {i+1} 次")
+                    self._record_stats(evaluator, i + 1, n_broyden, n_skipped)
+                    return theta_new
+                jacobian = None
+                continue
+            
+            improved = np.linalg.norm(residuals_new) < np.linalg.norm(residuals)
+            if broyden:
+                if not improved:
+                    # 步长被拒绝时theta不变: 刚计算的真实Jacobian(age == 0)继续使用;
+                    # 近似Jacobian下被拒绝视为停滞, 下一次迭代重新计算真实Jacobian
+                    if age > 0:
+                        jacobian = None
+                else:
+                    # 割线条件 J_new delta = f(theta_new) - f(theta) = r - r_new
+                    jacobian = self.broyden_update(jacobian, delta_theta, residuals - residuals_new)
+                    age += 1
+                    n_broyden += 1
             
             # 动态调整lambda
-            if np.linalg.norm(residuals_new) < np.linalg.norm(residuals):
+            if improved:
                 lambda_factor /= 10  # 减少lambda
                 theta = theta_new
             else:
                 lambda_factor *= 10  # 增加lambda
         
+        print("达到最大迭代次数，未能完全收敛。")
+        self._record_stats(evaluator, self.max_iters, n_broyden, n_skipped)
+        return theta
+
+    @staticmethod
+    def broyden_update(jacobian, delta_theta, delta_f):
+        """秩1的Broyden更新 J + (delta_f - J delta) delta^T / (delta^T delta), 仅适用于稠密Jacobian"""
+        if not isinstance(jacobian, np.ndarray):
+            raise ValueError("broyden jacobian update requires a dense jacobian")
+        return jacobian + np.outer(delta_f - jacobian @ delta_theta, delta_theta / (delta_theta @ delta_theta))
+
+    def _record_stats(self, evaluator, iterations, n_broyden, n_skipped):
+        """
+        单次fit的求值统计: 实际求值次数、缓存命中次数、迭代次数与Broyden更新次数
+        evaluations_saved 以"每次迭代都直接求值"为基准: 缓存命中 + 因割线更新而跳过的真实Jacobian计算
+        (Broyden模式可能增加迭代次数, 净收益仍需与同一问题上'exact'模式的求值次数对比)
+        """
+        counts = evaluator.counts
+        self.stats = dict(counts, iterations=iterations, broyden_updates=n_broyden, jacobian_skipped=n_skipped,
+                          evaluations_saved=counts['residual_hits'] + counts['jacobian_hits'] + n_skipped)
+
+    def solve_step(self, jacobian, residuals, lambda_factor):
+        """稠密求解: 参数较少时直接分解 p x p 的正规方程"""
+        # 计算Hessian近似
+        H = jacobian.T @ jacobian
+        
+        # 更新公式中增加lambda项
+        return np.linalg.solve(H + lambda_factor * np.eye(H.shape[0]), jacobian.T @ residuals)
+
+
+class SparseLevenbergMarquardt(LevenbergMarquardt):
+    """
+    大规模LM: Jacobian可以是scipy.sparse矩阵, 或只提供 J v 与 J^T v 的LinearOperator(雅可比-向量积)
+    阻尼正规方程用预条件迭代法求解, 不形成也不分解 J^T J:
+        'cg':   在 (J^T J + lambda I) delta = J^T r 上做共轭梯度, Jacobi预条件 diag(J^T J) + lambda
+        'lsqr': 在等价的最小二乘 min ||J delta - r||^2 + lambda ||delta||^2 上做LSQR, 按列范数缩放预条件
+    """
+    def __init__(self, model, tolerance=1e-6, max_iters=100, lambda_init=0.01,
+                 inner_solver='cg', inner_tol=1e-10, inner_max_iters=None):
+        """
+        :param inner_solver: 内层迭代求解器, 'cg' 或 'lsqr'
+        :param inner_tol: 内层求解的相对残差阈值
+        :param inner_max_iters: 内层最大迭代次数, 默认由scipy决定
+        """
+        super().__init__(model, tolerance, max_iters, lambda_init)
+        if inner_solver not in ('cg', 'lsqr'):
+            raise ValueError(f"unknown inner solver '{inner_solver}'")
+        self.inner_solver = inner_solver
+        self.inner_tol = inner_tol
+        self.inner_max_iters = inner_max_iters
+        self.inner_iters = []  # 每次外层迭代的内层迭代次数
+
+    @staticmethod
+    def column_norms_sq(jacobian):
+        """diag(J^T J), 即各列的平方范数; LinearOperator无法廉价得到时返回None"""
+        if sp.issparse(jacobian):
+            return np.asarray(jacobian.multiply(jacobian).sum(axis=0)).ravel()
+        if isinstance(jacobian, np.ndarray):
+            return np.einsum('ij,ij->j', jacobian, jacobian)
+        return None
+
+    def solve_step(self, jacobian, residuals, lambda_factor):
+        J = aslinearoperator(jacobian)
+        m, n = J.shape
+        diag = self.column_norms_sq(jacobian)
+        if diag is None:
+            diag = np.zeros(n)
+        counter = [0]
+
+        def count(_):
+            counter[0] += 1
+
+        if self.inner_solver == 'cg':
+            normal = LinearOperator((n, n), matvec=lambda v: J.rmatvec(J.matvec(v)) + lambda_factor * v, dtype=float)
+            M = LinearOperator((n, n), matvec=lambda v: v / (diag + lambda_factor), dtype=float)
+            delta, _ = cg(normal, J.rmatvec(residuals), rtol=self.inner_tol, maxiter=self.inner_max_iters,
+                          M=M, callback=count)
+        else:
+            # 增广系统 [J D; sqrt(lambda) D] y = [r; 0], delta = D y, D使增广矩阵各列为单位范数
+            d = 1.0 / np.sqrt(diag + lambda_factor)
+            s = np.sqrt(lambda_factor)
+            augmented = LinearOperator(
+                (m + n, n),
+                matvec=lambda y: np.concatenate((J.matvec(d * y), s * d * y)),
+                rmatvec=lambda z: d * (J.rmatvec(z[:m]) + s * z[m:]),
+                dtype=float)
+            result = lsqr(augmented, np.concatenate((residuals, np.zeros(n))),
+                          atol=self.inner_tol, btol=self.inner_tol, iter_lim=self.inner_max_iters)
+            delta, counter[0] = d * result[0], result[2]
+        self.inner_iters.append(counter[0])
+        return delta
+
+
+class BatchedLevenbergMarquardt(LevenbergMarquardt):
+    """
+    批量LM: 同时拟合B个互相独立的小规模问题(参数维数p相同, 数据按问题堆叠)
+    每个问题的迭代与fit完全一致, 但残差、Jacobian与阻尼步对所有活动问题一次性计算:
+        model.func(x (B, m), theta (B, p)) -> (B, m), model.jacobian(x, theta) -> (B, m, p)
+        阻尼正规方程为 (B, p, p) 的批量线性方程组
+    每个问题有各自的lambda与收敛标记, 已收敛的问题退出活动集, 之后不再计算
+    """
+    def fit(self, x_data, y_data, initial_theta):
+        """
+        :param x_data, y_data: (B, m) 的堆叠数据
+        :param initial_theta: (B, p) 或所有问题共用的 (p,) 初值
+        :return: (B, p) 的参数, (B,) 的收敛标记
+        """
+        x_data = np.asarray(x_data, dtype=float)
+        y_data = np.asarray(y_data, dtype=float)
+        B = len(y_data)
+        theta = np.array(np.broadcast_to(np.asarray(initial_theta, dtype=float), (B, np.shape(initial_theta)[-1])))
+        lambda_factor = np.full(B, float(self.lambda_init))
+        converged = np.zeros(B, dtype=bool)
+        self.iterations = np.full(B, self.max_iters)
+        eye = np.eye(theta.shape[1])
+
+        active = np.arange(B)
+        for i in range(self.max_iters):
+            x, y, th, lam = x_data[active], y_data[active], theta[active], lambda_factor[active]
+            residuals = self.model.residuals(x, y, th)
+            jacobian = self.model.jacobian_matrix(x, th)
+
+            # (B, p, p) 的批量阻尼正规方程
+            H = np.einsum('bmi,bmj->bij', jacobian, jacobian)
+            g = np.einsum('bmi,bm->bi', jacobian, residuals)
+            delta_theta = np.linalg.solve(H + lam[:, None, None] * eye, g[..., None])[..., 0]
+            theta_new = th + delta_theta
+            residuals_new = self.model.residuals(x, y, theta_new)
+
+            done = np.linalg.norm(delta_theta, axis=1) < self.tolerance
+            improved = np.linalg.norm(residuals_new, axis=1) < np.linalg.norm(residuals, axis=1)
+            accept = done | improved
+            theta[active[accept]] = theta_new[accept]
+            lambda_factor[active] = np.where(improved, lam / 10, lam * 10)
+            converged[active[done]] = True
+            self.iterations[active[done]] = i + 1
+
+            active = active[~done]
+            if len(active) == 0:
+                break
+
+        print(f"{converged.sum()}/{B} 个问题收敛, 最多迭代 {self.iterations.max()} 次")
+        return theta, converged
+
+
+class StreamingLevenbergMarquardt(LevenbergMarquardt):
+    """
+    流式LM: 数据按块读取(生成器或内存映射数组), 逐块累加 J^T J, J^T r 与代价, 内存只占 O(p^2)
+    每次迭代只遍历一次数据: 在试探点theta_new上同时累加代价与正规方程, 步长被接受时直接用于下一次迭代
+    """
+    def __init__(self, model, tolerance=1e-6, max_iters=100, lambda_init=0.01, chunk_size=1_000_000, workers=None):
+        """
+        :param chunk_size: 对数组数据切块时每块的样本数
+        :param workers: 线程数, 大于1时用线程池并行处理数据块. 数组数据平均分为workers段, 每个线程独立累加一段;
+                        生成器数据按块流水处理. 只有模型的numpy运算(ufunc、BLAS)释放GIL的部分可以并行,
+                        且受内存带宽与内存映射的缺页读取限制, 不保证加速, 使用前应与workers=1实测对比
+        """
+        super().__init__(model, tolerance, max_iters, lambda_init)
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.passes = 0  # 数据遍历次数
+
+    def chunks(self, data):
+        """
+        :param data: (x_data, y_data) 数组或内存映射数组, 或每次调用返回一个 (x, y) 块迭代器的可调用对象
+        """
+        if callable(data):
+            return data()
+        x_data, y_data = data
+        return ((x_data[i:i + self.chunk_size], y_data[i:i + self.chunk_size])
+                for i in range(0, len(y_data), self.chunk_size))
+
+    def _chunk_terms(self, chunk, theta):
+        x, y = chunk
+        x, y = np.asarray(x), np.asarray(y)
+        residuals = self.model.residuals(x, y, theta)
+        jacobian = self.model.jacobian_matrix(x, theta)
+        return jacobian.T @ jacobian, jacobian.T @ residuals, residuals @ residuals
+
+    def _span_terms(self, x_data, y_data, theta):
+        """在一个线程内按chunk_size逐块累加一段连续数据, 线程之间只在结束时汇总一次"""
+        p = len(theta)
+        H, g, cost = np.zeros((p, p)), np.zeros(p), 0.0
+        for i in range(0, len(y_data), self.chunk_size):
+            dH, dg, dc = self._chunk_terms((x_data[i:i + self.chunk_size], y_data[i:i + self.chunk_size]), theta)
+            H += dH
+            g += dg
+            cost += dc
+        return H, g, cost
+
+    def accumulate(self, data, theta):
+        """
+        遍历一次数据
+        :return: J^T J, J^T r, 代价 ||r||^2
+        """
+        p = len(theta)
+        H, g, cost = np.zeros((p, p)), np.zeros(p), 0.0
+        self.passes += 1
+        if not self.workers or self.workers <= 1:
+            for chunk in self.chunks(data):
+                dH, dg, dc = self._chunk_terms(chunk, theta)
+                H += dH
+                g += dg
+                cost += dc
+            return H, g, cost
+
+        if not callable(data):
+            # 数组数据: 每个线程处理一段连续数据, 避免逐块提交任务的调度开销
+            x_data, y_data = data
+            bounds = np.linspace(0, len(y_data), self.workers + 1).astype(int)
+            with ThreadPoolExecutor(self.workers) as pool:
+                futures = [pool.submit(self._span_terms, x_data[lo:hi], y_data[lo:hi], theta)
+                           for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+                for future in futures:
+                    dH, dg, dc = future.result()
+                    H += dH
+                    g += dg
+                    cost += dc
+            return H, g, cost
+
+        # 生成器数据: 最多同时有 2*workers 个数据块在处理中, 生成器不会被一次性读完
+        with ThreadPoolExecutor(self.workers) as pool:
+            pending = []
+            for chunk in self.chunks(data):
+                pending.append(pool.submit(self._chunk_terms, chunk, theta))
+                if len(pending) >= 2 * self.workers:
+                    dH, dg, dc = pending.pop(0).result()
+                    H += dH
+                    g += dg
+                    cost += dc
+            for future in pending:
+                dH, dg, dc = future.result()
+                H += dH
+                g += dg
+                cost += dc
+        return H, g, cost
+
+    def fit(self, data, initial_theta):
+        """
+        :param data: 见chunks
+        """
+        theta = np.asarray(initial_theta, dtype=float)
+        lambda_factor = self.lambda_init
+        self.passes = 0
+        H, g, cost = self.accumulate(data, theta)
+
+        for i in range(self.max_iters):
+            delta_theta = np.linalg.solve(H + lambda_factor * np.eye(len(theta)), g)
+            theta_new = theta + delta_theta
+
+            # 判断是否收敛
+            if np.linalg.norm(delta_theta) < self.tolerance:
+                print(f"迭代收敛，共迭代 {i+1} 次, 遍历数据 {self.passes} 次")
+                return theta_new
+
+            # 试探点上的代价与正规方程一起累加
+            H_new, g_new, cost_new = self.accumulate(data, theta_new)
+            if cost_new < cost:
+                lambda_factor /= 10
+                theta, H, g, cost = theta_new, H_new, g_new, cost_new
+            else:
+                lambda_factor *= 10
+
         print("达到最大迭代次数，未能完全收敛。")
         return theta
 
@@ -96,4 +527,132 @@ if __name__ == "__main__":
     
     # 执行拟合
     optimal_theta = lm_solver.fit(x_data, y_data, initial_theta)
-    print("最优参数:", optimal_theta)
\ No newline at end of file
+    print("最优参数:", optimal_theta)
+    print("求值统计:", lm_solver.stats)
+
+    # CasADi符号模型: 自动微分得到Jacobian, 可选编译为C代码
+    x_sym = ca.SX.sym('x')
+    theta_sym = ca.SX.sym('theta', 2)
+    for codegen in [False, True]:
+        casadi_model = NonlinearModel.from_casadi(theta_sym[0] * ca.exp(theta_sym[1] * x_sym), x_sym, theta_sym,
+                                                  codegen=codegen)
+        print(f"最优参数(CasADi, codegen={codegen}):",
+              LevenbergMarquardt(casadi_model).fit(x_data, y_data, initial_theta))
+
+    # Broyden秩1更新(默认关闭): 少算真实Jacobian, 但近似Jacobian通常使迭代次数增加
+    broyden_solver = LevenbergMarquardt(model, jacobian_update='broyden')
+    print("最优参数(Broyden):", broyden_solver.fit(x_data, y_data, initial_theta))
+    print("求值统计(Broyden):", broyden_solver.stats)
+    diff = {key: broyden_solver.stats[key] - lm_solver.stats[key]
+            for key in ('iterations', 'residual_evals', 'jacobian_evals')}
+    print("相对exact模式: " + ", ".join(f"{key} {value:+d}" for key, value in diff.items()))
+    # 净收益取决于一次Jacobian与一次残差求值的耗时之比(本例解析Jacobian很便宜, 应使用exact模式)
+    if diff['jacobian_evals'] < 0:
+        print(f"Jacobian耗时超过残差的 {max(diff['residual_evals'], 0) / -diff['jacobian_evals']:.1f} 倍时Broyden模式才有净收益")
+    else:
+        print("Broyden模式没有减少Jacobian计算, 没有净收益")
+
+    # 批量示例: 上万组独立的 y = a * exp(b * x) 拟合, 与逐个调用fit对比
+    import io
+    import time
+    import contextlib
+    B = 10000
+    a_true = np.random.uniform(1, 3, B)
+    b_true = np.random.uniform(-2, 3, B)
+    x_batch = np.tile(x_data, (B, 1))
+    y_batch = a_true[:, None] * np.exp(b_true[:, None] * x_batch) + np.random.normal(0, 0.1, size=x_batch.shape)
+
+    def batch_func(x, theta):
+        return theta[:, 0:1] * np.exp(theta[:, 1:2] * x)
+
+    def batch_jacobian(x, theta):
+        e = np.exp(theta[:, 1:2] * x)
+        return np.stack((e, theta[:, 0:1] * x * e), axis=-1)
+
+    batch_solver = BatchedLevenbergMarquardt(NonlinearModel(batch_func, batch_jacobian))
+    start = time.perf_counter()
+    theta_batch, converged = batch_solver.fit(x_batch, y_batch, initial_theta)
+    batch_time = time.perf_counter() - start
+
+    n_loop = 200
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        theta_loop = np.array([lm_solver.fit(x_data, y_batch[k], initial_theta) for k in range(n_loop)])
+    loop_time = (time.perf_counter() - start) * B / n_loop
+    print(f"批量: {batch_time:.3f} s, 逐个调用(按{n_loop}组外推): {loop_time:.3f} s, "
+          f"前{n_loop}组最大差异 {np.abs(theta_batch[:n_loop] - theta_loop).max():.2e}")
+
+    # 流式示例: 存放在磁盘上的内存映射数据集, 以及按块生成数据的生成器
+    m = 5_000_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'samples.dat')
+        samples = np.memmap(path, dtype=np.float64, mode='w+', shape=(2, m))
+        for i in range(0, m, 1_000_000):
+            xs = np.random.uniform(0, 1, min(1_000_000, m - i))
+            samples[0, i:i + len(xs)] = xs
+            samples[1, i:i + len(xs)] = 2 * np.exp(3 * xs) + np.random.normal(0, 0.1, size=xs.shape)
+        samples.flush()
+        samples = np.memmap(path, dtype=np.float64, mode='r', shape=(2, m))
+
+        for workers in [1, 4]:
+            stream_solver = StreamingLevenbergMarquardt(model, chunk_size=500_000, workers=workers)
+            start = time.perf_counter()
+            theta = stream_solver.fit((samples[0], samples[1]), initial_theta)
+            print(f"内存映射 {m} 个样本 (线程 {workers}, CPU {os.cpu_count()}): {theta}, "
+                  f"{time.perf_counter() - start:.2f} s")
+        del samples  # 释放映射后再删除临时目录
+
+    def generator(n_chunks=20, size=500_000, seed=0):
+        # 每次遍历用相同的种子重新生成同一组数据块
+        rng = np.random.default_rng(seed)
+        for _ in range(n_chunks):
+            xs = rng.uniform(0, 1, size)
+            yield xs, 2 * np.exp(3 * xs) + rng.normal(0, 0.1, size=size)
+
+    theta = StreamingLevenbergMarquardt(model, workers=4).fit(generator, initial_theta)
+    print(f"生成器 {20 * 500_000} 个样本: {theta}")
+
+    # 大规模示例: 路径平滑, 每个路径点的坐标都是待估参数(数千个路径点 -> 上万个参数)
+    #   数据项   w_d (p_i - q_i)               贴近带噪声的原始路径点q
+    #   平滑项   w_s (p_{i-1} - 2 p_i + p_{i+1}) 二阶差分
+    #   等间距项 w_l ||p_{i+1} - p_i||          段长趋于原始路径的平均段长(非线性)
+    w_d, w_s, w_l = 1.0, 10.0, 1.0
+
+    def path_func(q, theta):
+        P = theta.reshape(-1, 2)
+        seg = np.diff(P, axis=0)
+        return np.concatenate((w_d * theta, w_s * (P[:-2] - 2 * P[1:-1] + P[2:]).ravel(),
+                               w_l * np.linalg.norm(seg, axis=1)))
+
+    def path_jacobian(q, theta):
+        P = theta.reshape(-1, 2)
+        n = len(P)
+        D2 = sp.diags([1.0, -2.0, 1.0], [0, 1, 2], shape=(n - 2, n))
+        seg = np.diff(P, axis=0)
+        u = seg / np.linalg.norm(seg, axis=1, keepdims=True)
+        rows = np.repeat(np.arange(n - 1), 4)
+        cols = (2 * np.arange(n - 1)[:, None] + np.array([0, 1, 2, 3])).ravel()
+        vals = np.hstack((-u, u)).ravel()
+        J_len = sp.csr_matrix((vals, (rows, cols)), shape=(n - 1, 2 * n))
+        return sp.vstack((w_d * sp.identity(2 * n), w_s * sp.kron(D2, sp.identity(2)), w_l * J_len)).tocsr()
+
+    path_model = NonlinearModel(path_func, path_jacobian)
+    for n in [200, 5000]:
+        s = np.linspace(0, 4 * np.pi, n)
+        q = np.column_stack((s, np.sin(s))) + np.random.normal(0, 0.05, size=(n, 2))
+        L = np.mean(np.linalg.norm(np.diff(q, axis=0), axis=1))
+        target = np.concatenate((w_d * q.ravel(), np.zeros(2 * (n - 2)), w_l * L * np.ones(n - 1)))
+
+        # 代价在前十余次迭代内即已收敛, 之后沿路径方向的滑动模态只带来微小改进, 故限制外层迭代次数
+        solvers = [('cg', SparseLevenbergMarquardt(path_model, max_iters=20, inner_solver='cg')),
+                   ('lsqr', SparseLevenbergMarquardt(path_model, max_iters=20, inner_solver='lsqr'))]
+        if n <= 200:
+            dense_model = NonlinearModel(path_func, lambda q, theta: path_jacobian(q, theta).toarray())
+            solvers.insert(0, ('dense', LevenbergMarquardt(dense_model, max_iters=20)))
+        for name, solver in solvers:
+            start = time.perf_counter()
+            theta = solver.fit(q, target, q.ravel())
+            elapsed = time.perf_counter() - start
+            cost = np.linalg.norm(path_model.residuals(q, target, theta)) ** 2
+            inner = f", 内层迭代 {sum(solver.inner_iters)}" if name != 'dense' else ''
+            print(f"{n} 个路径点 [{name}]: 代价 {cost:.6f}, 用时 {elapsed:.3f} s{inner}")
\ No newline at end of file
@@ -1,95 +1,36 @@
-import casadi as ca
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation, PillowWriter
+from matplotlib.animation import FuncAnimation
 import matplotlib.gridspec as gridspec
+from collocation_qp import block_push_qp, solve_qp
+from fast_anim import export_animation
 
 
 # 设置中文显示
 plt.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"]
 plt.rcParams["axes.unicode_minus"] = False
 
-def explicit_qp_solver_with_visualization(N=10):
-    """使用显式QP格式求解并可视化物块轨迹优化问题，显示控制点和状态点"""
+def explicit_qp_solver_with_visualization(N=10, solver='qpoases'):
+    """
+    使用显式QP格式求解并可视化物块轨迹优化问题，显示控制点和状态点
+    :param solver: 'qpoases' 等CasADi QP求解器, 或 'banded' (带状KKT求解器, O(N))
+    """
     # 时间离散化
     t = np.linspace(0, 1, N)
-    h = t[1:] - t[:-1]  # 时间间隔
     n_vars = 3 * N      # 决策变量总数: 每个配点有x, v, u三个变量
     
-    # 1. 显式构建二次项系数矩阵Q
-    Q = np.zeros((n_vars, n_vars))
-    # 第一个u和最后一个u的系数
-    Q[2, 2] = h[0]  # u0
-    Q[3*N-1, 3*N-1] = h[-1]  # u_{N-1}
-    # 中间u的系数
-    for k in range(1, N-1):
-        Q[3*k + 2, 3*k + 2] = h[k-1] + h[k]  # uk
+    # 1. 以三元组形式稀疏组装二次项系数矩阵H、约束矩阵A和向量b (见collocation_qp.py)
+    #    目标函数: 0.5*z^T H z, 约束: A z = b
+    H, A, b = block_push_qp(t)
     
-    # 2. 显式构建约束矩阵A和向量b
-    n_constraints = 2*(N-1) + 4  # 约束总数
-    A = np.zeros((n_constraints, n_vars))
-    b = np.zeros(n_constraints)
-    
-    # 2.1 运动学约束
-    constraint_idx = 0
-    for k in range(N-1):
-        # x约束: x_{k+1} - x_k - h_k*(v_k + v_{k+1})/2 = 0
-        A[constraint_idx, 3*k] = -1
-        A[constraint_idx, 3*k + 1] = -h[k]/2
-        A[constraint_idx, 3*(k+1)] = 1
-        A[constraint_idx, 3*(k+1) + 1] = -h[k]/2
-        constraint_idx += 1
-        
-        # v约束: v_{k+1} - v_k - h_k*(u_k + u_{k+1})/2 = 0
-        A[constraint_idx, 3*k + 1] = -1
-        A[constraint_idx, 3*k + 2] = -h[k]/2
-        A[constraint_idx, 3*(k+1) + 1] = 1
-        A[constraint_idx, 3*(k+1) + 2] = -h[k]/2
-        constraint_idx += 1
-    
-    # 2.2 边界约束
-    A[constraint_idx, 0] = 1          # x0 = 0
-    b[constraint_idx] = 0
-    constraint_idx += 1
-    
-    A[constraint_idx, 3*(N-1)] = 1    # x_{N-1} = 1
-    b[constraint_idx] = 1
-    constraint_idx += 1
-    
-    A[constraint_idx, 1] = 1          # v0 = 0
-    b[constraint_idx] = 0
-    constraint_idx += 1
-    
-    A[constraint_idx, 3*(N-1) + 1] = 1  # v_{N-1} = 0
-    b[constraint_idx] = 0
-    
-    # 3. 构建QP问题 (显式矩阵形式) 3Nx1
-    z = ca.SX.sym('z', n_vars)
-    # 目标函数: 0.5*z^T Q z
-    cost = 0.5 * ca.dot(z, Q @ z)
-    # 约束: A z = b (通过设置lbg=ubg=b实现)
-    constraints = A @ z
-    
-    # 定义QP问题结构
-    qp = {
-        'x': z,        # 决策变量
-        'f': cost,     # 目标函数
-        'g': constraints  # 约束表达式
-    }
-    
-    # 选择求解器
-    solver = ca.qpsol('solver', 'qpoases', qp)
-    
-    # 初始猜测值
+    # 2. 初始猜测值
     x0 = np.zeros(n_vars)
-    for k in range(N):
-        x0[3*k] = t[k]    # x初始猜测: x(t)=t
-        x0[3*k + 1] = 1   # v初始猜测: v(t)=1
-        x0[3*k + 2] = 0   # u初始猜测: u(t)=0
+    x0[0::3] = t   # x初始猜测: x(t)=t
+    x0[1::3] = 1   # v初始猜测: v(t)=1
+    x0[2::3] = 0   # u初始猜测: u(t)=0
     
-    # 求解QP问题 (等式约束 A z = b)
-    sol = solver(x0=x0, lbg=b, ubg=b)
-    z_opt = sol['x'].full().flatten()
+    # 3. 求解QP问题 (等式约束 A z = b)
+    z_opt = solve_qp(H, A, b, x0=x0, solver=solver)
     
     # 提取结果
     x = z_opt[::3]   # 位置
@@ -181,7 +122,10 @@ def explicit_qp_solver_with_visualization(N=10):
         
         return (block, trail, time_text, pos_marker, vel_marker, force_marker)
     
-    # 创建动画
+    # 离屏导出GIF (Agg渲染, 只重绘update返回的艺术家对象, 多进程并行, 流式写入)
+    export_animation(fig, update, len(t), 'block_trajectory_points.gif', fps=10)
+    
+    # 屏幕显示动画
     ani = FuncAnimation(
         fig, update,
         frames=len(t),
@@ -189,10 +133,6 @@ def explicit_qp_solver_with_visualization(N=10):
         blit=True,
         repeat=False
     )
-    
-    # 保存为GIF
-    writer = PillowWriter(fps=10)
-    ani.save('block_trajectory_points.gif', writer=writer)
     plt.show()
 
 # 运行程序
@@ -1,147 +1,68 @@
-import casadi as ca
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation, PillowWriter
+from matplotlib.animation import FuncAnimation
 import matplotlib.gridspec as gridspec
+from collocation_qp import block_push_qp, solve_qp
+from fast_anim import export_animation
+from dense_output import DenseOutput
 
 
 # 设置中文显示
 plt.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"]
 plt.rcParams["axes.unicode_minus"] = False
 
-def trapezoidal_collocation_with_extension(N=20):
-    """梯形配点法轨迹优化，扩展到N+(N-1)个点并区分显示"""
+def trapezoidal_collocation_with_extension(N=20, solver='qpoases'):
+    """
+    梯形配点法轨迹优化，扩展到N+(N-1)个点并区分显示
+    :param solver: 'qpoases' 等CasADi QP求解器, 或 'banded' (带状KKT求解器, O(N))
+    """
     # 1. 时间离散化
     t = np.linspace(0, 1, N)  # 原始配点时间
-    h = t[1:] - t[:-1]        # 时间间隔
     n_vars = 3 * N            # 决策变量: x, v, u
     
-    # 2. 构建目标函数矩阵Q (最小化控制力平方和)
-    Q = np.zeros((n_vars, n_vars))
-    Q[2, 2] = h[0]  # u0的权重
-    Q[3*N-1, 3*N-1] = h[-1]  # u_{N-1}的权重
-    for k in range(1, N-1):
-        Q[3*k + 2, 3*k + 2] = h[k-1] + h[k]  # uk的权重
+    # 2. 稀疏组装目标函数矩阵H (最小化控制力平方和) 与约束 A z = b (梯形配点公式 + 边界约束)
+    H, A, b = block_push_qp(t)
     
-    # 3. 构建约束矩阵A和向量b
-    n_constraints = 2*(N-1) + 4
-    A = np.zeros((n_constraints, n_vars))
-    b = np.zeros(n_constraints)
-    
-    # 3.1 运动学约束（梯形配点公式）
-    constraint_idx = 0
-    for k in range(N-1):
-        # 位置约束
-        A[constraint_idx, 3*k] = -1
-        A[constraint_idx, 3*k + 1] = -h[k]/2
-        A[constraint_idx, 3*(k+1)] = 1
-        A[constraint_idx, 3*(k+1) + 1] = -h[k]/2
-        constraint_idx += 1
-        
-        # 速度约束
-        A[constraint_idx, 3*k + 1] = -1
-        A[constraint_idx, 3*k + 2] = -h[k]/2
-        A[constraint_idx, 3*(k+1) + 1] = 1
-        A[constraint_idx, 3*(k+1) + 2] = -h[k]/2
-        constraint_idx += 1
-    
-    # 3.2 边界约束
-    A[constraint_idx, 0] = 1          # x0 = 0
-    b[constraint_idx] = 0
-    constraint_idx += 1
-    
-    A[constraint_idx, 3*(N-1)] = 1    # x_{N-1} = 1
-    b[constraint_idx] = 1
-    constraint_idx += 1
-    
-    A[constraint_idx, 1] = 1          # v0 = 0
-    b[constraint_idx] = 0
-    constraint_idx += 1
-    
-    A[constraint_idx, 3*(N-1) + 1] = 1  # v_{N-1} = 0
-    b[constraint_idx] = 0
-    
-    # 4. 构建并求解QP问题
-    z = ca.SX.sym('z', n_vars)
-    cost = 0.5 * ca.dot(z, Q @ z)
-    constraints = A @ z
-    
-    qp = {'x': z, 'f': cost, 'g': constraints}
-    solver = ca.qpsol('solver', 'qpoases', qp)
-    
-    # 初始猜测
+    # 3. 初始猜测
     x0 = np.zeros(n_vars)
-    for k in range(N):
-        x0[3*k] = t[k]    # 位置初始猜测
-        x0[3*k + 1] = 1   # 速度初始猜测
-        x0[3*k + 2] = 0   # 控制力初始猜测
+    x0[0::3] = t   # 位置初始猜测
+    x0[1::3] = 1   # 速度初始猜测
+    x0[2::3] = 0   # 控制力初始猜测
     
-    # 求解
-    sol = solver(x0=x0, lbg=b, ubg=b)
-    z_opt = sol['x'].full().flatten()
+    # 4. 求解QP问题
+    z_opt = solve_qp(H, A, b, x0=x0, solver=solver)
     
     # 提取原始离散点
     x_original = z_opt[::3]   # 位置
     v_original = z_opt[1::3]  # 速度
     u_original = z_opt[2::3]  # 控制力
     
-    # 5. 插值函数与扩展点计算
-    def linear_interpolation(k, tau):
-        """控制量u的线性插值"""
-        if k >= len(h):
-            return u_original[k]
-        return u_original[k] + tau / h[k] * (u_original[k+1] - u_original[k])
-    
-    def quadratic_interpolation_x(k, tau):
-        """位置x的二次插值"""
-        if k >= len(h):
-            return x_original[k]
-        return x_original[k] + v_original[k] * tau + (tau**2) / (2 * h[k]) * (v_original[k+1] - v_original[k])
-    
-    # 生成扩展点（原始点+插值点）
-    t_extended = []
-    x_extended = []
-    u_extended = []
-    v_extended = []
+    # 5. 稠密输出与扩展点计算: 状态为[x, v], 动力学为[v, u] (梯形法下u线性插值, x与v二次插值)
+    dense = DenseOutput(t, np.column_stack((x_original, v_original)),
+                        np.column_stack((v_original, u_original)), u_original)
     
+    # 扩展点: 原始点 + 各区间中点插值点, 按时间交错排列
+    t_mid = 0.5 * (t[:-1] + t[1:])
+    t_extended = np.empty(2*N - 1)
+    t_extended[0::2] = t
+    t_extended[1::2] = t_mid
     # 标记哪些是原始点（True），哪些是插值点（False）
-    is_original = []
+    is_original = np.zeros(2*N - 1, dtype=bool)
+    is_original[0::2] = True
     
-    for k in range(N):
-        # 添加原始点
-        t_extended.append(t[k])
-        x_extended.append(x_original[k])
-        v_extended.append(v_original[k])
-        u_extended.append(u_original[k])
-        is_original.append(True)
-        
-        # 在两个原始点之间添加插值点（最后一个点除外）
-        if k < N-1:
-            mid_time = (t[k] + t[k+1]) / 2  # 区间中点时间
-            tau = mid_time - t[k]
-            
-            # 计算插值点
-            x_mid = quadratic_interpolation_x(k, tau)
-            v_mid = v_original[k] + u_original[k] * tau + (tau**2) / (2 * h[k]) * (u_original[k+1] - u_original[k])
-            u_mid = linear_interpolation(k, tau)
-            
-            # 添加插值点
-            t_extended.append(mid_time)
-            x_extended.append(x_mid)
-            v_extended.append(v_mid)
-            u_extended.append(u_mid)
-            is_original.append(False)
+    state_extended, _, u_extended = dense(t_extended)
+    x_extended, v_extended, u_extended = state_extended[:, 0], state_extended[:, 1], u_extended[:, 0]
     
     # 分离原始点和插值点以便单独绘制
-    t_original = [t_extended[i] for i in range(len(t_extended)) if is_original[i]]
-    x_original_plot = [x_extended[i] for i in range(len(x_extended)) if is_original[i]]
-    u_original_plot = [u_extended[i] for i in range(len(u_extended)) if is_original[i]]
-    v_original_plot = [v_extended[i] for i in range(len(v_extended)) if is_original[i]]
+    t_original = t_extended[is_original]
+    x_original_plot = x_extended[is_original]
+    u_original_plot = u_extended[is_original]
+    v_original_plot = v_extended[is_original]
     
-    t_interp = [t_extended[i] for i in range(len(t_extended)) if not is_original[i]]
-    x_interp_plot = [x_extended[i] for i in range(len(x_extended)) if not is_original[i]]
-    u_interp_plot = [u_extended[i] for i in range(len(u_extended)) if not is_original[i]]
-    v_interp_plot = [v_extended[i] for i in range(len(v_extended)) if not is_original[i]]
+    t_interp = t_extended[~is_original]
+    x_interp_plot = x_extended[~is_original]
+    u_interp_plot = u_extended[~is_original]
+    v_interp_plot = v_extended[~is_original]
     
     # 6. 可视化
     fig = plt.figure(figsize=(12, 9))
@@ -250,7 +171,10 @@ def trapezoidal_collocation_with_extension(N=20):
         
         return (block, trail, time_text, pos_marker, vel_marker, force_marker)
     
-    # 创建动画
+    # 离屏导出GIF (Agg渲染, 只重绘update返回的艺术家对象, 多进程并行, 流式写入)
+    export_animation(fig, update, len(t_extended), 'extended_trajectory_animation.gif', fps=10)
+    
+    # 屏幕显示动画
     ani = FuncAnimation(
         fig, update,
         frames=len(t_extended),
@@ -258,10 +182,6 @@ def trapezoidal_collocation_with_extension(N=20):
         blit=True,
         repeat=False
     )
-    
-    # 保存动画
-    writer = PillowWriter(fps=10)
-    ani.save('extended_trajectory_animation.gif', writer=writer)
     plt.show()
 
 # 运行程序（N=20，扩展后为39个点）
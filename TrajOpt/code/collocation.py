@@ -0,0 +1,225 @@
+"""
+一般动力学 dx/dt = f(x, u) 的直接配点法(梯形 / Hermite–Simpson, 见 3_梯形配点法.md, 4_Hermite–Simpson配点法.md)
+以及基于区间动力学误差估计的网格细化: 只在误差超过容差的区间内加点
+"""
+
+import numpy as np
+import casadi as ca
+from dense_output import DenseOutput
+
+
+class Collocation:
+    def __init__(self, f, n_states, n_controls, x_start, x_goal, T, cost=None,
+                 x_min=None, x_max=None, u_min=None, u_max=None, method='hermite_simpson'):
+        """
+        :param f: CasADi函数 f(x, u) -> dx/dt
+        :param x_start, x_goal: 起点与终点状态
+        :param T: 时间长度
+        :param cost: CasADi函数 L(x, u) -> 标量, 目标为 ∫L dt, 默认为 u^T u
+        :param x_min, x_max, u_min, u_max: 状态与控制的上下界(默认无界)
+        :param method: 'hermite_simpson' 或 'trapezoid'
+        """
+        self.f = f
+        self.n_states = n_states
+        self.n_controls = n_controls
+        self.x_start = np.asarray(x_start, dtype=float)
+        self.x_goal = np.asarray(x_goal, dtype=float)
+        self.T = T
+        if cost is None:
+            x, u = ca.SX.sym('x', n_states), ca.SX.sym('u', n_controls)
+            cost = ca.Function('L', [x, u], [ca.sumsqr(u)])
+        self.cost = cost
+        self.x_min = np.full(n_states, -np.inf) if x_min is None else np.asarray(x_min, dtype=float)
+        self.x_max = np.full(n_states, np.inf) if x_max is None else np.asarray(x_max, dtype=float)
+        self.u_min = np.full(n_controls, -np.inf) if u_min is None else np.asarray(u_min, dtype=float)
+        self.u_max = np.full(n_controls, np.inf) if u_max is None else np.asarray(u_max, dtype=float)
+        if method not in ('hermite_simpson', 'trapezoid'):
+            raise ValueError(f"unknown collocation method '{method}'")
+        self.method = method
+        # 单个区间内动力学误差的收敛阶(用于估计细化后的区间数)
+        self.order = 4 if method == 'hermite_simpson' else 2
+
+    def _transcribe(self, t):
+        """在网格t上构建NLP, 决策变量为 [X (nx x N), U (nu x N), Um (nu x N-1, 仅Hermite–Simpson)]"""
+        nx, nu, N = self.n_states, self.n_controls, len(t)
+        h = ca.DM(np.diff(t)).T
+        X = ca.SX.sym('X', nx, N)
+        U = ca.SX.sym('U', nu, N)
+        F = self.f.map(N)(X, U)
+        L = self.cost.map(N)(X, U)
+        xk, xk1, fk, fk1 = X[:, :-1], X[:, 1:], F[:, :-1], F[:, 1:]
+        Hx = ca.repmat(h, nx, 1)
+
+        if self.method == 'hermite_simpson':
+            # 中点状态由三次埃尔米特插值得到, 中点控制为决策变量
+            Um = ca.SX.sym('Um', nu, N-1)
+            Xm = 0.5 * (xk + xk1) + Hx / 8 * (fk - fk1)
+            Fm = self.f.map(N-1)(Xm, Um)
+            Lm = self.cost.map(N-1)(Xm, Um)
+            defect = xk1 - xk - Hx / 6 * (fk + 4 * Fm + fk1)
+            obj = ca.sum2(h / 6 * (L[:-1] + 4 * Lm + L[1:]))
+            z = ca.vertcat(ca.vec(X), ca.vec(U), ca.vec(Um))
+        else:
+            Um = ca.SX(nu, 0)
+            defect = xk1 - xk - Hx / 2 * (fk + fk1)
+            obj = ca.sum2(h / 2 * (L[:-1] + L[1:]))
+            z = ca.vertcat(ca.vec(X), ca.vec(U))
+
+        g = ca.vertcat(ca.vec(defect), X[:, 0] - self.x_start, X[:, -1] - self.x_goal)
+        n_mid = Um.shape[1]
+        lbz = np.concatenate((np.tile(self.x_min, N), np.tile(self.u_min, N + n_mid)))
+        ubz = np.concatenate((np.tile(self.x_max, N), np.tile(self.u_max, N + n_mid)))
+        return {'x': z, 'f': obj, 'g': g}, lbz, ubz
+
+    def _unpack(self, t, z):
+        """决策变量向量 -> 解字典 (各量按时间排列在行上)"""
+        nx, nu, N = self.n_states, self.n_controls, len(t)
+        x = z[:nx*N].reshape(N, nx)
+        u = z[nx*N:(nx+nu)*N].reshape(N, nu)
+        u_mid = z[(nx+nu)*N:].reshape(-1, nu)
+        return {'t': np.asarray(t, dtype=float), 'x': x, 'u': u, 'u_mid': u_mid,
+                'dx': np.asarray(self.f.map(N)(x.T, u.T)).T}
+
+    def _pack(self, sol):
+        return np.concatenate((sol['x'].ravel(), sol['u'].ravel(), sol['u_mid'].ravel()))
+
+    def solve(self, t, guess=None, ipopt_opts=None):
+        """
+        在给定网格上求解
+        :param t: 配点时间 (N,), t[0] = 0, t[-1] = T
+        :param guess: 初值解(可以定义在另一网格上, 会插值到t), 默认为起点到终点的直线
+        :return: 解字典 {'t', 'x', 'u', 'u_mid', 'dx', 'cost', 'success'}
+        """
+        t = np.asarray(t, dtype=float)
+        nlp, lbz, ubz = self._transcribe(t)
+        opts = {'ipopt': {'print_level': 0, 'sb': 'yes', 'tol': 1e-8}, 'print_time': 0}
+        if ipopt_opts:
+            opts['ipopt'].update(ipopt_opts)
+        solver = ca.nlpsol('solver', 'ipopt', nlp, opts)
+
+        if guess is None:
+            s = t[:, None] / self.T
+            init = {'x': (1 - s) * self.x_start + s * self.x_goal, 'u': np.zeros((len(t), self.n_controls))}
+        else:
+            x_g, u_g, _ = self.interpolate(guess, t)
+            init = {'x': x_g, 'u': u_g}
+        if self.method == 'hermite_simpson':
+            init['u_mid'] = self.interpolate(guess, 0.5 * (t[:-1] + t[1:]))[1] if guess is not None \
+                else np.zeros((len(t) - 1, self.n_controls))
+        else:
+            init['u_mid'] = np.zeros((0, self.n_controls))
+
+        n_eq = nlp['g'].shape[0]
+        res = solver(x0=self._pack(init), lbx=lbz, ubx=ubz, lbg=np.zeros(n_eq), ubg=np.zeros(n_eq))
+        sol = self._unpack(t, res['x'].full().ravel())
+        sol['cost'] = float(res['f'])
+        sol['success'] = solver.stats()['success']
+        return sol
+
+    def dense_output(self, sol):
+        """由解构造稠密输出(Hermite–Simpson需要中点动力学, 由Hermite中点状态与中点控制计算)"""
+        if self.method == 'trapezoid':
+            return DenseOutput(sol['t'], sol['x'], sol['dx'], sol['u'])
+        x, dx, h = sol['x'], sol['dx'], np.diff(sol['t'])[:, None]
+        xm = 0.5 * (x[:-1] + x[1:]) + h / 8 * (dx[:-1] - dx[1:])
+        fm = np.asarray(self.f.map(len(h))(xm.T, sol['u_mid'].T)).T
+        return DenseOutput(sol['t'], x, dx, sol['u'], sol['u_mid'], fm)
+
+    def interpolate(self, sol, tau):
+        """
+        按配点法的插值多项式在任意时刻求状态与控制
+        :return: x (m, nx), u (m, nu), dx/dt (m, nx), 均为插值多项式的值
+        """
+        x_tau, dx_tau, u_tau = self.dense_output(sol)(tau)
+        return x_tau, u_tau, dx_tau
+
+    def interval_error(self, sol, n_quad=9):
+        """
+        区间动力学误差估计: η_k = max_i ∫|dx_i/dt - f_i(x, u)| dt (插值多项式代入动力学的残差)
+        每个区间用n_quad个点(奇数)的复合辛普森公式积分, 所有区间一次性向量化计算
+        :return: (N-1,)
+        """
+        t = sol['t']
+        s = np.linspace(0, 1, n_quad)
+        tau = (t[:-1, None] + np.diff(t)[:, None] * s).ravel()
+        x_tau, u_tau, dx_tau = self.interpolate(sol, tau)
+        # 区间右端点按左闭右开会落到下一区间, 两侧插值在节点处连续, 结果相同
+        resid = np.abs(dx_tau - np.asarray(self.f.map(len(tau))(x_tau.T, u_tau.T)).T)
+        resid = resid.reshape(len(t) - 1, n_quad, -1)
+        w = np.ones(n_quad)
+        w[1:-1:2], w[2:-1:2] = 4, 2
+        w /= 3 * (n_quad - 1)
+        return np.max(np.einsum('kqi,q->ki', resid, w) * np.diff(t)[:, None], axis=1)
+
+    def refine(self, N=10, tol=1e-4, max_iter=10, max_split=8, verbose=True):
+        """
+        网格细化: 求解 -> 估计区间误差 -> 把超过容差的区间等分(份数按收敛阶估计) -> 以插值后的解为初值重新求解
+        :param N: 初始均匀网格的配点数
+        :param tol: 区间误差容差
+        :return: 最终解(求解失败时停止细化, 返回该次失败的解, sol['success']为False), 每次迭代的 (配点数, 最大区间误差)
+        """
+        t = np.linspace(0, self.T, N)
+        sol, history = None, []
+        for it in range(max_iter):
+            sol = self.solve(t, guess=sol)
+            # 失败的解既不能作为下一网格的初值, 误差估计也没有意义
+            if not sol['success']:
+                if verbose:
+                    print(f"  迭代 {it}: 配点数 {len(t):4d}, 求解失败, 停止网格细化")
+                break
+            eta = self.interval_error(sol)
+            history.append((len(t), eta.max()))
+            if verbose:
+                print(f"  迭代 {it}: 配点数 {len(t):4d}, 最大区间误差 {eta.max():.2e}, 代价 {sol['cost']:.6f}")
+            bad = eta > tol
+            if not bad.any():
+                break
+            # 区间误差约按 h^(order+1) 下降
+            n_sub = np.ones(len(eta), dtype=int)
+            n_sub[bad] = np.clip(np.ceil((eta[bad] / tol) ** (1.0 / (self.order + 1))), 2, max_split)
+            new_t = [t[:1]]
+            for k in range(len(eta)):
+                new_t.append(np.linspace(t[k], t[k + 1], n_sub[k] + 1)[1:])
+            t = np.concatenate(new_t)
+        return sol, history
+
+
+def cart_pole(m1=1.0, m2=0.3, l=0.5, g=9.81):
+    """小车倒立摆动力学, 状态 [q1 小车位置, q2 摆角, dq1, dq2], 控制为水平推力"""
+    x = ca.SX.sym('x', 4)
+    u = ca.SX.sym('u', 1)
+    q2, dq1, dq2 = x[1], x[2], x[3]
+    s, c = ca.sin(q2), ca.cos(q2)
+    ddq1 = (l*m2*s*dq2**2 + u + m2*g*c*s) / (m1 + m2*(1 - c**2))
+    ddq2 = -(l*m2*c*s*dq2**2 + u*c + (m1 + m2)*g*s) / (l*m1 + l*m2*(1 - c**2))
+    return ca.Function('f', [x, u], [ca.vertcat(dq1, dq2, ddq1, ddq2)])
+
+
+if __name__ == '__main__':
+    import time
+
+    # 小车倒立摆起摆: 2s内把摆从下垂摆到竖直, 小车移动1m, 最小化 ∫u^2
+    f = cart_pole()
+    problem = dict(f=f, n_states=4, n_controls=1, x_start=[0, 0, 0, 0], x_goal=[1, np.pi, 0, 0], T=2.0,
+                   x_min=[-2, -np.inf, -np.inf, -np.inf], x_max=[2, np.inf, np.inf, np.inf],
+                   u_min=[-20], u_max=[20])
+    tol = 1e-4
+
+    print(f"Hermite–Simpson + 网格细化 (区间误差容差 {tol:g}):")
+    hs = Collocation(**problem, method='hermite_simpson')
+    start = time.perf_counter()
+    sol, history = hs.refine(N=10, tol=tol)
+    print(f"  配点数 {len(sol['t'])}, 求解{'成功' if sol['success'] else '失败'}, "
+          f"总耗时 {time.perf_counter() - start:.2f} s")
+
+    # 均匀网格的梯形法达到相同的区间误差所需的配点数
+    print("均匀网格梯形法:")
+    trap = Collocation(**problem, method='trapezoid')
+    N, guess = 10, None
+    while True:
+        guess = trap.solve(np.linspace(0, problem['T'], N), guess=guess)
+        eta = trap.interval_error(guess).max()
+        print(f"  配点数 {N:5d}, 最大区间误差 {eta:.2e}, 代价 {guess['cost']:.6f}")
+        if eta <= tol or N >= 5000:
+            break
+        N *= 2
@@ -0,0 +1,161 @@
+"""
+物块移动问题(2_移动物块例子.md, 3_梯形配点法.md)的梯形配点QP:
+    min  0.5 * z^T H z
+    s.t. A z = b
+决策变量按配点排列 z = [x_0, v_0, u_0, x_1, v_1, u_1, ...]
+H与A以三元组(行, 列, 值)形式向量化组装为稀疏矩阵, 再按其稀疏模式交给CasADi的conic接口(或带状KKT求解器),
+内存与组装时间均与配点数N成线性关系
+"""
+
+import numpy as np
+import casadi as ca
+import scipy.sparse as sp
+from scipy.linalg import solve_banded
+
+
+def block_push_qp(t, x_start=0.0, x_goal=1.0):
+    """
+    组装梯形配点QP
+    :param t: 配点时间 (N,)
+    :param x_start, x_goal: 起点与终点位置(起止速度均为0)
+    :return: H (3N, 3N), A (2(N-1)+4, 3N) 均为CSC稀疏矩阵, b (2(N-1)+4,)
+    """
+    t = np.asarray(t, dtype=float)
+    N = len(t)
+    h = np.diff(t)
+    n_vars = 3 * N
+    k = np.arange(N - 1)
+
+    # 目标函数: 控制力平方的梯形积分, 只有u对应的对角元非零
+    w = np.zeros(N)
+    w[:-1] += h
+    w[1:] += h
+    H = sp.csc_matrix((w, (3*np.arange(N) + 2, 3*np.arange(N) + 2)), shape=(n_vars, n_vars))
+
+    # 运动学约束(梯形配点公式), 第2k行为位置约束、第2k+1行为速度约束:
+    #   x_{k+1} - x_k - h_k*(v_k + v_{k+1})/2 = 0
+    #   v_{k+1} - v_k - h_k*(u_k + u_{k+1})/2 = 0
+    # 每行4个非零元, 两类约束的列偏移相同(速度约束整体右移一列)
+    offsets = np.array([0, 1, 3, 4])
+    coeffs = np.column_stack((-np.ones(N - 1), -h/2, np.ones(N - 1), -h/2))
+    rows = np.concatenate((np.repeat(2*k, 4), np.repeat(2*k + 1, 4)))
+    cols = np.concatenate(((3*k)[:, None] + offsets, (3*k + 1)[:, None] + offsets)).ravel()
+    vals = np.concatenate((coeffs, coeffs)).ravel()
+
+    # 边界约束: x_0, x_{N-1}, v_0, v_{N-1}
+    n_dyn = 2 * (N - 1)
+    rows = np.concatenate((rows, n_dyn + np.arange(4)))
+    cols = np.concatenate((cols, [0, 3*(N-1), 1, 3*(N-1) + 1]))
+    vals = np.concatenate((vals, np.ones(4)))
+    A = sp.csc_matrix((vals, (rows, cols)), shape=(n_dyn + 4, n_vars))
+
+    b = np.zeros(n_dyn + 4)
+    b[n_dyn:] = [x_start, x_goal, 0.0, 0.0]
+    return H, A, b
+
+
+def to_casadi(M):
+    """scipy稀疏矩阵 -> 具有相同稀疏模式的casadi.DM(不经过稠密矩阵)"""
+    M = sp.csc_matrix(M)
+    M.sort_indices()
+    sparsity = ca.Sparsity(M.shape[0], M.shape[1], M.indptr.tolist(), M.indices.tolist())
+    return ca.DM(sparsity, M.data)
+
+
+def banded_kkt_order(A):
+    """
+    KKT系统的带状排序: 变量保持原顺序, 每个约束紧跟在其涉及的最后一个变量之后
+    配点法中每个约束只耦合相邻配点, 重排后KKT矩阵的带宽与N无关
+    :return: 重排后第i个位置对应的KKT未知量下标 [z, λ]
+    """
+    A = sp.csr_matrix(A)
+    n_cons, n_vars = A.shape
+    last_col = np.maximum.reduceat(A.indices, A.indptr[:-1]) if A.nnz else np.zeros(n_cons)
+    keys = np.concatenate((np.arange(n_vars), last_col + 0.5))
+    return np.argsort(keys, kind='stable')
+
+
+def solve_kkt_banded(H, A, b):
+    """
+    O(N)求解等式约束QP的KKT系统 [H A^T; A 0] [z; λ] = [0; b]
+    按banded_kkt_order重排为带状矩阵后用带状LU分解(LAPACK gbsv, 部分主元)求解,
+    计算量为 O(N * 带宽^2), 适用于约束只耦合相邻配点的配点QP
+    :return: 最优解 z
+    """
+    n_cons, n_vars = A.shape
+    K = sp.bmat([[H, A.T], [A, None]], format='coo')
+    K.sum_duplicates()
+    order = banded_kkt_order(A)
+    pos = np.empty_like(order)
+    pos[order] = np.arange(len(order))
+
+    # 带状存储: ab[u + i - j, j] = K[i, j]
+    r, c = pos[K.row], pos[K.col]
+    lower, upper = int(np.max(r - c)), int(np.max(c - r))
+    ab = np.zeros((lower + upper + 1, len(order)))
+    ab[upper + r - c, c] = K.data
+
+    rhs = np.concatenate((np.zeros(n_vars), b))[order]
+    sol = solve_banded((lower, upper), ab, rhs, overwrite_ab=True, overwrite_b=True, check_finite=False)
+    z = np.empty_like(sol)
+    z[order] = sol
+    return z[:n_vars]
+
+
+def solve_qp(H, A, b, x0=None, solver='qpoases', opts=None):
+    """
+    求解等式约束QP
+    :param solver: 'banded' 使用带状KKT求解器(O(N)); 其余为CasADi的QP求解器插件,
+                   通过conic接口按H与A的稀疏模式构建, 小规模问题可用 'qpoases'(稠密), 较大规模用稀疏的 'qrqp'
+    :return: 最优解 z (3N,)
+    """
+    if solver == 'banded':
+        return solve_kkt_banded(H, A, b)
+
+    H_dm, A_dm = to_casadi(H), to_casadi(A)
+    qp = {'h': H_dm.sparsity(), 'a': A_dm.sparsity()}
+    opts = dict(opts or {})
+    if solver == 'qpoases':
+        opts.setdefault('printLevel', 'none')
+    elif solver == 'qrqp':
+        opts.setdefault('print_iter', False)
+        opts.setdefault('print_header', False)
+        opts.setdefault('print_info', False)
+    qp_solver = ca.conic('solver', solver, qp, opts)
+    sol = qp_solver(h=H_dm, a=A_dm, lba=b, uba=b, x0=x0 if x0 is not None else 0)
+    return sol['x'].full().flatten()
+
+
+if __name__ == '__main__':
+    import time
+    import tracemalloc
+
+    # 稀疏组装的时间与内存随N线性增长(稠密组装时仅Q就需要 (3N)^2 * 8 字节)
+    for N in [10**3, 10**4, 10**5]:
+        t = np.linspace(0, 1, N)
+        tracemalloc.start()
+        start = time.perf_counter()
+        H, A, b = block_push_qp(t)
+        build = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"N = {N:>6d}: 组装 {build*1e3:7.2f} ms, 峰值内存 {peak/1e6:6.2f} MB "
+              f"(稠密Q需 {(3*N)**2*8/1e9:8.2f} GB), 非零元 H {H.nnz}, A {A.nnz}")
+
+    # 求解耗时对比: 通用QP求解器随N超线性增长, 带状KKT求解器为O(N)
+    print("\n     N   " + "".join(f"{s:>12s}" for s in ['qpoases', 'qrqp', 'banded']) + "   max|Δu|   约束残差")
+    limits = {'qpoases': 100, 'qrqp': 10**4, 'banded': 10**6}
+    for N in [30, 100, 300, 10**3, 10**4, 10**5, 10**6]:
+        H, A, b = block_push_qp(np.linspace(0, 1, N))
+        row, sols = [], {}
+        for solver in ['qpoases', 'qrqp', 'banded']:
+            if N > limits[solver]:
+                row.append(f"{'-':>12s}")
+                continue
+            start = time.perf_counter()
+            sols[solver] = solve_qp(H, A, b, solver=solver)
+            row.append(f"{(time.perf_counter() - start)*1e3:10.2f}ms")
+        ref = sols.get('qpoases', sols.get('qrqp'))
+        diff = f"{np.max(np.abs(sols['banded'][2::3] - ref[2::3])):.1e}" if ref is not None else '-'
+        res = np.max(np.abs(A @ sols['banded'] - b))
+        print(f"{N:>8d} " + "".join(row) + f"   {diff:>7s}   {res:.1e}")
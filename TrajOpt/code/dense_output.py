@@ -0,0 +1,93 @@
+"""
+配点解的稠密输出: 在任意时刻数组上按配点法的插值多项式求状态、状态导数与控制
+    梯形法:          控制分段线性, 动力学分段线性, 状态分段二次
+    Hermite–Simpson: 控制分段二次, 动力学分段二次, 状态分段三次
+构造时预先算好每个区间的多项式系数, 求值时只需 searchsorted 定位区间 + 霍纳法, 全部为数组运算
+"""
+
+import numpy as np
+
+
+class DenseOutput:
+    def __init__(self, t, x, dx, u, u_mid=None, dx_mid=None):
+        """
+        :param t: 配点时间 (N,)
+        :param x: 配点处的状态 (N, nx)
+        :param dx: 配点处的动力学 f(x, u) (N, nx)
+        :param u: 配点处的控制 (N, nu)
+        :param u_mid, dx_mid: 区间中点处的控制 (N-1, nu) 与动力学 (N-1, nx), 给出时按Hermite–Simpson插值
+        """
+        self.t = np.asarray(t, dtype=float)
+        x, dx, u = (np.asarray(a, dtype=float).reshape(len(self.t), -1) for a in (x, dx, u))
+        h = np.diff(self.t)[:, None]
+        f0, f1, u0, u1 = dx[:-1], dx[1:], u[:-1], u[1:]
+
+        # 各区间关于归一化时间 s = (τ - t_k) / h_k 的多项式系数, 形状为 (N-1, 阶数+1, 维数), 低次在前
+        if u_mid is None:
+            self.method = 'trapezoid'
+            self.u_coef = np.stack((u0, u1 - u0), axis=1)
+            df = np.stack((f0, f1 - f0), axis=1)
+        else:
+            self.method = 'hermite_simpson'
+            um = np.asarray(u_mid, dtype=float).reshape(len(h), -1)
+            fm = np.asarray(dx_mid, dtype=float).reshape(len(h), -1)
+            self.u_coef = np.stack((u0, -3*u0 + 4*um - u1, 2*u0 - 4*um + 2*u1), axis=1)
+            df = np.stack((f0, -3*f0 + 4*fm - f1, 2*f0 - 4*fm + 2*f1), axis=1)
+        # 状态为动力学多项式的积分: x(s) = x_k + h * Σ c_j s^(j+1) / (j+1)
+        j = np.arange(1, df.shape[1] + 1)[None, :, None]
+        self.x_coef = np.concatenate((x[:-1, None], h[:, None] * df / j), axis=1)
+        self.dx_coef = df
+
+    def _locate(self, tau):
+        """区间下标与归一化时间(超出[t_0, t_N-1]时按首末区间外推)"""
+        tau = np.asarray(tau, dtype=float)
+        k = np.clip(np.searchsorted(self.t, tau, side='right') - 1, 0, len(self.t) - 2)
+        s = (tau - self.t[k]) / (self.t[k + 1] - self.t[k])
+        return k, s[..., None]
+
+    @staticmethod
+    def _horner(coef, k, s):
+        out = coef[k, -1]
+        for j in range(coef.shape[1] - 2, -1, -1):
+            out = out * s + coef[k, j]
+        return out
+
+    def state(self, tau):
+        """状态 (..., nx)"""
+        k, s = self._locate(tau)
+        return self._horner(self.x_coef, k, s)
+
+    def derivative(self, tau):
+        """状态导数(插值后的动力学) (..., nx)"""
+        k, s = self._locate(tau)
+        return self._horner(self.dx_coef, k, s)
+
+    def control(self, tau):
+        """控制 (..., nu)"""
+        k, s = self._locate(tau)
+        return self._horner(self.u_coef, k, s)
+
+    def __call__(self, tau):
+        """一次定位区间, 同时返回状态、状态导数与控制"""
+        k, s = self._locate(tau)
+        return self._horner(self.x_coef, k, s), self._horner(self.dx_coef, k, s), self._horner(self.u_coef, k, s)
+
+
+if __name__ == '__main__':
+    import time
+    from collocation_qp import block_push_qp, solve_qp
+
+    # 物块移动问题(状态 [x, v], 动力学 [v, u])的梯形配点解, 重采样到1kHz控制周期
+    for N in [10, 1000, 100000]:
+        t = np.linspace(0, 1, N)
+        H, A, b = block_push_qp(t)
+        z = solve_qp(H, A, b, solver='banded')
+        x, v, u = z[0::3], z[1::3], z[2::3]
+        dense = DenseOutput(t, np.column_stack((x, v)), np.column_stack((v, u)), u)
+
+        for rate in [1e3, 1e6]:
+            tau = np.arange(0, 1, 1 / rate)
+            start = time.perf_counter()
+            state, _, control = dense(tau)
+            elapsed = time.perf_counter() - start
+            print(f"N = {N:>6d}, {len(tau):>7d} 个采样点: {elapsed*1e3:8.3f} ms, 每点 {elapsed/len(tau)*1e6:.3f} us")
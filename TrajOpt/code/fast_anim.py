@@ -0,0 +1,181 @@
+"""
+轨迹动画的快速离屏导出(替代 FuncAnimation + PillowWriter):
+    1. Agg离屏渲染, 静态背景只绘制一次, 每帧恢复背景后只重绘update返回的艺术家对象(与FuncAnimation的blit约定相同)
+    2. 按目标帧率抽取帧(长时间仿真的帧数远多于动画需要的帧数)
+    3. 多个工作进程并行渲染与编码(fork方式继承已构建好的图形, 艺术家对象在进程内复用)
+    4. 流式GIF写入: 编码好的帧按顺序直接写入文件, 内存中不保留整段动画
+"""
+
+import os
+import multiprocessing as mp
+import numpy as np
+from PIL import Image, GifImagePlugin
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+class GifStreamWriter:
+    def __init__(self, filename, fps, palette_image, loop=0):
+        """
+        流式GIF写入器, 所有帧共用palette_image的调色板(由首帧量化得到)
+        :param palette_image: 'P'模式图像
+        """
+        self.palette_image = palette_image
+        self.duration = int(round(1000 / fps))
+        self.fp = open(filename, 'wb')
+        header, _ = GifImagePlugin.getheader(palette_image, info={'loop': loop})
+        for block in header:
+            self.fp.write(block)
+
+    @staticmethod
+    def make_palette(rgb, colors=255):
+        """由一帧RGB图像生成调色板图像"""
+        return Image.fromarray(rgb).quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+
+    @staticmethod
+    def encode(rgb, palette_image, duration):
+        """把一帧RGB图像按给定调色板编码为GIF帧数据(可在工作进程中调用)"""
+        frame = Image.fromarray(rgb).quantize(palette=palette_image, dither=Image.Dither.NONE)
+        return b''.join(GifImagePlugin.getdata(frame, duration=duration))
+
+    def write(self, data):
+        self.fp.write(data)
+
+    def close(self):
+        self.fp.write(b';')
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _FrameRenderer:
+    def __init__(self, fig, update, first_frame):
+        """离屏渲染器: 缓存不含动态艺术家的背景, 每帧只重绘动态艺术家"""
+        self.fig = fig
+        self.update = update
+        self.canvas = FigureCanvasAgg(fig)
+        self.artists = list(update(first_frame))
+        for artist in self.artists:
+            artist.set_animated(True)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(fig.bbox)
+
+    def render(self, frame):
+        """返回一帧RGB图像 (H, W, 3)"""
+        self.canvas.restore_region(self.background)
+        for artist in self.update(frame):
+            self.fig.draw_artist(artist)
+        return np.asarray(self.canvas.buffer_rgba())[..., :3].copy()
+
+    def restore(self):
+        for artist in self.artists:
+            artist.set_animated(False)
+
+
+# 工作进程通过fork继承的渲染状态
+_worker_state = {}
+
+
+def _render_chunk(frames):
+    renderer, palette, duration = _worker_state['renderer'], _worker_state['palette'], _worker_state['duration']
+    return [GifStreamWriter.encode(renderer.render(i), palette, duration) for i in frames]
+
+
+def select_frames(frame_times, target_fps):
+    """按目标帧率抽帧: 对每个输出时刻取不晚于它的最近一帧"""
+    frame_times = np.asarray(frame_times, dtype=float)
+    out_times = np.arange(frame_times[0], frame_times[-1] + 1e-9, 1.0 / target_fps)
+    idx = np.searchsorted(frame_times, out_times, side='right') - 1
+    return np.unique(np.clip(idx, 0, len(frame_times) - 1))
+
+
+def export_animation(fig, update, frames, filename, fps=10, frame_times=None, target_fps=None,
+                     workers=None, chunksize=16):
+    """
+    离屏导出GIF动画
+    :param fig: 已构建好的图形(所有艺术家对象已创建)
+    :param update: update(frame) -> 本帧改动过的艺术家对象, 同FuncAnimation(blit=True)
+    :param frames: 帧数或帧下标序列
+    :param fps: 输出帧率(未抽帧时)
+    :param frame_times: 各帧对应的仿真时间, 与target_fps同时给出时按目标帧率抽帧, 输出帧率为target_fps
+    :param workers: 工作进程数, 默认为CPU核数; 为1或系统不支持fork时在当前进程渲染
+    :return: 实际导出的帧下标
+    """
+    frames = np.arange(frames) if np.isscalar(frames) else np.asarray(frames)
+    if frame_times is not None and target_fps is not None:
+        frames = frames[select_frames(np.asarray(frame_times)[frames], target_fps)]
+        fps = target_fps
+
+    original_canvas = fig.canvas
+    renderer = _FrameRenderer(fig, update, frames[0])
+    palette = GifStreamWriter.make_palette(renderer.render(frames[0]))
+    duration = int(round(1000 / fps))
+    chunks = [frames[i:i + chunksize] for i in range(0, len(frames), chunksize)]
+
+    workers = workers or os.cpu_count() or 1
+    use_pool = workers > 1 and len(chunks) > 1 and 'fork' in mp.get_all_start_methods()
+    try:
+        with GifStreamWriter(filename, fps, palette) as writer:
+            _worker_state.update(renderer=renderer, palette=palette, duration=duration)
+            if use_pool:
+                with mp.get_context('fork').Pool(min(workers, len(chunks))) as pool:
+                    # imap保持帧顺序, 先完成的块在主进程中立即写入
+                    for encoded in pool.imap(_render_chunk, chunks):
+                        for data in encoded:
+                            writer.write(data)
+            else:
+                for chunk in chunks:
+                    for data in _render_chunk(chunk):
+                        writer.write(data)
+    finally:
+        _worker_state.clear()
+        renderer.restore()
+        fig.set_canvas(original_canvas)
+    return frames
+
+
+if __name__ == '__main__':
+    import time
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation, PillowWriter
+
+    # 长时间仿真: 20s, 1kHz记录的轨迹, 导出10fps动画
+    t = np.linspace(0, 20, 20001)
+    x = np.sin(t) * np.exp(-0.05 * t)
+
+    def build():
+        fig, ax = plt.subplots(figsize=(6, 4))
+        ax.plot(t, x, color='gray', linewidth=1)
+        ax.set_xlim(0, 20)
+        ax.set_ylim(-1.1, 1.1)
+        marker, = ax.plot([t[0]], [x[0]], 'ro')
+        trail, = ax.plot([], [], 'r-')
+        text = ax.text(0.02, 0.9, '', transform=ax.transAxes)
+
+        def update(frame):
+            marker.set_data([t[frame]], [x[frame]])
+            trail.set_data(t[max(0, frame - 2000):frame + 1], x[max(0, frame - 2000):frame + 1])
+            text.set_text(f'时间: {t[frame]:.2f}s')
+            return marker, trail, text
+        return fig, update
+
+    frames = select_frames(t, 10)
+
+    fig, update = build()
+    start = time.perf_counter()
+    ani = FuncAnimation(fig, update, frames=frames, blit=True)
+    ani.save('/tmp/anim_pillow.gif', writer=PillowWriter(fps=10))
+    print(f"FuncAnimation + PillowWriter: {len(frames)} 帧, {time.perf_counter() - start:.2f} s")
+    plt.close(fig)
+
+    for workers in [1, os.cpu_count()]:
+        fig, update = build()
+        start = time.perf_counter()
+        out = export_animation(fig, update, len(t), '/tmp/anim_fast.gif', frame_times=t, target_fps=10, workers=workers)
+        print(f"export_animation (工作进程 {workers}): {len(out)} 帧, {time.perf_counter() - start:.2f} s")
+        plt.close(fig)
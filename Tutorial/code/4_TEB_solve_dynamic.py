@@ -2,6 +2,8 @@ import casadi as ca
 import numpy as np
 import matplotlib.pyplot as plt
 
+from transcription import Transcription
+
 class PathPlannerSolver:
     """路径规划求解器（支持障碍约束自适应、轨迹点数量自动调整）"""
     
@@ -105,12 +107,19 @@ class PathPlannerSolver:
     
     def _build_and_solve(self, obs_now):
         """构建优化问题并求解（支持无障碍时忽略障碍约束）"""
-        # 变量定义（n+2个轨迹点，n+1个时间步）
-        x = ca.SX.sym('x', self.n + 2)
-        y = ca.SX.sym('y', self.n + 2)
-        theta = ca.SX.sym('theta', self.n + 2)
-        dt = ca.SX.sym('dt', self.n + 1)
-        z = ca.vertcat(x, y, theta, dt)
+        # 变量定义（n+2个轨迹位姿，n+1个时间步）
+        tr = Transcription()
+        # 起点和终点的位置与姿态通过上下界固定, 初始猜测为起点到终点的直线
+        pose_lb = np.full((self.n + 2, 3), -np.inf)
+        pose_ub = np.full((self.n + 2, 3), np.inf)
+        pose_lb[0] = pose_ub[0] = self.x0
+        pose_lb[-1] = pose_ub[-1] = self.xf
+        pose_init = np.linspace(self.x0, self.xf, self.n + 2)
+        pose = tr.variable('pose', 3, self.n + 2, lb=pose_lb, ub=pose_ub, init=pose_init)
+        # 时间步上下界
+        dt = tr.variable('dt', 1, self.n + 1, lb=self.T_min, ub=self.T_max,
+                         init=(self.T_min + self.T_max) / 2).T
+        x, y, theta = pose[0, :].T, pose[1, :].T, pose[2, :].T
         
         # 目标函数
         f = 0
@@ -178,52 +187,21 @@ class PathPlannerSolver:
             cross = (li[0] + li1[0]) * dy - (li[1] + li1[1]) * dx
             f += self.w_kin * cross**2
         
-        # 约束边界设置
-        g = ca.vertcat(*g_eq, *g_ineq)
-        lbg = [0]*len(g_eq) + [-ca.inf]*len(g_ineq)
-        ubg = [0]*len(g_eq) + [0]*len(g_ineq)
-        
-        # 变量上下界
-        lbx = -np.inf * np.ones(z.shape[0])
-        ubx = np.inf * np.ones(z.shape[0])
-        
-        # 固定起点和终点的位置与姿态
-        fix_idx = [
-            0, self.n+1,                # x的起点和终点索引
-            self.n+2, 2*self.n+3,       # y的起点和终点索引
-            2*self.n+4, 3*self.n+5      # theta的起点和终点索引
-        ]
-        lbx[fix_idx] = ubx[fix_idx] = [
-            self.x0[0], self.xf[0],
-            self.x0[1], self.xf[1],
-            self.x0[2], self.xf[2]
-        ]
-        
-        # 时间步上下界
-        dt_start_idx = 3 * (self.n + 2)
-        lbx[dt_start_idx:] = self.T_min
-        ubx[dt_start_idx:] = self.T_max
-        
-        # 初始猜测值
-        z0 = np.zeros(z.shape[0])
-        z0[:self.n+2] = np.linspace(self.x0[0], self.xf[0], self.n+2)
-        z0[self.n+2:2*self.n+4] = np.linspace(self.x0[1], self.xf[1], self.n+2)
-        z0[2*self.n+4:3*self.n+6] = np.linspace(self.x0[2], self.xf[2], self.n+2)
-        z0[3*self.n+6:] = np.ones(self.n+1) * ((self.T_min + self.T_max)/2)
+        # 约束边界: 等式约束 g = 0, 不等式约束 g <= 0
+        tr.add_cost(f)
+        tr.constrain(ca.vertcat(*g_eq), 0, 0)
+        if g_ineq:
+            tr.constrain(ca.vertcat(*g_ineq), -np.inf, 0)
         
         # 求解NLP
-        nlp = {'x': z, 'f': f, 'g': g}
-        opts = {'ipopt.print_level': 0, 'print_time': 1}
-        solver = ca.nlpsol('solver', 'ipopt', nlp, opts)
-        res = solver(x0=z0, lbg=lbg, ubg=ubg, lbx=lbx, ubx=ubx)
+        tr.build('ipopt', {'ipopt.print_level': 0, 'print_time': 1})
+        sol, res = tr.solve()
+        res['pose'] = sol['pose']
         return res
     
     def _extract_trajectory(self, res):
-        """从求解结果中提取轨迹"""
-        x = res['x'][:self.n+2].full().flatten()
-        y = res['x'][self.n+2:2*self.n+4].full().flatten()
-        th = res['x'][2*self.n+4:3*self.n+6].full().flatten()
-        return np.column_stack((x, y, th))
+        """从求解结果中提取轨迹 (n+2, 3)"""
+        return res['pose'].copy()
     
     def get_trajectory(self):
         return self.trajectory
@@ -3,6 +3,8 @@ import time
 import casadi as ca
 import numpy as np
 
+from transcription import Transcription
+
 class TrajectoryOptimizer:
     def __init__(self, T=0.1, N=100, v_max=0.8, omega_max=1.0):
         """
@@ -47,49 +49,31 @@ class TrajectoryOptimizer:
         
     def _build_optimizer(self):
         """构建轨迹优化求解器"""
-        # 优化变量
-        U = ca.SX.sym('U', self.n_controls, self.N)  # 控制序列（长度2xN）
-        X = ca.SX.sym('X', self.n_states, self.N+1)  # 状态序列（长度3xN+1）
-        P = ca.SX.sym('P', 2*self.n_states)          # 参数: [初始状态, 目标状态]（6x1）
+        tr = Transcription()
+        # 优化变量(顺序与决策向量一致): 控制序列（2xN, 含上下界）, 状态序列（3xN+1）
+        U = tr.variable('u', self.n_controls, self.N,
+                        lb=[-self.v_max, -self.omega_max], ub=[self.v_max, self.omega_max])
+        X = tr.variable('x', self.n_states, self.N+1)
+        # 参数: 初始状态, 目标状态
+        x_init = tr.parameter('x0', self.n_states)
+        x_goal = tr.parameter('xs', self.n_states)
         
         # 代价函数权重
         self.Q = np.diag([20.0, 20.0, 100.0])  # 状态权重
         self.R = np.diag([1.0, 1.0])         # 控制权重
         self.Qf = np.diag([20.0, 20.0, 100.0]) # 终端状态权重（更大以确保收敛到目标）
         
-        # 构建目标函数和约束
-        obj = 0
-        g = [X[:, 0] - P[:self.n_states]]  # 初始状态约束 g=0
-        g.append(X[:, -1] - P[self.n_states:])  # 终端状态约束（强制最后到达目标）
+        # 约束: 初始状态、终端状态（强制最后到达目标）、运动学(欧拉离散) 均为 g = 0
+        tr.constrain(X[:, 0] - x_init)
+        tr.constrain(X[:, -1] - x_goal)
+        tr.dynamics(self.f, X, U, self.T, method='euler')
         
-        for i in range(self.N):
-            # 阶段代价
-            state_error = X[:, i] - P[self.n_states:]
-            obj += ca.mtimes([state_error.T, self.Q, state_error])
-            obj += ca.mtimes([U[:, i].T, self.R, U[:, i]])
-            
-            # 运动学约束 (欧拉离散) g = 0
-            x_b = (X[:, i+1] - X[:, i])/ self.T - self.f(X[:, i], U[:, i])
-            g.append(x_b)
-        
-        # 终端代价
-        final_error = X[:, -1] - P[self.n_states:]
-        obj += ca.mtimes([final_error.T, self.Qf, final_error])
-        
-        # 优化变量向量
-        # 合并 2Nx1 和 3(N+1)x1 为 (5N+3)x1
-        opt_vars = ca.vertcat(
-            ca.reshape(U, -1, 1),
-            ca.reshape(X, -1, 1)
-        )
-        
-        # 构建NLP问题
-        nlp_prob = {
-            'f': obj,
-            'x': opt_vars,
-            'p': P,
-            'g': ca.vertcat(*g)
-        }
+        # 阶段代价与终端代价
+        state_error = X[:, :-1] - ca.repmat(x_goal, 1, self.N)
+        tr.add_cost(ca.sum2(ca.sum1(state_error * ca.mtimes(self.Q, state_error))))
+        tr.add_cost(ca.sum2(ca.sum1(U * ca.mtimes(self.R, U))))
+        final_error = X[:, -1] - x_goal
+        tr.add_cost(ca.mtimes([final_error.T, self.Qf, final_error]))
         
         # 求解器配置
         opts = {
@@ -101,29 +85,8 @@ class TrajectoryOptimizer:
             },
             'print_time': 1
         }
-        
-        self.solver = ca.nlpsol('solver', 'ipopt', nlp_prob, opts)
-        
-        # 约束上下界
-        # 初始状态和终端状态约束为硬约束（等于给定值）
-        # 起点+目标点+中间点 等式约束上下限制 
-        self.lbg = [0.0]*self.n_states + [0.0]*self.n_states + [0.0]*(self.N*self.n_states)
-        self.ubg = [0.0]*self.n_states + [0.0]*self.n_states + [0.0]*(self.N*self.n_states)
-        
-        """"顺序很重要, 与opt_vars对应"""
-        # 控制输入约束
-        self.lbx = []
-        self.ubx = []
-        # (2*N)x1 = 400x1
-        for _ in range(self.N):
-            self.lbx.extend([-self.v_max, -self.omega_max])
-            self.ubx.extend([self.v_max, self.omega_max])
-        
-        # 状态变量约束
-        # 3*(N+1)x1=606x1
-        for _ in range(self.N + 1):
-            self.lbx.extend([-np.inf, -np.inf, -np.inf])
-            self.ubx.extend([np.inf, np.inf, np.inf])
+        tr.build('ipopt', opts)
+        self.transcription = tr
     
     def solve(self, x0, xs):
         """
@@ -132,39 +95,23 @@ class TrajectoryOptimizer:
         :param xs: 目标状态 [x, y, theta]
         :return: 状态轨迹、控制序列、时间序列
         """
-        # 构建参数向量
-        c_p = np.concatenate((x0, xs)).flatten()
-        
-        # 优化变量初始猜测（可以改进初始猜测以提高求解效率）
-        u_init = np.zeros((self.n_controls, self.N))
-        x_init = np.zeros((self.n_states, self.N+1))
-        # 简单线性初始猜测
-        for i in range(self.N+1):
-            alpha = i / self.N
-            x_init[:, i] = x0.flatten() * (1-alpha) + xs.flatten() * alpha
-        init_opt = np.concatenate((u_init.flatten(), x_init.flatten()))
+        tr = self.transcription
+        # 优化变量初始猜测: 状态为起点到终点的直线插值, 控制为0
+        alpha = np.linspace(0, 1, self.N+1)[:, None]
+        x_init = x0.flatten() * (1-alpha) + xs.flatten() * alpha
         
         # 求解NLP（仅调用一次）
         start_time = time.time()
-        res = self.solver(
-            x0=init_opt,
-            p=c_p,
-            lbg=self.lbg,
-            ubg=self.ubg,
-            lbx=self.lbx,
-            ubx=self.ubx
-        )
+        sol, _ = tr.solve(init={'x': x_init}, params={'x0': x0.flatten(), 'xs': xs.flatten()})
         total_time = time.time() - start_time
         
         # 检查求解是否成功
-        if self.solver.stats()['success'] is False:
+        if tr.success is False:
             print("求解失败!")
             return None, None, None
         
-        # 提取优化结果
-        opt_result = res['x'].full().flatten()
-        u_opt = opt_result[:self.n_controls*self.N].reshape(self.N, self.n_controls)
-        x_opt = opt_result[self.n_controls*self.N:].reshape(self.N+1, self.n_states)
+        # 提取优化结果 (N, 2) 与 (N+1, 3)
+        u_opt, x_opt = sol['u'], sol['x']
         
         # 生成时间序列
         t_opt = np.linspace(0, self.N*self.T, self.N+1)
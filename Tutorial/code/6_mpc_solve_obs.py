@@ -2,9 +2,11 @@ import irsim
 import time
 import casadi as ca
 import numpy as np
+from rate_loop import RateLoop
 
 class TrajectoryOptimizer:
-    def __init__(self, T=0.1, N=100, v_max=0.8, omega_max=1.0, obstacles=None):
+    def __init__(self, T=0.1, N=100, v_max=0.8, omega_max=1.0, obstacles=None,
+                 terminal_constraint=True, verbose=True, Q=None, R=None, Qf=None):
         """
         轨迹优化器初始化(单次求解完整轨迹)
         :param T: 采样时间
@@ -13,6 +15,9 @@ class TrajectoryOptimizer:
         :param omega_max: 最大角速度
         :param obstacles: 障碍物列表，每个障碍物为字典{'x': x, 'y': y, 'r': 半径, 'safety_dist': 安全距离}
                           例如: [{'x':1.0, 'y':1.0, 'r':0.3, 'safety_dist':0.2}]
+        :param terminal_constraint: 是否强制终端状态等于目标(短时域滚动求解时应关闭, 仅保留终端代价)
+        :param verbose: 是否打印求解器输出
+        :param Q, R, Qf: 状态、控制与终端状态的权重矩阵(默认 diag(20, 20, 100), diag(1, 1), diag(20, 20, 100))
         """
         # 控制器参数
         self.T = T
@@ -24,6 +29,13 @@ class TrajectoryOptimizer:
         
         # 障碍物参数（默认无障碍物，可外部传入）
         self.obstacles = obstacles if obstacles is not None else []
+        self.terminal_constraint = terminal_constraint
+        self.verbose = verbose
+
+        # 代价函数权重
+        self.Q = np.diag([20.0, 20.0, 100.0]) if Q is None else np.asarray(Q, dtype=float)   # 状态权重（x,y,theta）
+        self.R = np.diag([1.0, 1.0]) if R is None else np.asarray(R, dtype=float)            # 控制权重（v,omega）
+        self.Qf = np.diag([20.0, 20.0, 100.0]) if Qf is None else np.asarray(Qf, dtype=float) # 终端状态权重
         
         # 初始化求解器
         self._build_kinematic_model()
@@ -57,11 +69,6 @@ class TrajectoryOptimizer:
         X = ca.SX.sym('X', self.n_states, self.N+1)  # 状态序列（长度3xN+1）
         P = ca.SX.sym('P', 2*self.n_states)          # 参数: [初始状态, 目标状态]（6x1）
         
-        # 代价函数权重
-        self.Q = np.diag([20.0, 20.0, 100.0])  # 状态权重（x,y,theta）
-        self.R = np.diag([1.0, 1.0])         # 控制权重（v,omega）
-        self.Qf = np.diag([20.0, 20.0, 100.0]) # 终端状态权重
-        
         # 构建目标函数和约束
         obj = 0
         g = []  # 约束列表（后续逐步添加）
@@ -70,7 +77,8 @@ class TrajectoryOptimizer:
         g.append(X[:, 0] - P[:self.n_states])
         
         # 2. 终端状态约束（X[:,N] = 目标状态）
-        g.append(X[:, -1] - P[self.n_states:])
+        if self.terminal_constraint:
+            g.append(X[:, -1] - P[self.n_states:])
         
         # 3. 运动学约束（欧拉离散）
         for i in range(self.N):
@@ -87,12 +95,13 @@ class TrajectoryOptimizer:
             safety_dist = obs['safety_dist']
             # 最小安全距离 = 障碍物半径 + 车辆半径 + 额外安全距离
             min_distance = obs_r + self.robot_radius + safety_dist
-            # 对每个状态点添加距离约束
-            for i in range(self.N+1):
-                # 车辆中心(x,y)与障碍物中心的欧氏距离
-                dist = ca.sqrt((X[0, i] - obs_x)**2 + (X[1, i] - obs_y)** 2)
-                # 约束：距离 ≥ 最小安全距离（dist - min_distance ≥ 0）
-                g.append(dist - min_distance)
+            # 对每个预测状态点添加距离约束(初始状态由测量值固定, 不再约束:
+            # 否则机器人因求解容差略微进入安全距离时整个问题不可行)
+            for i in range(1, self.N+1):
+                # 车辆中心(x,y)与障碍物中心的距离平方(sqrt在障碍物中心处导数无穷大, 直线初值经过中心时IPOPT无法求解)
+                dist_sq = (X[0, i] - obs_x)**2 + (X[1, i] - obs_y)**2
+                # 约束：距离 ≥ 最小安全距离（dist^2 - min_distance^2 ≥ 0）
+                g.append(dist_sq - min_distance**2)
         
         # 构建目标函数
         for i in range(self.N):
@@ -129,15 +138,19 @@ class TrajectoryOptimizer:
             },
             'print_time': 1
         }
+        if not self.verbose:
+            opts['ipopt']['print_level'] = 0
+            opts['ipopt']['sb'] = 'yes'
+            opts['print_time'] = 0
         
         self.solver = ca.nlpsol('solver', 'ipopt', nlp_prob, opts)
         
         # 约束上下界设置
-        # 计算约束总数量：初始状态(3) + 终端状态(3) + 运动学约束(N*3) + 障碍约束(障碍物数量*(N+1))
+        # 计算约束总数量：初始状态(3) + 终端状态(3) + 运动学约束(N*3) + 障碍约束(障碍物数量*N)
         n_initial = self.n_states
-        n_terminal = self.n_states
+        n_terminal = self.n_states if self.terminal_constraint else 0
         n_kinematic = self.N * self.n_states
-        n_obstacle = len(self.obstacles) * (self.N + 1)
+        n_obstacle = len(self.obstacles) * self.N
         total_constraints = n_initial + n_terminal + n_kinematic + n_obstacle
         
         self.lbg = []
@@ -155,7 +168,7 @@ class TrajectoryOptimizer:
         self.lbg.extend([0.0] * n_kinematic)
         self.ubg.extend([0.0] * n_kinematic)
         
-        # 障碍约束（距离 ≥ 最小安全距离 → dist - min_distance ≥ 0）
+        # 障碍约束（距离 ≥ 最小安全距离 → dist^2 - min_distance^2 ≥ 0）
         self.lbg.extend([0.0] * n_obstacle)
         self.ubg.extend([np.inf] * n_obstacle)
         
@@ -188,7 +201,8 @@ class TrajectoryOptimizer:
         for i in range(self.N+1):
             alpha = i / self.N
             x_init[:, i] = x0.flatten() * (1 - alpha) + xs.flatten() * alpha
-        init_opt = np.concatenate((u_init.flatten(), x_init.flatten()))
+        # 与opt_vars的ca.reshape(U, -1, 1)一致, 按列优先展开(每个时间步的状态/控制相邻)
+        init_opt = np.concatenate((u_init.flatten(order='F'), x_init.flatten(order='F')))
         
         # 求解NLP
         start_time = time.time()
@@ -216,7 +230,8 @@ class TrajectoryOptimizer:
         t_opt = np.linspace(0, self.N*self.T, self.N+1)
         
         # 求解总结
-        print(f"求解完成: 总步数 = {self.N}, 总耗时 = {total_time:.4f}s")
+        if self.verbose:
+            print(f"求解完成: 总步数 = {self.N}, 总耗时 = {total_time:.4f}s")
         
         return x_opt, u_opt, t_opt
 
@@ -250,11 +265,16 @@ if __name__ == '__main__':
             env = irsim.make('robot_world.yaml', save_ani=True, display=True, full=False)
             # 确保不超过可用的控制输入数量
             steps = min(len(u_controls), 200)
-            for i in range(steps):
-                env.step(action_id=0, action=u_controls[i])
-                env.render()
+            # 按采样时间T回放控制序列，并统计每周期耗时
+            loop = RateLoop(rate_hz=1.0/optimizer.T)
+            for i in loop.ticks(steps):
+                with loop.stage('step'):
+                    env.step(action_id=0, action=u_controls[i])
+                with loop.stage('render'):
+                    env.render()
                 if env.done():
                     break
+            loop.report()
             env.end(ani_name='mpc_nlp_with_obstacle', ending_time=steps*0.1)
             
     except Exception as e:
@@ -0,0 +1,221 @@
+import time
+import importlib
+import casadi as ca
+import numpy as np
+
+
+class ILQRSolver:
+    def __init__(self, f, n_states, n_controls, T=0.1, N=100, Q=None, R=None, Qf=None,
+                 u_min=None, u_max=None, max_iter=200, tol=1e-6):
+        """
+        迭代LQR(iLQR)轨迹优化器
+        :param f: 连续时间动力学 ca.Function f(x, u) -> dx
+        :param n_states: 状态维数
+        :param n_controls: 控制维数
+        :param T: 采样时间
+        :param N: 总步数(状态序列长度为N+1,控制序列长度为N)
+        :param Q, R, Qf: 状态/控制/终端权重
+        :param u_min, u_max: 控制量上下界(盒约束)
+        :param max_iter: 最大迭代次数
+        :param tol: 代价相对下降量的收敛阈值
+        """
+        self.T = T
+        self.N = N
+        self.n_states = n_states
+        self.n_controls = n_controls
+        self.Q = np.eye(n_states) if Q is None else np.asarray(Q, dtype=float)
+        self.R = np.eye(n_controls) if R is None else np.asarray(R, dtype=float)
+        self.Qf = self.Q if Qf is None else np.asarray(Qf, dtype=float)
+        self.u_min = np.full(n_controls, -np.inf) if u_min is None else np.asarray(u_min, dtype=float)
+        self.u_max = np.full(n_controls, np.inf) if u_max is None else np.asarray(u_max, dtype=float)
+        self.max_iter = max_iter
+        self.tol = tol
+
+        self._build_functions(f)
+
+    def _build_functions(self, f):
+        """由CasADi生成离散动力学、反向递推以及闭环前向仿真函数"""
+        n, m = self.n_states, self.n_controls
+        x = ca.SX.sym('x', n)
+        u = ca.SX.sym('u', m)
+
+        # 欧拉离散(与5_mpc_solve.py中的运动学约束一致)
+        x_next = x + self.T * f(x, u)
+        self.F = ca.Function('F', [x, u], [x_next])
+
+        # 开环仿真(用于初始控制序列)
+        self.rollout_ol = self.F.mapaccum('rollout_ol', self.N)
+
+        # 闭环前向仿真: u = clip(u_bar + alpha*k + K(x - x_bar))
+        u_bar = ca.SX.sym('u_bar', m)
+        x_bar = ca.SX.sym('x_bar', n)
+        k = ca.SX.sym('k', m)
+        K_flat = ca.SX.sym('K', m * n)  # 反馈增益按列优先展开
+        alpha = ca.SX.sym('alpha')
+        K = ca.reshape(K_flat, m, n)
+        u_new = ca.fmin(ca.fmax(u_bar + alpha * k + K @ (x - x_bar), self.u_min), self.u_max)
+        step = ca.Function('forward_step', [x, u_bar, x_bar, k, K_flat, alpha],
+                           [self.F(x, u_new), u_new])
+        self.forward = step.mapaccum('forward', self.N, [0], [0])
+
+        # 反向Riccati递推的单步，A = dF/dx, B = dF/du 由自动微分得到
+        Vx = ca.SX.sym('Vx', n)
+        Vxx = ca.SX.sym('Vxx', n, n)
+        xs = ca.SX.sym('xs', n)
+        mu = ca.SX.sym('mu')
+        A = ca.jacobian(x_next, x)
+        B = ca.jacobian(x_next, u)
+        lxx, luu = 2 * self.Q, 2 * self.R
+        Qx = lxx @ (x - xs) + A.T @ Vx
+        Qu = luu @ u + B.T @ Vx
+        Qxx = lxx + A.T @ Vxx @ A
+        Qux = B.T @ Vxx @ A
+        Quu = luu + B.T @ Vxx @ B + mu * ca.DM.eye(m)
+
+        # 盒约束: 先截断无约束解，再在自由维上重新求解(受限维的反馈增益置零)
+        lower = self.u_min - u
+        upper = self.u_max - u
+        du = ca.fmin(ca.fmax(-ca.solve(Quu, Qu), lower), upper)
+        g = Qu + Quu @ du
+        C = ca.diag(ca.logic_or(ca.logic_and(du <= lower, g > 0), ca.logic_and(du >= upper, g < 0)))
+        Fr = ca.DM.eye(m) - C
+        M = Fr @ Quu @ Fr + C
+        k_opt = ca.fmin(ca.fmax(ca.solve(M, -Fr @ (Qu + Quu @ C @ du)) + C @ du, lower), upper)
+        K_opt = -ca.solve(M, Fr @ Qux)
+
+        Vx_new = Qx + K_opt.T @ Quu @ k_opt + K_opt.T @ Qu + Qux.T @ k_opt
+        Vxx_new = Qxx + K_opt.T @ Quu @ K_opt + K_opt.T @ Qux + Qux.T @ K_opt
+        Vxx_new = 0.5 * (Vxx_new + Vxx_new.T)
+        dV = ca.vertcat(k_opt.T @ Qu, 0.5 * k_opt.T @ Quu @ k_opt)
+
+        # Quu正定性(顺序主子式全部为正)
+        minors = ca.vertcat(*[ca.det(Quu[:i, :i]) for i in range(1, m + 1)])
+        step_b = ca.Function('backward_step', [Vx, Vxx, x, u, xs, mu],
+                             [Vx_new, Vxx_new, k_opt, ca.reshape(K_opt, -1, 1), dV, ca.mmin(minors)])
+        self.backward = step_b.mapaccum('backward', self.N, [0, 1], [0, 1])
+
+    def cost(self, X, U, xs):
+        """计算轨迹代价, X为(N+1)xn, U为Nxm"""
+        e = X[:-1] - xs
+        obj = np.einsum('ki,ij,kj->', e, self.Q, e) + np.einsum('ki,ij,kj->', U, self.R, U)
+        ef = X[-1] - xs
+        return obj + ef @ self.Qf @ ef
+
+    def _forward(self, x0, X, U, k, K, alpha):
+        """闭环前向仿真，返回新的状态与控制序列"""
+        X_next, U_new = self.forward(x0, U.T, X[:-1].T, k.T, K.T, alpha)
+        X_new = np.vstack((x0, X_next.full().T))
+        return X_new, U_new.full().T
+
+    def _backward(self, X, U, xs, mu):
+        """反向Riccati递推(时间倒序送入mapaccum)，返回前馈k、列优先展开的反馈K与代价期望下降量"""
+        Vx = 2 * self.Qf @ (X[-1] - xs)
+        Vxx = 2 * self.Qf
+        _, _, k, K, dV, pd = self.backward(Vx, Vxx, X[-2::-1].T, U[::-1].T, xs, mu)
+        if np.min(pd.full()) <= 0:
+            return None
+        return k.full().T[::-1], K.full().T[::-1], dV.full().sum(axis=1)
+
+    def solve(self, x0, xs, u_init=None):
+        """
+        iLQR求解完整轨迹
+        :param x0: 初始状态
+        :param xs: 目标状态
+        :param u_init: 初始控制序列 Nxm (默认全零)
+        :return: 状态轨迹、控制序列、时间序列
+        """
+        x0 = np.asarray(x0, dtype=float).flatten()
+        xs = np.asarray(xs, dtype=float).flatten()
+        U = np.zeros((self.N, self.n_controls)) if u_init is None else np.clip(u_init, self.u_min, self.u_max)
+        X = np.vstack((x0, self.rollout_ol(x0, U.T).full().T))
+        J = self.cost(X, U, xs)
+
+        mu, mu_min, mu_max = 1e-6, 1e-6, 1e10
+        alphas = 0.5 ** np.arange(10)
+        start_time = time.time()
+        for it in range(self.max_iter):
+            # 反向递推(失败时增大正则化)
+            res = self._backward(X, U, xs, mu)
+            if res is None:
+                mu = max(mu * 10, mu_min)
+                if mu > mu_max:
+                    break
+                continue
+            k, K, dV = res
+
+            # 前向线搜索
+            accepted = False
+            for alpha in alphas:
+                X_new, U_new = self._forward(x0, X, U, k, K, alpha)
+                J_new = self.cost(X_new, U_new, xs)
+                expected = -(alpha * dV[0] + alpha**2 * dV[1])
+                if (expected > 0 and (J - J_new) / expected > 1e-4) or (expected <= 0 and J_new < J):
+                    accepted = True
+                    break
+
+            if not accepted:
+                mu = mu * 10
+                if mu > mu_max:
+                    break
+                continue
+
+            mu = max(mu / 10, mu_min)
+            converged = (J - J_new) < self.tol * max(abs(J), 1.0)
+            X, U, J = X_new, U_new, J_new
+            if converged:
+                break
+
+        total_time = time.time() - start_time
+        self.iterations = it + 1
+        self.final_cost = J
+        print(f"iLQR求解完成: 迭代 {self.iterations} 次, 代价 = {J:.4f}, 总耗时 = {total_time:.4f}s")
+
+        t_opt = np.linspace(0, self.N*self.T, self.N+1)
+        return X, U, t_opt
+
+
+def bicycle_model(wheel_base=3.0):
+    """自行车(阿克曼)运动学模型，状态[x, y, theta]，控制[v, delta]，与irsim的acker模型一致"""
+    states = ca.SX.sym('x', 3)
+    controls = ca.SX.sym('u', 2)
+    theta = states[2]
+    v, delta = controls[0], controls[1]
+    rhs = ca.vertcat(
+        v * ca.cos(theta),
+        v * ca.sin(theta),
+        v * ca.tan(delta) / wheel_base
+    )
+    return ca.Function('f_bicycle', [states, controls], [rhs])
+
+
+if __name__ == '__main__':
+    # 复用5_mpc_solve.py的运动学模型与IPOPT求解器作为对比基准
+    mpc = importlib.import_module('5_mpc_solve')
+    ipopt_opt = mpc.TrajectoryOptimizer(T=0.1, N=200)
+
+    x0 = np.array([0.0, 0.0, -np.pi])
+    xs = np.array([2.0, 2.0, np.pi/2])
+
+    # 1. 独轮车模型: 相同的离散模型、权重与控制约束
+    ilqr = ILQRSolver(ipopt_opt.f, 3, 2, T=0.1, N=200,
+                      Q=ipopt_opt.Q, R=ipopt_opt.R, Qf=ipopt_opt.Qf,
+                      u_min=[-ipopt_opt.v_max, -ipopt_opt.omega_max],
+                      u_max=[ipopt_opt.v_max, ipopt_opt.omega_max])
+    t0 = time.time()
+    X_ilqr, U_ilqr, _ = ilqr.solve(x0, xs)
+    time_ilqr = time.time() - t0
+
+    t0 = time.time()
+    X_ipopt, U_ipopt, _ = ipopt_opt.solve(x0.reshape(-1, 1), xs.reshape(-1, 1))
+    time_ipopt = time.time() - t0
+
+    print(f"iLQR : 代价 = {ilqr.cost(X_ilqr, U_ilqr, xs):.4f}, 耗时 = {time_ilqr:.4f}s")
+    if X_ipopt is not None:
+        print(f"IPOPT: 代价 = {ilqr.cost(X_ipopt, U_ipopt, xs):.4f}, 耗时 = {time_ipopt:.4f}s")
+
+    # 2. 自行车模型(轴距与path_track.yaml一致)
+    ilqr_bicycle = ILQRSolver(bicycle_model(wheel_base=3.0), 3, 2, T=0.1, N=200,
+                              Q=np.diag([20.0, 20.0, 100.0]), R=np.diag([1.0, 1.0]),
+                              Qf=np.diag([200.0, 200.0, 1000.0]),
+                              u_min=[-5.0, -1.0], u_max=[5.0, 1.0])
+    ilqr_bicycle.solve(np.array([0.0, 0.0, 0.0]), np.array([10.0, 5.0, np.pi/2]))
@@ -0,0 +1,59 @@
+import irsim
+import importlib
+import numpy as np
+from local_goal import LocalGoalSelector, densify
+from rate_loop import RateLoop
+
+# 复用6_mpc_solve_obs.py中的带障碍约束的MPC(关闭终端等式约束, 作为短时域滚动优化)
+TrajectoryOptimizer = importlib.import_module('6_mpc_solve_obs').TrajectoryOptimizer
+
+
+if __name__ == '__main__':
+    # 障碍物(与robot_world.yaml一致)
+    obstacles = [
+        {'x': 0.6, 'y': 1.0, 'r': 0.8, 'safety_dist': 0.1},
+        {'x': 1.5, 'y': 1.5, 'r': 0.3, 'safety_dist': 0.1}
+    ]
+
+    # 全局路径: 绕开障碍物的折线, 加密后作为全局参考
+    global_path = densify([[0.0, 0.0], [1.0, -0.3], [1.9, 0.3], [2.2, 1.0], [2.3, 1.6], [2.0, 2.0]])
+
+    # 短时域MPC: N=20(2s), 局部目标取在其可达距离的一半处
+    # 局部目标的航向只是沿路径的提示, 航向权重过大时机器人会提前转向, 在拐角处被障碍约束卡住
+    T, N, v_max = 0.1, 20, 0.8
+    Q = np.diag([20.0, 20.0, 5.0])
+    optimizer = TrajectoryOptimizer(T=T, N=N, v_max=v_max, omega_max=1.0, obstacles=obstacles,
+                                    terminal_constraint=False, verbose=False, Q=Q, Qf=Q)
+    selector = LocalGoalSelector(global_path, lookahead=0.5 * v_max * N * T, alpha=1.5, obstacles=obstacles)
+
+    env = irsim.make('robot_world.yaml', save_ani=True, display=True, full=False)
+    env.draw_trajectory([p.reshape(2, 1) for p in global_path], traj_type='--k')
+
+    loop = RateLoop(rate_hz=1.0/T)
+    u_plan, k = None, 0
+    for i in loop.ticks(500):
+        state = env.get_robot_state().reshape(-1)[:3]
+
+        # 选择局部目标(航向角展开到当前航向附近, 避免绕圈)
+        with loop.stage('goal'):
+            _, goal = selector.select(state[:2])
+            goal[2] = state[2] + np.arctan2(np.sin(goal[2] - state[2]), np.cos(goal[2] - state[2]))
+
+        # 短时域MPC求解, 只执行第一步控制(求解失败时沿用上一次规划的后续控制)
+        with loop.stage('mpc'):
+            x_opt, u_opt, _ = optimizer.solve(state.reshape(-1, 1), goal.reshape(-1, 1))
+        if u_opt is not None:
+            u_plan, k = u_opt, 0
+        elif u_plan is not None and k + 1 < len(u_plan):
+            k += 1
+        else:
+            break
+
+        env.step(action_id=0, action=u_plan[k].reshape(-1, 1))
+        env.render()
+        if env.done():
+            break
+
+    loop.report()
+    print(f"{'到达' if env.done() else '未到达'}全局路径终点, 共 {loop.n_ticks} 个周期")
+    env.end(ani_name='local_goal_mpc', ending_time=loop.n_ticks*T)
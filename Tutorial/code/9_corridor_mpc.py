@@ -0,0 +1,245 @@
+import irsim
+import time
+import importlib
+import casadi as ca
+import numpy as np
+from local_goal import LocalGoalSelector, densify
+from rate_loop import RateLoop
+
+# 复用6_mpc_solve_obs.py中的运动学模型与权重设置
+TrajectoryOptimizer = importlib.import_module('6_mpc_solve_obs').TrajectoryOptimizer
+
+
+class CorridorGenerator:
+    def __init__(self, obstacles, robot_radius=0.2):
+        """
+        凸走廊生成器: 在上一条轨迹的每个状态点处, 为每个圆形障碍物生成一个切平面半空间
+        :param obstacles: 障碍物列表，格式同6_mpc_solve_obs.py {'x', 'y', 'r', 'safety_dist'}
+        :param robot_radius: 车辆半径
+        """
+        self.centers = np.array([[o['x'], o['y']] for o in obstacles]).reshape(-1, 2)
+        self.min_dist = np.array([o['r'] + robot_radius + o['safety_dist'] for o in obstacles])
+
+    @property
+    def n_planes(self):
+        return len(self.centers)
+
+    def generate(self, traj):
+        """
+        :param traj: 参考轨迹 (N+1, >=2)，一般取上一次求解结果平移一步
+        :return: 半空间 (N+1, M, 3)，每行[a, b, c]表示 a*x + b*y + c >= 0
+        """
+        p = np.asarray(traj, dtype=float)[:, None, :2]      # (N+1, 1, 2)
+        d = p - self.centers[None]                          # (N+1, M, 2)
+        dist = np.linalg.norm(d, axis=2, keepdims=True)
+        # 法向量由障碍物中心指向参考点(重合时任取一个方向)
+        n = np.where(dist > 1e-9, d / np.maximum(dist, 1e-9), np.array([1.0, 0.0]))
+        # 边界线与障碍物中心的距离为最小安全距离
+        c = -(np.einsum('kmi,mi->km', n, self.centers) + self.min_dist)
+        return np.concatenate((n, c[..., None]), axis=2)
+
+
+class CorridorMPC(TrajectoryOptimizer):
+    def __init__(self, T=0.1, N=30, v_max=0.8, omega_max=1.0, n_planes=2, qpsol='qpoases', qp_opts=None,
+                 Q=None, R=None, Qf=None, trust_region=(0.3, 0.3, 0.5)):
+        """
+        凸走廊MPC: 障碍约束为以参数形式传入的逐阶段线性半空间(由CorridorGenerator生成),
+        运动学在参考轨迹处线性化，每次迭代只需求解一个凸QP(SQP, 实时迭代时只做一次)
+        :param n_planes: 每个阶段的半空间数量
+        :param qpsol: CasADi的QP求解器插件，'qpoases'(默认, 有效集法, 参考轨迹贴着走廊边界时同样可靠) 或 'osqp'
+        :param qp_opts: 覆盖求解器插件的选项(osqp为 {'max_iter': ..., 'eps_abs': ...} 等)
+        :param Q, R, Qf: 权重矩阵, 同6_mpc_solve_obs.py
+        :param trust_region: 信赖域, 每个预测状态与参考轨迹之差 |X - Xr| 的上限 [x, y, theta];
+                             限制线性化误差, 并使走廊只在参考轨迹附近使用, 下一次迭代在新的解附近重新生成走廊; None时不限制
+        """
+        self.n_planes = n_planes
+        self.trust_region = None if trust_region is None else np.asarray(trust_region, dtype=float)
+        self.qpsol = qpsol
+        self.qp_opts = qp_opts or {}
+        super().__init__(T=T, N=N, v_max=v_max, omega_max=omega_max, obstacles=None,
+                         terminal_constraint=False, verbose=False, Q=Q, R=R, Qf=Qf)
+
+    def _build_optimizer(self):
+        """构建参数化QP: 参数为初始状态、目标状态、参考轨迹与各阶段半空间"""
+        n, m, N, M = self.n_states, self.n_controls, self.N, self.n_planes
+        U = ca.SX.sym('U', m, N)
+        X = ca.SX.sym('X', n, N+1)
+        # 参数: [初始状态, 目标状态, 参考控制(m x N), 参考状态(n x N+1), 各阶段半空间(3M x N+1)]
+        self.n_params = 2*n + m*N + n*(N+1) + 3*M*(N+1)
+        P = ca.SX.sym('P', self.n_params)
+        x0, xs = P[:n], P[n:2*n]
+        Ur = ca.reshape(P[2*n:2*n + m*N], m, N)
+        Xr = ca.reshape(P[2*n + m*N:2*n + m*N + n*(N+1)], n, N+1)
+        H = ca.reshape(P[2*n + m*N + n*(N+1):], 3*M, N+1)
+
+        # 运动学在参考点处一阶展开: f(x, u) ≈ f(xr, ur) + A (x - xr) + B (u - ur)
+        xr_s, ur_s = ca.SX.sym('xr', n), ca.SX.sym('ur', m)
+        dx_s, du_s = ca.SX.sym('dx', n), ca.SX.sym('du', m)
+        f_r = self.f(xr_s, ur_s)
+        f_lin = f_r + ca.mtimes(ca.jacobian(f_r, xr_s), dx_s) + ca.mtimes(ca.jacobian(f_r, ur_s), du_s)
+        F_lin = ca.Function('f_lin', [xr_s, ur_s, dx_s, du_s], [f_lin]).map(N)
+
+        # 初始状态约束与线性化后的运动学约束(欧拉离散)
+        g = [X[:, 0] - x0,
+             ca.reshape((X[:, 1:] - X[:, :-1]) / self.T
+                        - F_lin(Xr[:, :-1], Ur, X[:, :-1] - Xr[:, :-1], U - Ur), -1, 1)]
+
+        # 走廊约束: a*x + b*y + c >= 0，对决策变量是线性的
+        for j in range(M):
+            a, b, c = H[3*j, :], H[3*j+1, :], H[3*j+2, :]
+            g.append((a * X[0, :] + b * X[1, :] + c).T)
+
+        # 信赖域: 预测状态与参考轨迹之差(初始状态已固定)
+        if self.trust_region is not None:
+            g.append(ca.reshape(X[:, 1:] - Xr[:, 1:], -1, 1))
+
+        # 目标函数(与6_mpc_solve_obs.py相同的二次型, 各阶段 e^T Q e 之和为 <E, Q E>, 对非对角权重同样成立)
+        E = X[:, :-1] - ca.repmat(xs, 1, N)
+        obj = ca.dot(E, ca.mtimes(self.Q, E)) + ca.dot(U, ca.mtimes(self.R, U))
+        obj += ca.mtimes([(X[:, -1] - xs).T, self.Qf, X[:, -1] - xs])
+
+        opt_vars = ca.vertcat(ca.reshape(U, -1, 1), ca.reshape(X, -1, 1))
+        qp_prob = {'f': obj, 'x': opt_vars, 'p': P, 'g': ca.vertcat(*g)}
+
+        opts = {'print_time': 0, 'error_on_fail': False}
+        if self.qpsol == 'qpoases':
+            opts.update({'printLevel': 'none', 'sparse': True}, **self.qp_opts)
+        elif self.qpsol == 'osqp':
+            # 参考轨迹贴着走廊边界时ADMM收敛慢, 默认的迭代上限(4000)不够, 并用polish得到精确的有效集解
+            opts['osqp'] = dict({'verbose': False, 'eps_abs': 1e-5, 'eps_rel': 1e-5,
+                                 'max_iter': 20000, 'polish': True}, **self.qp_opts)
+        self.solver = ca.qpsol('solver', self.qpsol, qp_prob, opts)
+
+        # 约束上下界: 等式约束为0，走廊约束 >= 0，信赖域为 ±trust_region
+        n_eq = n * (N+1)
+        n_corr = M * (N+1)
+        self.lbg = np.zeros(n_eq + n_corr)
+        self.ubg = np.concatenate((np.zeros(n_eq), np.full(n_corr, np.inf)))
+        if self.trust_region is not None:
+            self.lbg = np.concatenate((self.lbg, np.tile(-self.trust_region, N)))
+            self.ubg = np.concatenate((self.ubg, np.tile(self.trust_region, N)))
+        self.lbx = np.concatenate((np.tile([-self.v_max, -self.omega_max], N), np.full(n*(N+1), -np.inf)))
+        self.ubx = np.concatenate((np.tile([self.v_max, self.omega_max], N), np.full(n*(N+1), np.inf)))
+
+    def solve(self, x0, xs, halfspaces, x_ref, u_ref, n_iter=1):
+        """
+        求解一次滚动优化
+        :param x0: 当前状态 [x, y, theta]
+        :param xs: 目标状态 [x, y, theta]
+        :param halfspaces: 走廊半空间 (N+1, M, 3)
+        :param x_ref, u_ref: 线性化参考轨迹 (N+1, 3) 与控制 (N, 2)，一般取上一次的解平移一步
+        :param n_iter: SQP迭代次数(每次以上一次QP的解重新线性化，走廊保持不变)
+        :return: 状态轨迹、控制序列、求解耗时(求解失败时轨迹与控制为None)
+        """
+        x0 = np.asarray(x0, dtype=float).flatten()
+        xs = np.asarray(xs, dtype=float).flatten()
+        hs = np.asarray(halfspaces, dtype=float).reshape(self.N+1, -1).flatten()
+
+        start_time = time.time()
+        for _ in range(n_iter):
+            c_p = np.concatenate((x0, xs, u_ref.flatten(), x_ref.flatten(), hs))
+            res = self.solver(x0=np.concatenate((u_ref.flatten(), x_ref.flatten())), p=c_p,
+                              lbg=self.lbg, ubg=self.ubg, lbx=self.lbx, ubx=self.ubx)
+            if not self.solver.stats()['success']:
+                return None, None, time.time() - start_time
+            opt_result = res['x'].full().flatten()
+            u_ref = opt_result[:self.n_controls*self.N].reshape(self.N, self.n_controls)
+            x_ref = opt_result[self.n_controls*self.N:].reshape(self.N+1, self.n_states)
+        return x_ref, u_ref, time.time() - start_time
+
+
+def shift(traj):
+    """将上一次的解平移一步作为下一次的参考轨迹(末尾重复最后一个点)"""
+    return np.vstack((traj[1:], traj[-1:]))
+
+
+if __name__ == '__main__':
+    # 障碍物(与robot_world.yaml一致)
+    obstacles = [
+        {'x': 0.6, 'y': 1.0, 'r': 0.8, 'safety_dist': 0.1},
+        {'x': 1.5, 'y': 1.5, 'r': 0.3, 'safety_dist': 0.1}
+    ]
+    # 全局路径与局部目标选择同8_local_goal_mpc.py
+    global_path = densify([[0.0, 0.0], [1.0, -0.3], [1.9, 0.3], [2.2, 1.0], [2.3, 1.6], [2.0, 2.0]])
+    T, N, v_max = 0.1, 20, 0.8
+    Q = np.diag([20.0, 20.0, 5.0])  # 局部目标的航向只是提示, 权重同8_local_goal_mpc.py
+    n_scp, scp_tol = 4, 1e-3  # 每个控制周期最多的走廊更新次数, 解的变化小于scp_tol时提前结束
+    selector = LocalGoalSelector(global_path, lookahead=0.5 * v_max * N * T, alpha=1.5, obstacles=obstacles)
+
+    corridor = CorridorGenerator(obstacles, robot_radius=0.2)
+    mpc = CorridorMPC(T=T, N=N, v_max=v_max, omega_max=1.0, n_planes=corridor.n_planes, Q=Q, Qf=Q)
+    # 非凸距离约束的MPC: 用于生成首个参考轨迹、QP失败时兜底，并对比求解耗时
+    mpc_dist = TrajectoryOptimizer(T=T, N=N, v_max=v_max, omega_max=1.0, obstacles=obstacles,
+                                   terminal_constraint=False, verbose=False, Q=Q, Qf=Q)
+
+    env = irsim.make('robot_world.yaml', save_ani=True, display=True, full=False)
+    env.draw_trajectory([p.reshape(2, 1) for p in global_path], traj_type='--k')
+
+    loop = RateLoop(rate_hz=1.0/T)
+    x_prev, u_prev = None, None
+    n_fallback = 0      # QP失败后由非凸MPC兜底的周期数
+    n_qp = 0            # QP求解总次数
+    samples = []        # 各周期的(状态, 局部目标), 用于循环结束后的耗时对比
+    for i in loop.ticks(500):
+        state = env.get_robot_state().reshape(-1)[:3]
+        _, goal = selector.select(state[:2])
+        goal[2] = state[2] + np.arctan2(np.sin(goal[2] - state[2]), np.cos(goal[2] - state[2]))
+        samples.append((state.copy(), goal.copy()))
+
+        u_qp = None
+        if x_prev is not None:
+            # 参考轨迹: 上一次的解平移一步; 在参考轨迹周围生成走廊并在信赖域内求解QP,
+            # 再以QP的解重新生成走廊(序列凸规划), 使轨迹可以沿障碍物边界滑动
+            x_ref, u_ref = shift(x_prev), shift(u_prev)
+            x_ref[0] = state
+            for _ in range(n_scp):
+                with loop.stage('corridor'):
+                    halfspaces = corridor.generate(x_ref)
+                with loop.stage('qp'):
+                    x_qp, u_qp, _ = mpc.solve(state, goal, halfspaces, x_ref, u_ref)
+                n_qp += 1
+                if u_qp is None:
+                    break
+                converged = np.abs(x_qp - x_ref).max() < scp_tol
+                x_ref, u_ref = x_qp, u_qp
+                if converged:
+                    break
+        if u_qp is not None:
+            x_opt, u_opt = x_qp, u_qp
+        else:
+            # 直线初值穿过障碍物时走廊不可行, 首个参考轨迹取非凸MPC的解; QP失败时同样由其兜底
+            if x_prev is not None:
+                n_fallback += 1
+                print(f"周期 {i}: 走廊QP求解失败({mpc.solver.stats()['return_status']}), 使用非凸MPC的解")
+            with loop.stage('nlp'):
+                x_opt, u_opt, _ = mpc_dist.solve(state.reshape(-1, 1), goal.reshape(-1, 1))
+        if u_opt is None:
+            break
+        x_prev, u_prev = x_opt, u_opt
+
+        env.step(action_id=0, action=u_opt[0].reshape(-1, 1))
+        env.render()
+        if env.done():
+            break
+
+    # 'qp'为凸走廊MPC每周期的求解耗时, 'nlp'只在首个周期与QP失败时出现
+    loop.report()
+    print(f"QP失败兜底 {n_fallback} 次 / {loop.n_ticks} 个周期, "
+          f"{'到达' if env.done() else '未到达'}全局路径终点")
+
+    # 耗时对比: 在循环中记录的相同状态与局部目标上, 单独求解非凸距离约束的MPC(IPOPT)
+    # 'qp'为每周期全部SCP迭代的耗时之和
+    qp_times = loop.stage_times.get('qp', np.zeros(0))[:loop.n_ticks]
+    qp_times = qp_times[qp_times > 0]
+    if len(qp_times):
+        print(f"每周期平均 {n_qp / len(qp_times):.2f} 次QP, 单次QP平均 {qp_times.sum() / n_qp * 1e3:.3f} ms")
+    nlp_times = np.zeros(len(samples))
+    for k, (s, g) in enumerate(samples):
+        start = time.perf_counter()
+        mpc_dist.solve(s.reshape(-1, 1), g.reshape(-1, 1))
+        nlp_times[k] = time.perf_counter() - start
+    for name, times in [(f'QP({mpc.qpsol})', qp_times), ('NLP(ipopt)', nlp_times)]:
+        if len(times):
+            p50, p99 = np.percentile(times, [50, 99]) * 1e3
+            print(f"  {name:>14s} [ms]: p50 = {p50:.3f}, p99 = {p99:.3f}, max = {times.max()*1e3:.3f}")
+    env.end(ani_name='corridor_mpc', ending_time=loop.n_ticks*T)
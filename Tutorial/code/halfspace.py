@@ -0,0 +1,71 @@
+"""
+基于KD树的点云最近点查询与多半空间约束提取, 原理见 Tutorial/半空间约束.md
+对最近点生成一个半空间后, 剔除被该半空间排除的点, 再对剩余点重复(最近点剥离), 得到描述局部自由区域的多个半空间
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class HalfspaceExtractor:
+    def __init__(self, radius=3.0, max_planes=16, margin=0.0):
+        """
+        :param radius: 只考虑查询点周围该半径内的点(局部自由区域)
+        :param max_planes: 最多生成的半空间数量
+        :param margin: 半空间向查询点方向收缩的距离(如机器人半径)，距边界线不足margin的点不再生成新的半空间
+        """
+        self.radius = radius
+        self.max_planes = max_planes
+        self.margin = margin
+        self.points = np.empty((0, 2))
+        self.tree = None
+
+    def update(self, points):
+        """接入一帧新的全局坐标点云 (m, 2)，重建空间索引"""
+        self.points = np.ascontiguousarray(points, dtype=float)
+        # 激光点沿障碍物轮廓分布, 非紧凑节点的KD树建树与查询更快
+        self.tree = cKDTree(self.points, compact_nodes=False, balanced_tree=False)
+
+    def nearest(self, center):
+        """返回离center最近的点及其距离"""
+        dist, idx = self.tree.query(center)
+        return self.points[idx], dist
+
+    def halfspaces(self, pose):
+        """
+        提取查询位姿周围的半空间约束
+        :param pose: [x, y] 或 [x, y, theta](只使用位置)
+        :return: normals (k, 2), c (k,)，自由区域为 normals @ p + c >= 0，按最近点距离从近到远排列
+        """
+        o = np.asarray(pose, dtype=float)[:2]
+        normals, offsets = [], []
+        if self.tree is None or len(self.points) == 0:
+            return np.empty((0, 2)), np.empty(0)
+
+        # 局部区域内的点按到查询点的距离排序
+        idx = np.asarray(self.tree.query_ball_point(o, self.radius), dtype=int)
+        if len(idx) == 0:
+            return np.empty((0, 2)), np.empty(0)
+        local = self.points[idx]
+        d = np.hypot(local[:, 0] - o[0], local[:, 1] - o[1])
+        order = np.argsort(d)
+        local, d = local[order], d[order]
+
+        # 最近点剥离: 每次取剩余点中最近的点(排序后的首个点)生成半空间，并剔除被其排除的点
+        keep = d > 1e-9  # 与查询点重合的点无法确定法向量
+        local, d = local[keep], d[keep]
+        while len(local) > 0 and len(normals) < self.max_planes:
+            p = local[0]
+
+            # 法向量由最近点指向查询点，边界线过最近点
+            n = (o - p) / d[0]
+            c = -n @ p
+            normals.append(n)
+            offsets.append(c - self.margin)
+
+            # 只保留位于(收缩后的)半空间内部的点，margin同时吸收了点云噪声
+            # 生成该半空间的最近点显式剔除, 不依赖舍入误差下的严格不等式(margin=0时可能重复生成同一平面)
+            keep = local[1:] @ n + c - self.margin > 0.0
+            local, d = local[1:][keep], d[1:][keep]
+
+        return np.array(normals).reshape(-1, 2), np.array(offsets)
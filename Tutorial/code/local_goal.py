@@ -0,0 +1,149 @@
+"""
+局部目标包裹器(向量化版本), 推导见 Tutorial/局部目标包裹器.md
+对整条路径的所有线段一次性计算包裹椭圆, 并沿全局路径为机器人选择当前的局部目标
+"""
+
+import numpy as np
+
+
+def densify(waypoints, step=0.05):
+    """将折线路径按固定间距加密为长全局路径"""
+    waypoints = np.asarray(waypoints, dtype=float)
+    points = [waypoints[0]]
+    for p0, p1 in zip(waypoints[:-1], waypoints[1:]):
+        n = max(int(np.ceil(np.linalg.norm(p1 - p0) / step)), 1)
+        t = np.linspace(0, 1, n + 1)[1:, None]
+        points.extend(p0 + t * (p1 - p0))
+    return np.array(points)
+
+
+def wrapper_ellipses(path, p_r, alpha=1.5):
+    """
+    计算机器人位置p_r相对于路径上每个目标点g_i的包裹椭圆
+    :param path: 路径点 (n, 2)
+    :param p_r: 机器人位置 [x_r, y_r]
+    :param alpha: 包裹系数
+    :return: 椭圆中心(n-1, 2)、半轴a(n-1,)、半轴b(n-1,)、方向角theta_g(n-1,)
+    """
+    path = np.asarray(path, dtype=float)
+    g = path[:-1]
+    # 线段方向
+    d = path[1:] - g
+    theta_g = np.arctan2(d[:, 1], d[:, 0])
+    l_vec = np.column_stack((np.cos(theta_g), np.sin(theta_g)))
+
+    # g_i 到 p_r 的距离与夹角
+    rel = np.asarray(p_r, dtype=float) - g
+    l_r = np.hypot(rel[:, 0], rel[:, 1])
+    theta_r = np.arctan2(rel[:, 1], rel[:, 0])
+
+    # 椭圆半轴与中心
+    a = np.abs(alpha * l_r * np.cos(theta_r - theta_g))
+    b = np.abs(alpha * l_r * np.sin(theta_r - theta_g))
+    center = g - a[:, None] * l_vec
+    return center, a, b, theta_g
+
+
+def wrapper_contains(center, a, b, theta_g, points, eps=1e-9):
+    """
+    判断点是否位于包裹椭圆内: 在椭圆的局部坐标系(沿 l 与其垂直方向)中检查 (u/a)^2 + (v/b)^2 <= 1
+    包裹椭圆由某个机器人位置构造, 对alpha >= 1该位置本身总在"目标点之后"的椭圆内,
+    因此查询点应为另一个位置(如构造椭圆之后机器人的新位置)
+    :param center, a, b, theta_g: wrapper_ellipses的输出, 形状 (n-1, ...)
+    :param points: 查询点 (2,) 或与椭圆一一对应的 (n-1, 2)
+    :return: (n-1,) 布尔数组
+    """
+    rel = np.asarray(points, dtype=float) - center
+    c, s = np.cos(theta_g), np.sin(theta_g)
+    u = rel[:, 0] * c + rel[:, 1] * s    # 沿 l 方向
+    v = -rel[:, 0] * s + rel[:, 1] * c   # 沿 l 的垂直方向
+    return (u / np.maximum(a, eps))**2 + (v / np.maximum(b, eps))**2 <= 1.0
+
+
+def segment_clear(p, goals, centers, radii):
+    """
+    判断p到每个目标点的线段是否避开所有圆形区域(即直线初值不穿过障碍物的安全半径)
+    :param p: 起点 [x, y]
+    :param goals: 目标点 (m, 2)
+    :param centers: 圆心 (k, 2)
+    :param radii: 半径 (k,)
+    :return: (m,) 布尔数组
+    """
+    if len(centers) == 0:
+        return np.ones(len(goals), dtype=bool)
+    # 起点已在安全半径内(求解容差)时, 只要求线段不比起点更深入
+    radii = np.minimum(radii, np.linalg.norm(centers - p, axis=1) - 1e-9)
+    # 每个圆心在每条线段上的最近点
+    d = goals - p                                                   # (m, 2)
+    t = np.einsum('ki,mi->mk', centers - p, d) / np.maximum(np.sum(d**2, axis=1), 1e-12)[:, None]
+    closest = p + np.clip(t, 0.0, 1.0)[..., None] * d[:, None]      # (m, k, 2)
+    dist = np.linalg.norm(closest - centers[None], axis=2)
+    return np.all(dist >= radii[None], axis=1)
+
+
+class LocalGoalSelector:
+    def __init__(self, path, lookahead=1.0, alpha=1.5, obstacles=None, robot_radius=0.2):
+        """
+        沿全局路径选择局部目标
+        :param path: 全局路径点 (n, 2)
+        :param lookahead: 局部目标与机器人的最小距离(一般取短时域MPC能到达的距离)
+        :param alpha: 包裹系数
+        :param obstacles: 障碍物列表，格式同6_mpc_solve_obs.py {'x', 'y', 'r', 'safety_dist'};
+                          给出时只选择机器人到目标的直线(MPC的直线初值)不穿过安全半径的路径点
+        :param robot_radius: 车辆半径
+        """
+        self.path = np.asarray(path, dtype=float)
+        self.lookahead = lookahead
+        self.alpha = alpha
+        self.progress = 0  # 机器人已越过的路径点索引(只前进不后退)
+        self.idx = 0  # 当前局部目标索引
+        self.anchor = None  # 选中当前局部目标时的机器人位置, 当前目标的包裹椭圆由其构造
+
+        obstacles = obstacles if obstacles is not None else []
+        self.centers = np.array([[o['x'], o['y']] for o in obstacles]).reshape(-1, 2)
+        self.radii = np.array([o['r'] + robot_radius + o['safety_dist'] for o in obstacles])
+
+        d = np.diff(self.path, axis=0)
+        theta = np.arctan2(d[:, 1], d[:, 0])
+        # 每个路径点的朝向(终点沿用最后一段的方向)
+        self.theta = np.append(theta, theta[-1])
+
+    def select(self, p_r):
+        """
+        选择当前局部目标
+            机器人仍在选中当前目标时构造的包裹椭圆内(未越过目标、横向未偏离)、距离不小于lookahead且直线可达时保持不变;
+            否则重新选择: 已越过的路径点之后第一个距离不小于lookahead的路径点,
+            若机器人到该点的直线被障碍物遮挡, 退回到其之前最远的直线可达路径点
+        :return: 目标索引, 目标状态[x, y, theta]
+        """
+        p_r = np.asarray(p_r, dtype=float)[:2]
+        n = len(self.path)
+        sub = self.path[self.progress:]
+        if len(sub) >= 2:
+            # 机器人位于路径点沿路径方向的前侧即视为已越过(与包裹椭圆中 cos(theta_r - theta_g) 的符号一致)
+            passed = np.einsum('ij,ij->i', p_r - sub[:-1], np.diff(sub, axis=0)) >= 0.0
+            self.progress += int(np.argmin(passed)) if not passed.all() else len(sub) - 1
+        if self.idx < self.progress or not self._holds(p_r):
+            sub = self.path[self.progress:]
+            far = np.flatnonzero(np.hypot(sub[:, 0] - p_r[0], sub[:, 1] - p_r[1]) >= self.lookahead)
+            j = far[0] if len(far) > 0 else len(sub) - 1
+            clear = np.flatnonzero(segment_clear(p_r, sub[:j + 1], self.centers, self.radii))
+            self.idx = self.progress + (clear[-1] if len(clear) > 0 else j)
+            self.anchor = p_r
+        goal = np.array([self.path[self.idx, 0], self.path[self.idx, 1], self.theta[self.idx]])
+        return self.idx, goal
+
+    def _holds(self, p_r):
+        """当前局部目标是否仍然有效"""
+        if self.anchor is None:
+            return False
+        if self.idx >= len(self.path) - 1:
+            return True  # 已选到全局路径终点
+        g = self.path[self.idx:self.idx + 2]
+        inside = wrapper_contains(*wrapper_ellipses(g, self.anchor, self.alpha), p_r)[0]
+        far = np.hypot(*(g[0] - p_r)) >= self.lookahead
+        return inside and far and segment_clear(p_r, g[:1], self.centers, self.radii)[0]
+
+    def reached_end(self):
+        """是否已选到全局路径终点"""
+        return self.idx >= len(self.path) - 1
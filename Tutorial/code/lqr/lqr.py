@@ -1,19 +1,135 @@
 import irsim
+import os
 import sys
 import numpy as np
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from path_index import PathIndex
+from path_file import load_reference_path
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rate_loop import RateLoop
 
 # 构造环境
 env = irsim.make("path_track.yaml", save_ani=False, display=True)
 
-# 从csv提取参考路径
-ref_path = np.genfromtxt('./ovalpath.csv', delimiter=',', skip_header=1)
-xyz_matrix = ref_path[:, 0:3]
-formatted_path_list = []
-for waypoint in xyz_matrix:
-    column_vector = waypoint.reshape((3, 1))
-    formatted_path_list.append(column_vector)
-env.draw_trajectory(formatted_path_list, traj_type='-k') # plot path
+# 提取参考路径（首次运行时将csv转换为二进制文件，之后直接内存映射）
+ref_path = load_reference_path('./ovalpath.csv')
+env.draw_trajectory([waypoint.reshape((3, 1)) for waypoint in ref_path[:, 0:3]], traj_type='-k') # plot path
+
+
+def solve_are(A, B, Q, R):
+    """solve algebraic riccati equation with the Arimoto-Potter algorithm
+    Ref: https://qiita.com/trgkpc/items/8210927d5b035912a153
+    """
+    # define hamiltonian matrix
+    H = np.block([[A, -B @ np.linalg.inv(R) @ B.T],
+                  [-Q , -A.T]])
+
+    # solve eigenvalue problem
+    eigenvalue, w = np.linalg.eig(H)
+
+    # define Y and Z, which are used to calculate P
+    Y_, Z_ = [], []
+    n = len(w[0])//2
+
+    # sort eigenvalues
+    index_array = sorted([i for i in range(2*n)],
+        key = lambda x:eigenvalue[x].real)
+
+    # choose n eigenvalues which have smaller real part
+    for i in index_array[:n]:
+        Y_.append(w.T[i][:n])
+        Z_.append(w.T[i][n:])
+    Y = np.array(Y_).T
+    Z = np.array(Z_).T
+
+    # calculate P
+    if np.linalg.det(Y) != 0:
+        return Z @ np.linalg.inv(Y)
+    else:
+        print("Warning: Y is not regular matrix. Result may be wrong!") # TODO : need to consider mathmatical meaning of this case.
+        return Z @ np.linalg.pinv(Y)
+
+
+def lateral_model(v: float, beta: float, wheel_base: float):
+    """linearized lateral error model (state: [y_e, theta_e], input: steer)"""
+    A = np.array([
+        [0, v],
+        [0, 0],
+    ])
+    B = np.array([
+        [0],
+        [v / (wheel_base * (np.cos(beta))**2)],
+    ])
+    return A, B
+
+
+class LQRGainSchedule():
+    def __init__(
+            self,
+            wheel_base: float = 2.5, # [m] wheel_base
+            Q: np.ndarray = np.diag([1.0, 1.0]), # weight matrix for state variables
+            R: np.ndarray = np.diag([1.0]), # weight matrix for control inputs
+            v_grid: np.ndarray = np.linspace(1.0, 5.0, 9), # [m/s] speed grid
+            beta_grid: np.ndarray = np.linspace(-1.0, 1.0, 41), # [rad] steer grid
+            cache_size: int = 256, # [entries] exact-key LRU cache size
+    ) -> None:
+        """precompute lqr feedback gains over a (v, beta) grid"""
+        self.l = wheel_base
+        self.Q = Q
+        self.R = R
+        self.R_inv = np.linalg.inv(R)
+        self.v_grid = np.asarray(v_grid, dtype=float)
+        self.beta_grid = np.asarray(beta_grid, dtype=float)
+
+        # 增益表 K[i, j] 对应 (v_grid[i], beta_grid[j])，离线求解所有 Riccati 方程
+        self.table = np.zeros((len(self.v_grid), len(self.beta_grid), 2))
+        for i, v in enumerate(self.v_grid):
+            for j, beta in enumerate(self.beta_grid):
+                self.table[i, j] = self.exact_gain(v, beta)
+
+        # 恒速行驶时 (v, beta) 经常重复，精确键缓存可以跳过插值
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def exact_gain(self, v: float, beta: float) -> np.ndarray:
+        """solve the ARE for a single operating point, returns f of shape (2,)"""
+        A, B = lateral_model(v, beta, self.l)
+        P = solve_are(A, B, self.Q, self.R)
+        f = self.R_inv @ B.T @ P
+        return f[0].real
+
+    def gain(self, v: float, beta: float) -> np.ndarray:
+        """look up the feedback gain for (v, beta)"""
+        key = (float(v), float(beta))
+        f = self.cache.get(key)
+        if f is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return f
+
+        self.misses += 1
+        if self.v_grid[0] <= v <= self.v_grid[-1] and self.beta_grid[0] <= beta <= self.beta_grid[-1]:
+            f = self._interpolate(v, beta)
+        else:
+            # 超出增益表范围时退回到在线求解
+            f = self.exact_gain(v, beta)
+
+        self.cache[key] = f
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return f
+
+    def _interpolate(self, v: float, beta: float) -> np.ndarray:
+        """bilinear interpolation in the gain table"""
+        i = np.clip(np.searchsorted(self.v_grid, v) - 1, 0, len(self.v_grid) - 2)
+        j = np.clip(np.searchsorted(self.beta_grid, beta) - 1, 0, len(self.beta_grid) - 2)
+        tv = (v - self.v_grid[i]) / (self.v_grid[i+1] - self.v_grid[i])
+        tb = (beta - self.beta_grid[j]) / (self.beta_grid[j+1] - self.beta_grid[j])
+        return ((1 - tv) * (1 - tb) * self.table[i, j] + tv * (1 - tb) * self.table[i+1, j]
+                + (1 - tv) * tb * self.table[i, j+1] + tv * tb * self.table[i+1, j+1])
 
 
 class LQRLateralController():
@@ -23,6 +139,8 @@ class LQRLateralController():
             Q: np.ndarray = np.diag([1.0, 1.0]), # weight matrix for state variables
             R: np.ndarray = np.diag([1.0]), # weight matrix for control inputs
             ref_path: np.ndarray = np.array([[0.0, 0.0, 0.0, 1.0], [10.0, 0.0, 0.0, 1.0]]),
+            gain_schedule: LQRGainSchedule = None, # precomputed gains, None -> solve ARE online
+            path_index: PathIndex = None, # continuous projection, None -> windowed waypoint search
     ) -> None:
         """initialize lqr controller for path-tracking"""
         # 轴距
@@ -31,10 +149,17 @@ class LQRLateralController():
         # 权重矩阵
         self.Q = Q # weight matrix for state variables
         self.R = R # weight matrix for control inputs
+        self.R_inv = np.linalg.inv(R)
+
+        # 增益调度表（可选）
+        self.gain_schedule = gain_schedule
 
         # 获取参考路径
         self.ref_path = ref_path
         self.prev_waypoints_idx = 0
+        self.path_index = path_index
+        self.prev_s = 0.0 # [m] arc length of the previous projection, progress hint for path_index
+        self.lateral_error = 0.0 # [m] signed lateral error of the previous projection (path_index only)
 
     def calc_control_input(self, observed_x: np.ndarray,velocity: float, delta_t: float) -> float:
         """calculate control input"""
@@ -52,76 +177,59 @@ class LQRLateralController():
             print("[ERROR] Reached the end of the reference path.")
             raise IndexError
 
-        # 计算车辆在参考路径的左侧或右侧
-        ## algorithm : http://www.hptown.com/ucad/Ufb00009.htm
-        x1, y1 = ref_x, ref_y
-        x2, y2 = ref_x + 1.0 * np.cos(ref_yaw), ref_y + 1.0 * np.sin(ref_yaw)
-        # 参考路径的方向向量
-        vx, vy = x2 - x1, y2 - y1
-        # 车辆位置相对于参考路径起点的向量
-        wx, wy =  x - x1,  y - y1
-        # 叉乘判断车辆位置，主要根据 sin(theta)正负判断
-        s = vx * wy - vy * wx # s>0 : vehicle is on the left of the path, s<0 : vehicle is on the left of the path,
-
-        # 计算横向偏移
-        y_e = np.sign(s) * np.sqrt((ref_x-x)**2 + (ref_y-y)**2) # lateral error
+        if self.path_index is not None:
+            # 连续投影已给出带符号的横向偏移
+            y_e = self.lateral_error
+        else:
+            # 计算车辆在参考路径的左侧或右侧
+            ## algorithm : http://www.hptown.com/ucad/Ufb00009.htm
+            x1, y1 = ref_x, ref_y
+            x2, y2 = ref_x + 1.0 * np.cos(ref_yaw), ref_y + 1.0 * np.sin(ref_yaw)
+            # 参考路径的方向向量
+            vx, vy = x2 - x1, y2 - y1
+            # 车辆位置相对于参考路径起点的向量
+            wx, wy =  x - x1,  y - y1
+            # 叉乘判断车辆位置，主要根据 sin(theta)正负判断
+            s = vx * wy - vy * wx # s>0 : vehicle is on the left of the path, s<0 : vehicle is on the left of the path,
+
+            # 计算横向偏移
+            y_e = np.sign(s) * np.sqrt((ref_x-x)**2 + (ref_y-y)**2) # lateral error
         # 计算航向误差
         theta_e = yaw - ref_yaw # heading error
         # 限制范围
         theta_e = np.arctan2(np.sin(theta_e), np.cos(theta_e)) # normalize heading error to [-pi, pi]
 
+        # 使用增益调度表时无需在控制循环中求解 Riccati 方程
+        if self.gain_schedule is not None:
+            f = self.gain_schedule.gain(v, beta)
+            return -f @ np.array([y_e, theta_e])
+
         # define A, B matrices and solve algebraic riccati equation to get feedback gain matrix f for LQR
-        A = np.array([
-            [0, v],
-            [0, 0],
-        ])
-        B = np.array([
-            [0],
-            [v / (self.l * (np.cos(beta))**2)],
-        ])
+        A, B = lateral_model(v, beta, self.l)
 
         # 计算最优控制律
         P = self.solve_are(A, B, self.Q, self.R)
-        f = np.linalg.inv(self.R) @ B.T @ P
+        f = self.R_inv @ B.T @ P
         steer_cmd = -f @ np.array([y_e, theta_e])
 
         return steer_cmd[0].real # TODO : why does steer_cmd have imaginary part?
 
     def solve_are(self, A, B, Q, R):
-        """solve algebraic riccati equation with the Arimoto-Potter algorithm
-        Ref: https://qiita.com/trgkpc/items/8210927d5b035912a153
-        """
-        # define hamiltonian matrix
-        H = np.block([[A, -B @ np.linalg.inv(R) @ B.T],
-                      [-Q , -A.T]])
-
-        # solve eigenvalue problem
-        eigenvalue, w = np.linalg.eig(H)
-
-        # define Y and Z, which are used to calculate P
-        Y_, Z_ = [], []
-        n = len(w[0])//2
-
-        # sort eigenvalues
-        index_array = sorted([i for i in range(2*n)],
-            key = lambda x:eigenvalue[x].real)
-
-        # choose n eigenvalues which have smaller real part
-        for i in index_array[:n]:
-            Y_.append(w.T[i][:n])
-            Z_.append(w.T[i][n:])
-        Y = np.array(Y_).T
-        Z = np.array(Z_).T
-
-        # calculate P
-        if np.linalg.det(Y) != 0:
-            return Z @ np.linalg.inv(Y)
-        else:
-            print("Warning: Y is not regular matrix. Result may be wrong!") # TODO : need to consider mathmatical meaning of this case.
-            return Z @ np.linalg.pinv(Y)
+        """solve algebraic riccati equation with the Arimoto-Potter algorithm"""
+        return solve_are(A, B, Q, R)
 
     def _get_nearest_waypoint(self, x: float, y: float, update_prev_idx: bool = False):
         """search the closest waypoint to the vehicle on the reference path"""
+        # 使用路径索引时直接连续投影到路径线段上
+        if self.path_index is not None:
+            seg_idx, t, s, lateral_error, ref_x, ref_y, ref_yaw, ref_v = self.path_index.project(x, y, s_hint=self.prev_s)
+            nearest_idx = seg_idx + int(round(t))
+            if update_prev_idx:
+                self.prev_waypoints_idx = nearest_idx
+                self.prev_s = s
+                self.lateral_error = lateral_error
+            return nearest_idx, ref_x, ref_y, ref_yaw, ref_v
+
         # 仅仅检索前方一定范围的点以节省计算时间
         SEARCH_IDX_LEN = 100 # [points] forward search range
         # 记录上次最近点的索引以加速搜索
@@ -146,32 +254,198 @@ class LQRLateralController():
         return nearest_idx, ref_x, ref_y, ref_yaw, ref_v
 
 
+class FleetLQRLateralController():
+    def __init__(
+            self,
+            num_vehicles: int,
+            wheel_base: float = 2.5, # [m] wheel_base
+            Q: np.ndarray = np.diag([1.0, 1.0]), # weight matrix for state variables
+            R: np.ndarray = np.diag([1.0]), # weight matrix for control inputs
+            ref_path: np.ndarray = np.array([[0.0, 0.0, 0.0, 1.0], [10.0, 0.0, 0.0, 1.0]]),
+    ) -> None:
+        """initialize lqr controller for K vehicles tracking the same reference path"""
+        self.K = num_vehicles
+        self.l = wheel_base # [m] wheel base
+
+        # 权重矩阵
+        self.Q = Q # weight matrix for state variables
+        self.R = R # weight matrix for control inputs
+        self.R_inv = np.linalg.inv(R)
+
+        # 每辆车各自记录上次最近点的索引
+        self.ref_path = ref_path
+        self.prev_waypoints_idx = np.zeros(self.K, dtype=int)
+        # 已到达参考路径终点的车辆（这些车辆的转向指令置零）
+        self.finished = np.zeros(self.K, dtype=bool)
+
+    def calc_control_input(self, observed_x: np.ndarray, velocity: np.ndarray, delta_t: float) -> np.ndarray:
+        """calculate control inputs, observed_x is <K x 4>, velocity is scalar or <K>, returns <K>
+
+        vehicles that reached the end of the reference path are flagged in self.finished and get
+        a zero steering command (the single-vehicle controller raises IndexError instead)
+        """
+        x = observed_x[:, 0]
+        y = observed_x[:, 1]
+        yaw = observed_x[:, 2]
+        beta = observed_x[:, 3]
+        v = np.broadcast_to(np.asarray(velocity, dtype=float), (self.K,))
+
+        # 获取参考点信息
+        _, ref_x, ref_y, ref_yaw, _ = self._get_nearest_waypoint(x, y, update_prev_idx=True)
+        self.finished = self.prev_waypoints_idx >= self.ref_path.shape[0]-1
+
+        # 叉乘判断车辆在参考路径左侧或右侧
+        s = np.cos(ref_yaw) * (y - ref_y) - np.sin(ref_yaw) * (x - ref_x)
+
+        # 横向偏移与航向误差
+        y_e = np.sign(s) * np.hypot(ref_x - x, ref_y - y) # lateral error
+        theta_e = yaw - ref_yaw # heading error
+        theta_e = np.arctan2(np.sin(theta_e), np.cos(theta_e)) # normalize heading error to [-pi, pi]
+
+        # 批量求解 Riccati 方程
+        f = self.solve_are_batch(v, beta) # <K x 2>
+        steer_cmd = -(f[:, 0] * y_e + f[:, 1] * theta_e)
+
+        # 终点处的最近点索引被截断，参考点不再有意义
+        return np.where(self.finished, 0.0, steer_cmd)
+
+    def solve_are_batch(self, v: np.ndarray, beta: np.ndarray) -> np.ndarray:
+        """Arimoto-Potter algorithm on stacked hamiltonians, returns gains f of shape <K x 2>"""
+        K = len(v)
+        b = v / (self.l * np.cos(beta)**2)
+
+        # A = [[0, v], [0, 0]], B = [[0], [b]]
+        A = np.zeros((K, 2, 2))
+        A[:, 0, 1] = v
+        B = np.zeros((K, 2, 1))
+        B[:, 1, 0] = b
+
+        # define stacked hamiltonian matrices <K x 4 x 4>
+        H = np.zeros((K, 4, 4))
+        H[:, :2, :2] = A
+        H[:, :2, 2:] = -B @ self.R_inv @ B.transpose(0, 2, 1)
+        H[:, 2:, :2] = -self.Q
+        H[:, 2:, 2:] = -A.transpose(0, 2, 1)
+
+        # solve eigenvalue problems and keep the two stable eigenvectors per vehicle
+        eigenvalue, w = np.linalg.eig(H)
+        order = np.argsort(eigenvalue.real, axis=1)[:, :2]
+        w = np.take_along_axis(w, order[:, None, :], axis=2)
+        Y = w[:, :2, :]
+        Z = w[:, 2:, :]
+
+        # P = Z Y^-1, 即 Y^T P^T = Z^T
+        try:
+            P = np.linalg.solve(Y.transpose(0, 2, 1), Z.transpose(0, 2, 1)).transpose(0, 2, 1)
+        except np.linalg.LinAlgError:
+            # 存在奇异的Y时逐车求解，奇异的车辆同solve_are退化为伪逆
+            P = np.empty_like(Z)
+            for k in range(K):
+                try:
+                    P[k] = np.linalg.solve(Y[k].T, Z[k].T).T
+                except np.linalg.LinAlgError:
+                    print(f"Warning: Y of vehicle {k} is not regular matrix. Result may be wrong!")
+                    P[k] = Z[k] @ np.linalg.pinv(Y[k])
+        P = P.real
+        f = self.R_inv @ B.transpose(0, 2, 1) @ P
+        return f[:, 0, :]
+
+    def _get_nearest_waypoint(self, x: np.ndarray, y: np.ndarray, update_prev_idx: bool = False):
+        """batched search of the closest waypoint for every vehicle"""
+        SEARCH_IDX_LEN = 100 # [points] forward search range
+        n = self.ref_path.shape[0]
+        # 每辆车的检索窗口 <K x SEARCH_IDX_LEN>
+        idx = np.minimum(self.prev_waypoints_idx[:, None] + np.arange(SEARCH_IDX_LEN), n-1)
+        d = (x[:, None] - self.ref_path[idx, 0])**2 + (y[:, None] - self.ref_path[idx, 1])**2
+        nearest_idx = idx[np.arange(len(idx)), np.argmin(d, axis=1)]
+
+        ref = self.ref_path[nearest_idx]
+
+        # 更新最近点索引
+        if update_prev_idx:
+            self.prev_waypoints_idx = nearest_idx
+
+        return nearest_idx, ref[:, 0], ref[:, 1], ref[:, 2], ref[:, 3]
+
+
 
 def main():
     CONSTANT_V = 5.0
     robot_info = env.get_robot_info()
 
+    # 离线计算增益调度表
+    gain_schedule = LQRGainSchedule(
+        wheel_base = robot_info.wheelbase, # [m] wheel base
+        Q = np.diag([20.0, 30.0]), # weight matrix for state variables
+        R = np.diag([15.0]), # weight matrix for control inputs
+    )
+
     # 初始化LQR控制器
     lqr_lat_controller = LQRLateralController(
         wheel_base = robot_info.wheelbase, # [m] wheel base
         Q = np.diag([20.0, 30.0]), # weight matrix for state variables
         R = np.diag([15.0]), # weight matrix for control inputs
         ref_path = ref_path, # ndarray, size is <num_of_waypoints x 2>
+        gain_schedule = gain_schedule,
+        path_index = PathIndex(ref_path),
     )
 
-    for i in range(5000):    
+    # 按仿真步长(10 Hz)运行控制循环，并统计每周期耗时
+    loop = RateLoop(rate_hz=10.0)
+    for i in loop.ticks(5000):
         # 获取当前实际状态
         current_state = env.get_robot_state().reshape(-1)
         # 计算控制输入
-        steer_input = lqr_lat_controller.calc_control_input(observed_x=current_state, velocity=CONSTANT_V ,delta_t=0.1)
+        with loop.stage('control'):
+            steer_input = lqr_lat_controller.calc_control_input(observed_x=current_state, velocity=CONSTANT_V ,delta_t=0.1)
         steer_input = np.clip(steer_input, -1.0, 1.0)
         action_input_list =  np.array([CONSTANT_V, steer_input])
-        env.step(action=action_input_list) # step once to initialize
-        env.render(show_traj=True, show_trail=True)
+        with loop.stage('step'):
+            env.step(action=action_input_list) # step once to initialize
+        with loop.stage('render'):
+            env.render(show_traj=True, show_trail=True)
         if env.robot.arrive:
             env.end(ending_time=i*0.1, suffix='.gif')
             break
+    loop.report()
+
+
+def benchmark_fleet(num_vehicles: int = 1000, n_ticks: int = 10):
+    """per-vehicle cost of K single-vehicle controllers vs one FleetLQRLateralController"""
+    import time
+    Q, R, v = np.diag([20.0, 30.0]), np.diag([15.0]), 5.0
+    rng = np.random.default_rng(0)
+    # 车辆沿路径前段分布，带横向与航向扰动
+    idx = rng.integers(0, ref_path.shape[0] // 2, num_vehicles)
+    states = np.column_stack((ref_path[idx, 0] + rng.normal(0, 0.3, num_vehicles),
+                              ref_path[idx, 1] + rng.normal(0, 0.3, num_vehicles),
+                              ref_path[idx, 2] + rng.normal(0, 0.1, num_vehicles),
+                              np.zeros(num_vehicles)))
+
+    singles = [LQRLateralController(Q=Q, R=R, ref_path=ref_path) for _ in range(num_vehicles)]
+    fleet = FleetLQRLateralController(num_vehicles, Q=Q, R=R, ref_path=ref_path)
+    for k, c in enumerate(singles):
+        c.prev_waypoints_idx = max(idx[k] - 10, 0)
+    fleet.prev_waypoints_idx = np.maximum(idx - 10, 0)
+
+    start = time.perf_counter()
+    for _ in range(n_ticks):
+        single_cmd = np.array([c.calc_control_input(x, v, 0.1) for c, x in zip(singles, states)])
+    single_time = (time.perf_counter() - start) / n_ticks
+    start = time.perf_counter()
+    for _ in range(n_ticks):
+        fleet_cmd = fleet.calc_control_input(states, v, 0.1)
+    fleet_time = (time.perf_counter() - start) / n_ticks
+
+    print(f"K = {num_vehicles}: single {single_time/num_vehicles*1e6:.2f} us/vehicle, "
+          f"fleet {fleet_time/num_vehicles*1e6:.2f} us/vehicle, speedup {single_time/fleet_time:.1f}x, "
+          f"max command difference {np.abs(single_cmd - fleet_cmd).max():.1e}")
+    return single_time, fleet_time
+
 
-    
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    # python lqr.py bench: 车队控制器与逐车控制的单车耗时对比
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark_fleet()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import numpy as np
+
+# 二进制路径文件的列定义
+X, Y, YAW, REF_V, S, KAPPA = range(6)
+
+
+def convert_csv(csv_path: str, out_path: str) -> np.ndarray:
+    """convert a x,y,yaw,ref_v csv path into a binary .npy path file
+
+    columns of the output: x, y, yaw, ref_v, cumulative arc length s, curvature kappa
+    """
+    raw = np.genfromtxt(csv_path, delimiter=',', skip_header=1)
+
+    # 累计弧长
+    ds = np.hypot(np.diff(raw[:, X]), np.diff(raw[:, Y]))
+    s = np.concatenate(([0.0], np.cumsum(ds)))
+
+    # 曲率 kappa = dyaw/ds（航向先展开，避免±pi处跳变）
+    yaw = np.unwrap(raw[:, YAW])
+    kappa = _curvature(yaw, s) if len(s) > 1 else np.zeros(len(s))
+
+    path = np.column_stack((raw[:, X], raw[:, Y], raw[:, YAW], raw[:, REF_V], s, kappa))
+    _save_atomic(out_path, path)
+    return path
+
+
+def _save_atomic(out_path: str, array: np.ndarray) -> None:
+    """write to a temp file in the target directory and rename it into place,
+    so concurrent readers never map a half-written file and concurrent writers don't interleave"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(out_path)), suffix='.npy.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _curvature(yaw: np.ndarray, s: np.ndarray) -> np.ndarray:
+    """per-waypoint curvature, zero-length segments (repeated points) contribute 0"""
+    dyaw = np.diff(yaw)
+    ds = np.diff(s)
+    k = np.divide(dyaw, ds, out=np.zeros_like(dyaw), where=ds > 0)
+    return np.concatenate((k[:1], 0.5 * (k[:-1] + k[1:]), k[-1:]))
+
+
+def load_path(path_file: str) -> np.ndarray:
+    """memory-map a binary path file, read only so processes share the page cache"""
+    return np.load(path_file, mmap_mode='r')
+
+
+def load_reference_path(csv_path: str) -> np.ndarray:
+    """load the binary copy of a csv path, converting it once if missing or stale"""
+    npy_path = os.path.splitext(csv_path)[0] + '.npy'
+    if not os.path.exists(npy_path) or os.path.getmtime(npy_path) < os.path.getmtime(csv_path):
+        convert_csv(csv_path, npy_path)
+    return load_path(npy_path)
+
+
+if __name__ == '__main__':
+    import sys
+    # 用法: python path_file.py input.csv [output.npy]
+    src = sys.argv[1]
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + '.npy'
+    path = convert_csv(src, dst)
+    print(f"converted {path.shape[0]} waypoints -> {dst}")
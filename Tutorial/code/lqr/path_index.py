@@ -0,0 +1,103 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from path_file import S
+
+
+class PathIndex():
+    def __init__(self, ref_path: np.ndarray, window: float = 10.0, max_offset: float = 2.0) -> None:
+        """build a spatial index over a reference path <num_of_waypoints x 4> (x, y, yaw, v)
+        or a binary path file array (path_file.py), whose precomputed arc length column is reused
+
+        window: [m] forward arc-length window searched around the previous projection
+        max_offset: [m] a windowed match farther than this from the query falls back to the global search
+        """
+        self.window = window
+        self.max_offset = max_offset
+        self.ref_path = np.asarray(ref_path, dtype=float)
+        xy = self.ref_path[:, 0:2]
+
+        # 线段向量与长度
+        self.seg = xy[1:] - xy[:-1]
+        self.seg_len = np.hypot(self.seg[:, 0], self.seg[:, 1])
+        # 累计弧长（二进制路径文件中已预先计算）
+        if self.ref_path.shape[1] > S:
+            self.s = self.ref_path[:, S]
+        else:
+            self.s = np.concatenate(([0.0], np.cumsum(self.seg_len)))
+        # 相邻航向差（限制在[-pi, pi]，用于航向插值）
+        dyaw = np.diff(self.ref_path[:, 2])
+        self.dyaw = np.arctan2(np.sin(dyaw), np.cos(dyaw))
+
+        # 路径点的KD树（路径点沿曲线分布，非紧凑节点在远离路径的查询上快一个数量级）
+        self.tree = cKDTree(xy, compact_nodes=False, balanced_tree=False)
+        # 任一线段上的最近点距其某个端点不超过半个线段长度
+        self.half_max_len = 0.5 * self.seg_len.max() if len(self.seg_len) > 0 else 0.0
+
+    def project(self, x: float, y: float, s_hint: float = None):
+        """continuous projection of (x, y) onto the path
+
+        s_hint: arc length of the previous projection. When given, segments within
+        [s_hint - longest segment, s_hint + window] are preferred, so self-intersecting or closed
+        paths (start == end) keep the vehicle's progress; the global search is used only when no
+        segment in that window lies within max_offset
+
+        returns (seg_idx, t, s, lateral_error, ref_x, ref_y, ref_yaw, ref_v), where t in [0, 1]
+        is the position on segment seg_idx and lateral_error > 0 means the point is on the left
+        """
+        p = np.array([x, y])
+        n = self.ref_path.shape[0]
+        if n < 2:
+            ref_x, ref_y, ref_yaw, ref_v = self.ref_path[0]
+            return 0, 0.0, 0.0, np.hypot(x - ref_x, y - ref_y), ref_x, ref_y, ref_yaw, ref_v
+
+        found = False
+        if s_hint is not None:
+            # 在上次投影附近的前向弧长窗口内投影
+            lo = np.searchsorted(self.s, s_hint - 2 * self.half_max_len, side='right') - 1
+            hi = np.searchsorted(self.s, s_hint + self.window, side='left')
+            lo, hi = np.clip(lo, 0, n - 2), np.clip(hi, 1, n - 1)
+            seg_idx = np.arange(lo, max(hi, lo + 1))
+            t, d = self._project_onto(p, seg_idx)
+            found = d.min() <= self.max_offset**2
+
+        if not found:
+            # 全局搜索：先投影到最近路径点的相邻线段上，得到距离上界d0
+            _, v_idx = self.tree.query(p)
+            _, d0 = self._project_onto(p, self._adjacent_segments(np.array([v_idx])))
+            # 最优投影点与其较近端点的距离不超过sqrt(d^2 + (L/2)^2)，只需检查该半径内的路径点
+            r = np.sqrt(d0.min() + self.half_max_len**2) + 1e-9
+            cand = np.asarray(self.tree.query_ball_point(p, r), dtype=int)
+            seg_idx = self._adjacent_segments(cand)
+            t, d = self._project_onto(p, seg_idx)
+
+        k = np.argmin(d)
+        i, t_k = seg_idx[k], t[k]
+        ref_x, ref_y = self.ref_path[i, 0:2] + t_k * self.seg[i]
+
+        # 沿线段插值航向与速度
+        ref_yaw = self.ref_path[i, 2] + t_k * self.dyaw[i]
+        ref_yaw = np.arctan2(np.sin(ref_yaw), np.cos(ref_yaw))
+        ref_v = self.ref_path[i, 3] + t_k * (self.ref_path[i+1, 3] - self.ref_path[i, 3])
+
+        # 弧长与带符号的横向偏移（左正右负）
+        s = self.s[i] + t_k * self.seg_len[i]
+        cross = np.cos(ref_yaw) * (y - ref_y) - np.sin(ref_yaw) * (x - ref_x)
+        lateral_error = np.sign(cross) * np.sqrt(d[k])
+
+        return i, t_k, s, lateral_error, ref_x, ref_y, ref_yaw, ref_v
+
+    def _adjacent_segments(self, vertex_idx: np.ndarray) -> np.ndarray:
+        """indices of all segments adjacent to the given vertices"""
+        n = self.ref_path.shape[0]
+        seg_idx = np.unique(np.concatenate((vertex_idx - 1, vertex_idx)))
+        return seg_idx[(seg_idx >= 0) & (seg_idx < n - 1)]
+
+    def _project_onto(self, p: np.ndarray, seg_idx: np.ndarray):
+        """project p onto the given segments, returns (t, squared distance)"""
+        a = self.ref_path[seg_idx, 0:2]
+        ab = self.seg[seg_idx]
+        t = np.einsum('ij,ij->i', p - a, ab) / np.maximum(self.seg_len[seg_idx]**2, 1e-12)
+        t = np.clip(t, 0.0, 1.0)
+        proj = a + t[:, None] * ab
+        d = np.sum((proj - p)**2, axis=1)
+        return t, d
@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+import numpy as np
+
+
+class RateLoop:
+    def __init__(self, rate_hz=10.0, realtime=True):
+        """
+        固定频率控制循环调度器(记录每周期计算耗时、抖动与超时)
+        :param rate_hz: 控制频率
+        :param realtime: True时按周期休眠到下一截止时刻; False时不休眠, 仅统计计算耗时是否满足预算
+        """
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.realtime = realtime
+
+        self.compute_times = np.empty(0)  # 每周期计算耗时
+        self.jitters = np.empty(0)        # 实际启动时刻 - 计划启动时刻
+        self.stage_times = {}             # 各阶段(控制器/仿真/渲染)耗时
+        self.overruns = 0                 # 计算耗时超过周期的次数
+        self.n_ticks = 0
+
+    def ticks(self, n):
+        """按固定频率产生n个周期的索引, 循环体即为一个周期的计算"""
+        self.compute_times = np.zeros(n)
+        self.jitters = np.zeros(n)
+        self.stage_times = {}
+        self.overruns = 0
+        self.n_ticks = 0
+
+        deadline = time.perf_counter()
+        for i in range(n):
+            now = time.perf_counter()
+            if self.realtime and now < deadline:
+                time.sleep(deadline - now)
+                now = time.perf_counter()
+            self.jitters[i] = now - deadline if self.realtime else 0.0
+
+            try:
+                yield i
+            finally:
+                # 循环体中break时也记录最后一个周期
+                end = time.perf_counter()
+                self.compute_times[i] = end - now
+                self.n_ticks = i + 1
+                if self.compute_times[i] > self.period:
+                    self.overruns += 1
+
+            # 超时后从当前时刻重新对齐, 不连续追赶错过的周期
+            deadline = max(deadline + self.period, end) if self.realtime else end
+
+    @contextmanager
+    def stage(self, name):
+        """统计当前周期内某一阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            times = self.stage_times.setdefault(name, np.zeros(len(self.compute_times)))
+            times[self.n_ticks] += time.perf_counter() - start
+
+    def report(self, percentiles=(50, 90, 99)):
+        """打印耗时与抖动的分位数统计, 并返回统计字典"""
+        n = self.n_ticks
+        stats = {'compute': self.compute_times[:n]}
+        stats.update({name: times[:n] for name, times in self.stage_times.items()})
+        if self.realtime:
+            stats['jitter'] = self.jitters[:n]
+
+        summary = {}
+        print(f"控制频率 {self.rate_hz:g} Hz (周期 {self.period*1e3:.2f} ms), 共 {n} 个周期, "
+              f"超时 {self.overruns} 次 ({100.0*self.overruns/max(n, 1):.1f}%)")
+        for name, values in stats.items():
+            if n == 0:
+                continue
+            p = np.percentile(values, percentiles) * 1e3
+            summary[name] = dict(zip([f'p{q}' for q in percentiles], p), max=values.max() * 1e3)
+            text = ', '.join(f'p{q} = {v:.3f}' for q, v in zip(percentiles, p))
+            print(f"  {name:>8s} [ms]: {text}, max = {values.max()*1e3:.3f}")
+        summary['overruns'] = self.overruns
+        return summary
@@ -0,0 +1,137 @@
+"""
+流式极坐标扫描接入管线(基于生成器):
+    极坐标扫描 -> 按位姿变换到预分配缓冲区 -> 体素降采样 -> 最近若干帧的环形缓冲区
+下游(半空间提取、距离场等)始终拿到大小有上限的点云，长时间运行时内存与延迟保持平稳
+"""
+
+import numpy as np
+
+
+def polar_to_cartesian(polar, pose, out, range_min=0.0, range_max=np.inf):
+    """
+    将一帧极坐标点 (m, 2)[r, angle] 按位姿 [x, y, theta] 变换到全局坐标，写入预分配缓冲区out
+    :return: out中有效点的视图(丢弃超出[range_min, range_max]的点)
+    """
+    r, a = polar[:, 0], polar[:, 1]
+    valid = np.isfinite(r) & (r >= range_min) & (r <= range_max)
+    m = np.count_nonzero(valid)
+    if m > len(out):
+        raise ValueError(f"scan has {m} valid points but the buffer holds {len(out)}")
+    r, a = r[valid], a[valid] + pose[2]
+    buf = out[:m]
+    np.cos(a, out=buf[:, 0])
+    np.sin(a, out=buf[:, 1])
+    buf *= r[:, None]
+    buf += pose[:2]
+    return buf
+
+
+def voxel_downsample(points, voxel_size):
+    """体素网格降采样，每个体素内的点用其质心代替"""
+    if len(points) == 0:
+        return points
+    keys = np.floor(points / voxel_size).astype(np.int64)
+    key = (keys[:, 0] << 32) ^ (keys[:, 1] & 0xFFFFFFFF)
+    _, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+    centroid = np.empty((len(counts), 2))
+    centroid[:, 0] = np.bincount(inverse, weights=points[:, 0]) / counts
+    centroid[:, 1] = np.bincount(inverse, weights=points[:, 1]) / counts
+    return centroid
+
+
+class PointRingBuffer:
+    def __init__(self, capacity):
+        """固定容量的点环形缓冲区，写满后覆盖最早的点"""
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, 2))
+        self.head = 0   # 下一个写入位置
+        self.count = 0  # 有效点数
+
+    def push(self, points):
+        """写入一帧点(超过容量时对该帧均匀抽取capacity个点)"""
+        if len(points) > self.capacity:
+            points = points[np.linspace(0, len(points) - 1, self.capacity).astype(int)]
+        m = len(points)
+        end = self.head + m
+        if end <= self.capacity:
+            self.buffer[self.head:end] = points
+        else:
+            k = self.capacity - self.head
+            self.buffer[self.head:] = points[:k]
+            self.buffer[:m - k] = points[k:]
+        self.head = end % self.capacity
+        self.count = min(self.count + m, self.capacity)
+
+    def cloud(self):
+        """当前点云(缓冲区视图，不复制; 点的顺序无意义)"""
+        return self.buffer[:self.count]
+
+
+# ---------------- 管线各阶段 ----------------
+def transform_stage(scans, max_points, range_min=0.0, range_max=np.inf):
+    """(polar, pose) -> 全局坐标点; 输出为复用缓冲区的视图，只在下一帧到来前有效"""
+    out = np.empty((max_points, 2))
+    for polar, pose in scans:
+        yield polar_to_cartesian(polar, pose, out, range_min, range_max)
+
+
+def voxel_stage(clouds, voxel_size):
+    """全局坐标点 -> 体素降采样后的点"""
+    for cloud in clouds:
+        yield voxel_downsample(cloud, voxel_size)
+
+
+def ring_stage(clouds, capacity):
+    """降采样点 -> 最近若干帧合并后的点云(大小不超过capacity)"""
+    ring = PointRingBuffer(capacity)
+    for cloud in clouds:
+        ring.push(cloud)
+        yield ring.cloud()
+
+
+def scan_pipeline(scans, max_points, voxel_size=0.05, capacity=20000, range_min=0.0, range_max=np.inf):
+    """
+    组合完整管线
+    :param scans: 生成 (polar (m, 2), pose [x, y, theta]) 的可迭代对象
+    :param max_points: 单帧最大点数(预分配缓冲区大小)
+    :param voxel_size: 体素边长
+    :param capacity: 环形缓冲区容量(下游点云的最大点数)
+    """
+    clouds = transform_stage(scans, max_points, range_min, range_max)
+    clouds = voxel_stage(clouds, voxel_size)
+    return ring_stage(clouds, capacity)
+
+
+def simulated_scans(num_points=100000, base_radius=8.0, noise_level=0.3, num_scans=None):
+    """模拟扫描源: 绕原点做圆周运动的传感器看到的带噪声圆形点云(同main.py中的点云分布)"""
+    i = 0
+    while num_scans is None or i < num_scans:
+        angles = np.linspace(0, 2*np.pi, num_points, endpoint=False)
+        radii = np.maximum(0.1, base_radius + np.random.normal(0, noise_level, num_points))
+        pose = np.array([np.cos(0.01 * i), np.sin(0.01 * i), 0.01 * i])
+        yield np.column_stack((radii, angles)), pose
+        i += 1
+
+
+if __name__ == '__main__':
+    import time
+    import tracemalloc
+    from halfspace import HalfspaceExtractor
+
+    # 连续接入多帧1e5点扫描, 统计每帧延迟与内存
+    extractor = HalfspaceExtractor(radius=3.0, max_planes=16, margin=0.05)
+    tracemalloc.start()
+    latency = []
+    start = time.perf_counter()
+    for k, cloud in enumerate(scan_pipeline(simulated_scans(num_scans=200), max_points=100000,
+                                            voxel_size=0.05, capacity=20000)):
+        extractor.update(cloud)
+        extractor.halfspaces([0.0, 0.0])
+        now = time.perf_counter()
+        latency.append(now - start)
+        start = now
+        if k % 50 == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            print(f"帧 {k}: 点云大小 {len(cloud)}, 当前内存 {current/1e6:.1f} MB, 峰值 {peak/1e6:.1f} MB")
+    latency = np.array(latency) * 1e3
+    print(f"每帧延迟 [ms]: p50 = {np.percentile(latency, 50):.2f}, p99 = {np.percentile(latency, 99):.2f}")
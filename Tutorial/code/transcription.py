@@ -0,0 +1,180 @@
+"""
+通用的轨迹优化转录层: 由命名的变量块、代价项与约束项组装稀疏NLP
+    - 决策变量与参数按块登记, 每块为 n x K 的CasADi矩阵(列为时间步), 上下界与初值按块广播后拼接为向量
+    - 约束项同样以矩阵形式登记, 上下界按元素广播, 按列优先展开与ca.vec一致
+    - 求解结果按结构化dtype零拷贝解包: 每块是决策向量上形状为 (K, n) 的视图
+表达式为SX, 由CasADi自动微分得到精确的稀疏雅可比与海森矩阵
+"""
+
+import numpy as np
+import casadi as ca
+
+
+class _Blocks:
+    def __init__(self, prefix):
+        """同一向量(决策变量或参数)上的命名块"""
+        self.prefix = prefix
+        self.names, self.shapes, self.offsets = [], [], []
+        self.symbols = []
+        self.size = 0
+
+    def add(self, name, n, length):
+        if name in self.names:
+            raise ValueError(f"{self.prefix} '{name}' is already defined")
+        sym = ca.SX.sym(name, n, length)
+        self.names.append(name)
+        self.shapes.append((length, n))
+        self.offsets.append(self.size)
+        self.symbols.append(sym)
+        self.size += n * length
+        return sym
+
+    def vector(self):
+        return ca.vertcat(*[ca.vec(s) for s in self.symbols]) if self.symbols else ca.SX(0, 1)
+
+    def dtype(self):
+        """块 (K, n) 按C顺序存储, 正好对应 n x K 矩阵的列优先展开"""
+        return np.dtype({'names': self.names,
+                         'formats': [('f8', shape) for shape in self.shapes],
+                         'offsets': [8 * o for o in self.offsets],
+                         'itemsize': 8 * self.size})
+
+    def broadcast(self, name, value):
+        """把标量 / 每步相同的 (n,) / 完整的 (K, n) 数组广播为该块的展开向量"""
+        shape = self.shapes[self.names.index(name)]
+        return np.broadcast_to(np.asarray(value, dtype=float), shape).ravel()
+
+
+class Transcription:
+    def __init__(self):
+        self.vars = _Blocks('variable')
+        self.params = _Blocks('parameter')
+        self._lbx, self._ubx, self._x0 = [], [], []
+        self.cost = 0
+        self._g, self._lbg, self._ubg = [], [], []
+        self.solver = None
+
+    # ---------------- 问题描述 ----------------
+    def variable(self, name, n, length=1, lb=-np.inf, ub=np.inf, init=0.0):
+        """
+        登记决策变量块
+        :param n: 每个时间步的维数
+        :param length: 时间步数
+        :param lb, ub, init: 标量、(n,) 或 (length, n) 数组
+        :return: n x length 的SX矩阵
+        """
+        sym = self.vars.add(name, n, length)
+        self._lbx.append(self.vars.broadcast(name, lb))
+        self._ubx.append(self.vars.broadcast(name, ub))
+        self._x0.append(self.vars.broadcast(name, init))
+        return sym
+
+    def parameter(self, name, n, length=1):
+        """登记参数块, 求解时通过 params={name: value} 传入"""
+        return self.params.add(name, n, length)
+
+    def add_cost(self, expr):
+        self.cost = self.cost + expr
+
+    def constrain(self, expr, lb=0.0, ub=0.0):
+        """
+        登记约束 lb <= expr <= ub
+        :param expr: SX矩阵, 按列优先展开
+        :param lb, ub: 标量或可广播到expr形状的数组
+        """
+        expr = ca.SX(expr)
+        shape = expr.shape
+        self._g.append(ca.vec(expr))
+        self._lbg.append(np.broadcast_to(np.asarray(lb, dtype=float), shape).ravel(order='F'))
+        self._ubg.append(np.broadcast_to(np.asarray(ub, dtype=float), shape).ravel(order='F'))
+
+    def dynamics(self, f, X, U, dt, method='euler'):
+        """
+        登记整条轨迹上的动力学约束(用f.map一次性向量化)
+        :param f: CasADi函数 f(x, u) -> dx/dt
+        :param X: n_x x (K+1) 状态矩阵
+        :param U: n_u x K(欧拉) 或 n_u x (K+1)(梯形) 控制矩阵
+        :param dt: 标量或 1 x K 的时间步
+        :param method: 'euler': (x_{k+1} - x_k)/dt - f(x_k, u_k) = 0
+                       'trapezoid': x_{k+1} - x_k - dt/2 (f_k + f_{k+1}) = 0
+        """
+        nx, K = X.shape[0], X.shape[1] - 1
+        if isinstance(dt, (ca.SX, ca.MX, ca.DM)) and dt.shape[1] == K:
+            dt = ca.repmat(dt, nx, 1)
+        if method == 'euler':
+            defect = (X[:, 1:] - X[:, :-1]) / dt - f.map(K)(X[:, :-1], U[:, :K])
+        elif method == 'trapezoid':
+            F = f.map(K + 1)(X, U)
+            defect = X[:, 1:] - X[:, :-1] - dt / 2 * (F[:, :-1] + F[:, 1:])
+        else:
+            raise ValueError(f"unknown integration method '{method}'")
+        self.constrain(defect, 0.0, 0.0)
+
+    # ---------------- 组装与求解 ----------------
+    @property
+    def lbx(self):
+        return np.concatenate(self._lbx) if self._lbx else np.zeros(0)
+
+    @property
+    def ubx(self):
+        return np.concatenate(self._ubx) if self._ubx else np.zeros(0)
+
+    @property
+    def lbg(self):
+        return np.concatenate(self._lbg) if self._lbg else np.zeros(0)
+
+    @property
+    def ubg(self):
+        return np.concatenate(self._ubg) if self._ubg else np.zeros(0)
+
+    def nlp(self):
+        """NLP字典 {'x', 'p', 'f', 'g'}"""
+        g = ca.vertcat(*self._g) if self._g else ca.SX(0, 1)
+        return {'x': self.vars.vector(), 'p': self.params.vector(), 'f': self.cost, 'g': g}
+
+    def build(self, solver='ipopt', opts=None):
+        """构建求解器, 并缓存向量化的上下界"""
+        self.solver = ca.nlpsol('solver', solver, self.nlp(), opts or {})
+        self._bounds = dict(lbx=self.lbx, ubx=self.ubx, lbg=self.lbg, ubg=self.ubg)
+        return self.solver
+
+    def pack(self, values=None, blocks=None):
+        """
+        按块填写向量(未给出的块取登记时的初值或0)
+        :param values: {块名: 可广播到 (K, n) 的数组}
+        :param blocks: 决策变量或参数的块集合, 默认为决策变量
+        """
+        blocks = blocks or self.vars
+        if blocks is self.vars:
+            z = np.concatenate(self._x0) if self._x0 else np.zeros(0)
+        else:
+            z = np.zeros(blocks.size)
+        if blocks.size == 0:
+            return z
+        rec = z.view(blocks.dtype())[0]
+        for name, value in (values or {}).items():
+            rec[name] = value
+        return z
+
+    def unpack(self, z, blocks=None):
+        """决策向量 -> 结构化记录, rec[name] 为 (K, n) 的视图(不复制)"""
+        blocks = blocks or self.vars
+        z = np.ascontiguousarray(z, dtype=float).ravel()
+        return z.view(blocks.dtype())[0]
+
+    def solve(self, init=None, params=None):
+        """
+        :param init: 初值, 为完整向量或 {块名: 数组}
+        :param params: 参数 {块名: 数组}
+        :return: 结构化解记录, NLP求解结果字典
+        """
+        if self.solver is None:
+            self.build()
+        x0 = init if isinstance(init, np.ndarray) else self.pack(init)
+        p = self.pack(params, self.params)
+        res = self.solver(x0=x0, p=p, **self._bounds)
+        return self.unpack(res['x'].full()), res
+
+    @property
+    def success(self):
+        return self.solver.stats()['success']
@@ -7,6 +7,7 @@ pip install numpy matplotlib
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.patches import Ellipse
+from local_goal import wrapper_ellipses
 
 # ---------------- 路径 ----------------
 # 任意折线路径：可改为自己的
@@ -49,20 +50,11 @@ ax.add_patch(ellipse_patch)
 
 def update_ellipse(pr,alpha):
     """根据当前 pr 重新计算并绘制椭圆"""
-    lr = np.linalg.norm(pr - g_i)
-    theta_r = np.arctan2(pr[1] - g_i[1], pr[0] - g_i[0])
-
-    a = alpha*lr * np.cos(theta_r - theta_g)
-    b = alpha*lr * np.sin(theta_r - theta_g)
-    a = abs(a)
-    b = abs(b)
-
-
-    # 椭圆中心
-    center = g_i - a * l_vec
+    center, a, b, _ = wrapper_ellipses(path[i:i+2], pr, alpha)
+    a, b = a[0], b[0]
 
     # 更新椭圆
-    ellipse_patch.set_center(center)
+    ellipse_patch.set_center(center[0])
     ellipse_patch.width  = abs(2*a) if abs(2*a) > 1e-3 else 1e-3
     ellipse_patch.height = abs(2*b) if abs(2*b) > 1e-3 else 1e-3
     ellipse_patch.angle  = np.degrees(theta_g)
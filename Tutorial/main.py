@@ -1,8 +1,14 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.widgets as widgets
 from matplotlib.patches import Polygon
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code'))
+from halfspace import HalfspaceExtractor
+from scan_stream import polar_to_cartesian
+
 # 设置中文显示
 plt.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"]
 plt.rcParams["axes.unicode_minus"] = False  # 正确显示负号
@@ -22,9 +28,15 @@ class EnhancedInteractivePolarCloud:
         # 转换为全局直角坐标
         self.global_cartesian = self.polar_to_global_cartesian(self.original_polar)
         
+        # 点云空间索引(最近点查询与多半空间提取)
+        self.extractor = HalfspaceExtractor(radius=2 * self.base_radius, max_planes=8)
+        self.extractor.update(self.global_cartesian)
+        
         # 初始化最近点和约束相关参数
         self.closest_point = None
         self.closest_dist = 0
+        self.normals = np.empty((0, 2))
+        self.offsets = np.empty(0)
         self.constraint_visible = False  # 约束可见性属性
         
         # 创建图形
@@ -55,24 +67,13 @@ class EnhancedInteractivePolarCloud:
     
     def polar_to_global_cartesian(self, polar_points):
         """将极坐标点转换为全局直角坐标"""
-        radii, angles = polar_points[:, 0], polar_points[:, 1]
-        x = self.original_center[0] + radii * np.cos(angles)
-        y = self.original_center[1] + radii * np.sin(angles)
-        return np.column_stack((x, y))
+        pose = np.array([self.original_center[0], self.original_center[1], 0.0])
+        return polar_to_cartesian(polar_points, pose, np.empty((len(polar_points), 2)))
     
-    def update_polar_from_center(self):
-        """根据当前中心更新极坐标表示"""
-        rel_x = self.global_cartesian[:, 0] - self.current_center[0]
-        rel_y = self.global_cartesian[:, 1] - self.current_center[1]
-        
-        radii = np.sqrt(rel_x**2 + rel_y**2)
-        angles = np.arctan2(rel_y, rel_x)
-        
-        # 找到最近点
-        self.closest_dist = np.min(radii)
-        self.closest_point = self.global_cartesian[np.argmin(radii)]
-        
-        return np.column_stack((radii, angles))
+    def update_from_center(self):
+        """根据当前中心查询最近点(KD树)并提取半空间约束"""
+        self.closest_point, self.closest_dist = self.extractor.nearest(self.current_center)
+        self.normals, self.offsets = self.extractor.halfspaces(self.current_center)
     
     def setup_plot_elements(self):
         """设置绘图元素"""
@@ -129,25 +130,14 @@ class EnhancedInteractivePolarCloud:
     
     def update_halfspace_constraint(self):
         """更新半空间约束可视化"""
-        if not self.constraint_visible or self.closest_point is None:
+        if not self.constraint_visible or self.closest_point is None or len(self.normals) == 0:
             # 使用退化多边形（四个相同的点）替代空列表，避免shape错误
             self.constraint_line.set_data([], [])
             self.halfspace_patch.set_xy([[0,0], [0,0], [0,0], [0,0]])
             return
         
-        # 计算约束线（垂直于中心点到最近点的连线）
-        dx = self.current_center[0] - self.closest_point[0]
-        dy = self.current_center[1] - self.closest_point[1]
-        
-        # 法向量归一化
-        norm = np.sqrt(dx**2 + dy**2)
-        if norm < 1e-6:
-            self.constraint_line.set_data([], [])
-            self.halfspace_patch.set_xy([[0,0], [0,0], [0,0], [0,0]])
-            return
-            
-        dx_norm = dx / norm
-        dy_norm = dy / norm
+        # 最近点对应的半空间: 法向量由最近点指向中心点
+        dx_norm, dy_norm = self.normals[0]
         
         # 约束线方向向量（垂直于法向量）
         perp_dx = -dy_norm
@@ -161,15 +151,18 @@ class EnhancedInteractivePolarCloud:
         # 生成半空间多边形
         p3 = p2 + np.array([dx_norm * extend, dy_norm * extend])
         p4 = p1 + np.array([dx_norm * extend, dy_norm * extend])
-        
-        # 更新约束线和半空间区域
-        self.constraint_line.set_data([p1[0], p2[0]], [p1[1], p2[1]])
         self.halfspace_patch.set_xy([p1, p2, p3, p4])
+        
+        # 所有半空间的边界线(以中心点在边界线上的投影为中点，用nan分隔)
+        foot = self.current_center - (self.normals @ self.current_center + self.offsets)[:, None] * self.normals
+        perp = np.column_stack((-self.normals[:, 1], self.normals[:, 0]))
+        segs = np.stack((foot + extend * perp, foot - extend * perp, np.full_like(foot, np.nan)), axis=1)
+        self.constraint_line.set_data(segs[:, :, 0].ravel(), segs[:, :, 1].ravel())
     
     def update_plot(self):
         """更新绘图内容"""
-        # 更新极坐标信息（同时找到最近点）
-        self.update_polar_from_center()
+        # 更新最近点与半空间约束
+        self.update_from_center()
         
         # 更新点的位置
         self.points.set_data(self.global_cartesian[:, 0], self.global_cartesian[:, 1])